@@ -0,0 +1,77 @@
+import hashlib
+import json
+from functools import lru_cache
+
+from graphene_django.settings import graphene_settings
+from graphql import parse
+from graphql.validation import validate
+
+from alx_project_nexus.settings import GRAPHQL_DOCUMENT_CACHE_SIZE
+from utils.redis_client import redis_client
+
+PERSISTED_QUERIES_KEY = "graphql:persisted_queries"
+
+
+def query_hash(query):
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+def register_query(query):
+    """
+    Register a query document so clients can send its sha256 hash instead of the full text.
+    The document is parsed first, so a syntax error is raised instead of being stored.
+    :param query:
+    :return: the hash of the query
+    """
+    parse(query)
+    digest = query_hash(query)
+    redis_client.hset(PERSISTED_QUERIES_KEY, digest, query)
+    return digest
+
+
+def unregister_query(digest):
+    return redis_client.hdel(PERSISTED_QUERIES_KEY, digest)
+
+
+def get_persisted_query(digest):
+    query = redis_client.hget(PERSISTED_QUERIES_KEY, digest)
+    return query.decode() if query is not None else None
+
+
+def get_requested_hash(request, data):
+    """
+    Read the persisted query hash of a request, sent in the Apollo format:
+        {"extensions": {"persistedQuery": {"version": 1, "sha256Hash": "..."}}}
+    :param request:
+    :param data:
+    :return: the hash, or None when the request does not use a persisted query
+    """
+    extensions = request.GET.get("extensions") or data.get("extensions")
+    if isinstance(extensions, str):
+        try:
+            extensions = json.loads(extensions)
+        except ValueError:
+            return None
+    if not isinstance(extensions, dict):
+        return None
+
+    persisted = extensions.get("persistedQuery")
+    if not isinstance(persisted, dict):
+        return None
+    return persisted.get("sha256Hash")
+
+
+@lru_cache(maxsize=GRAPHQL_DOCUMENT_CACHE_SIZE)
+def get_document(schema, query, validation_rules=None):
+    """
+    Parse and validate a query document, keeping the result in a per-process LRU.
+    Hot queries are parsed and validated once per worker instead of once per request.
+    Syntax errors are raised and never cached.
+    :param schema: the graphql-core schema
+    :param query:
+    :param validation_rules: a tuple of validation rules, None for the standard ones
+    :return: the document and a tuple of its validation errors
+    """
+    document = parse(query)
+    errors = validate(schema, document, validation_rules, graphene_settings.MAX_VALIDATION_ERRORS)
+    return document, tuple(errors)
@@ -0,0 +1,135 @@
+from dataclasses import dataclass
+
+from graphene_django.settings import graphene_settings
+from graphql import (
+    FieldNode, FragmentDefinitionNode, FragmentSpreadNode, InlineFragmentNode, OperationDefinitionNode,
+    get_named_type, get_nullable_type, is_leaf_type, is_list_type,
+)
+from graphql.utilities import value_from_ast_untyped
+
+from alx_project_nexus.settings import GRAPHQL_DEFAULT_LIST_SIZE
+
+# Extra weight of fields that are more expensive than a plain object lookup, keyed by "Type.field".
+FIELD_WEIGHTS = {
+    "Query.allPosts": 2,
+    "Query.allStories": 2,
+    "Query.topUsers": 5,
+    "UserDetailType.posts": 2,
+    "PostTypeConnection.totalCount": 10,
+    "StoryTypeConnection.totalCount": 10,
+}
+
+
+@dataclass
+class QueryCost:
+    cost: int = 0
+    depth: int = 0
+
+
+class QueryCostAnalyzer:
+    """
+    Static cost analysis of a GraphQL operation, run before it is executed.
+    Every object field costs its weight (1 unless listed in FIELD_WEIGHTS) and scalar fields are free.
+    The cost of the selections below a list field is multiplied by its `first`/`last` argument, or by
+    the default page size when the client does not bound the list.
+    """
+
+    def __init__(self, schema, document, variables=None):
+        self.schema = schema
+        self.variables = variables or {}
+        self.fragments = {
+            definition.name.value: definition
+            for definition in document.definitions if isinstance(definition, FragmentDefinitionNode)
+        }
+        self.operations = [
+            definition for definition in document.definitions if isinstance(definition, OperationDefinitionNode)
+        ]
+
+    def analyze(self, operation_name=None):
+        """
+        Compute the cost and depth of the selected operation.
+        :param operation_name:
+        :return: a QueryCost, empty when the operation cannot be found
+        """
+        operation = self.get_operation(operation_name)
+        if operation is None:
+            return QueryCost()
+
+        root_type = self.schema.get_root_type(operation.operation)
+        if root_type is None:
+            return QueryCost()
+        return self.selection_cost(root_type, operation.selection_set, 1, frozenset())
+
+    def get_operation(self, operation_name):
+        if operation_name is None:
+            return self.operations[0] if len(self.operations) == 1 else None
+        return next((op for op in self.operations if op.name and op.name.value == operation_name), None)
+
+    def selection_cost(self, parent_type, selection_set, depth, seen_fragments):
+        total = QueryCost(depth=depth)
+
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                result = self.field_cost(parent_type, selection, depth, seen_fragments)
+            elif isinstance(selection, InlineFragmentNode):
+                fragment_type = self.get_condition_type(selection, parent_type)
+                result = self.selection_cost(fragment_type, selection.selection_set, depth, seen_fragments)
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = self.fragments.get(name)
+                if fragment is None or name in seen_fragments:
+                    continue
+                fragment_type = self.get_condition_type(fragment, parent_type)
+                result = self.selection_cost(fragment_type, fragment.selection_set, depth, seen_fragments | {name})
+            else:
+                continue
+
+            total.cost += result.cost
+            total.depth = max(total.depth, result.depth)
+
+        return total
+
+    def field_cost(self, parent_type, node, depth, seen_fragments):
+        name = node.name.value
+        fields = getattr(parent_type, 'fields', {})
+        if name.startswith('__') or name not in fields:
+            return QueryCost(depth=depth)
+
+        field = fields[name]
+        field_type = get_named_type(field.type)
+        weight = FIELD_WEIGHTS.get(f"{parent_type.name}.{name}", 0 if is_leaf_type(field_type) else 1)
+        if node.selection_set is None:
+            return QueryCost(cost=weight, depth=depth)
+
+        children = self.selection_cost(field_type, node.selection_set, depth + 1, seen_fragments)
+        return QueryCost(cost=weight + self.multiplier(node, field) * children.cost, depth=children.depth)
+
+    def multiplier(self, node, field):
+        arguments = {argument.name.value: value_from_ast_untyped(argument.value, self.variables)
+                     for argument in node.arguments}
+        for argument in ('first', 'last'):
+            if isinstance(arguments.get(argument), int):
+                return max(arguments[argument], 0)
+
+        if is_connection(field):
+            return graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+        if node.name.value == 'edges':
+            # The edges of a connection are already multiplied at the connection field.
+            return 1
+        if is_list_type(get_nullable_type(field.type)):
+            return GRAPHQL_DEFAULT_LIST_SIZE
+        return 1
+
+    def get_condition_type(self, node, parent_type):
+        if node.type_condition is None:
+            return parent_type
+        return self.schema.get_type(node.type_condition.name.value) or parent_type
+
+
+def is_connection(field):
+    fields = getattr(get_named_type(field.type), 'fields', {})
+    return 'edges' in fields and 'pageInfo' in fields
+
+
+def analyze_query_cost(schema, document, variables=None, operation_name=None):
+    return QueryCostAnalyzer(schema, document, variables).analyze(operation_name)
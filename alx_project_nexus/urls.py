@@ -18,8 +18,6 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 from django.views.decorators.csrf import csrf_exempt
-from graphene_django.views import GraphQLView
-from graphene_file_upload.django import FileUploadGraphQLView
 from rest_framework import permissions
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
@@ -28,7 +26,9 @@ from rest_framework_simplejwt.views import (
 )
 
 from alx_project_nexus import settings
+from utils.metrics import metrics_view
 from .schema import schema
+from .views import NexusGraphQLView
 
 urlpatterns = [
     path('admin/', admin.site.urls, name='admin'),
@@ -38,7 +38,8 @@ urlpatterns = [
     path('api/user/', include('user.urls')),
     path('api/post/', include('post.urls')),
     path('api/notification/', include('notification.urls')),
-    path("graphql/", csrf_exempt(FileUploadGraphQLView.as_view(graphiql=True, schema=schema))),
+    path('api/metrics/<str:namespace>/', metrics_view, name='metrics'),
+    path("graphql/", csrf_exempt(NexusGraphQLView.as_view(graphiql=True, schema=schema))),
 
 ]
 
@@ -0,0 +1,197 @@
+from django.db import connection, transaction
+from django.http import HttpResponseBadRequest, HttpResponseNotAllowed
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.views import HttpError
+from graphene_file_upload.django import FileUploadGraphQLView
+from graphql import ExecutionResult, GraphQLError, OperationType, execute, get_operation_ast, validate_schema
+from graphql_jwt.exceptions import JSONWebTokenError
+from graphql_jwt.shortcuts import get_user_by_token
+from graphql_jwt.utils import get_http_authorization
+
+from alx_project_nexus.persisted_queries import get_document, get_persisted_query, get_requested_hash
+from alx_project_nexus.query_cost import analyze_query_cost
+from alx_project_nexus.settings import GRAPHQL_MAX_QUERY_COST, GRAPHQL_MAX_QUERY_DEPTH, GRAPHQL_COST_BUDGET, \
+    GRAPHQL_COST_WINDOW, GRAPHQL_PERSISTED_QUERIES_STRICT
+from user.utils.location import get_client_ip
+from utils import metrics
+from utils.redis_client import redis_client
+
+GRAPHQL_COST_KEY = "graphql_cost:{client}"
+METRICS_NAMESPACE = "graphql_cost"
+
+
+def get_token_user(request):
+    """
+    Get the user of the JWT sent with a request.
+    graphql_jwt authenticates in the resolver middleware, after the cost is charged, so the token is read here.
+    :param request:
+    :return: the user, or None without a valid token
+    """
+    token = get_http_authorization(request)
+    if not token:
+        return None
+    try:
+        return get_user_by_token(token, request)
+    except JSONWebTokenError:
+        return None
+
+
+def get_client_key(request):
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        user = get_token_user(request)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.id}"
+    return f"ip:{get_client_ip(request)}"
+
+
+def consume_cost_budget(client, cost):
+    """
+    Add the cost of an operation to the client's rolling budget, in the same way the email rate limit works.
+    :param client:
+    :param cost:
+    :return: the cost spent by the client in the current window
+    """
+    key = GRAPHQL_COST_KEY.format(client=client)
+    spent = redis_client.incrby(key, cost)
+    if spent == cost:
+        redis_client.expire(key, GRAPHQL_COST_WINDOW)
+    return spent
+
+
+class NexusGraphQLView(FileUploadGraphQLView):
+    """
+    GraphQL endpoint with persisted queries and static query cost analysis.
+    Clients may send the sha256 hash of a registered document instead of its text, and every document is
+    parsed and validated once per worker through an LRU cache. With GRAPHQL_PERSISTED_QUERIES_STRICT only
+    registered documents are executed.
+    Every operation is costed before it runs, operations deeper than GRAPHQL_MAX_QUERY_DEPTH or costlier than
+    GRAPHQL_MAX_QUERY_COST are rejected, and each client may spend GRAPHQL_COST_BUDGET per GRAPHQL_COST_WINDOW
+    seconds. The computed cost is returned in the `extensions` of the response.
+    """
+
+    def execute_graphql_request(self, request, data, query, variables, operation_name, show_graphiql=False):
+        try:
+            query = self.resolve_query(request, data, query)
+        except GraphQLError as e:
+            return ExecutionResult(data=None, errors=[e])
+
+        if not query:
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseBadRequest("Must provide query string."))
+
+        schema = self.schema.graphql_schema
+        schema_validation_errors = validate_schema(schema)
+        if schema_validation_errors:
+            return ExecutionResult(data=None, errors=schema_validation_errors)
+
+        validation_rules = tuple(self.validation_rules) if self.validation_rules else None
+        try:
+            document, validation_errors = get_document(schema, query, validation_rules)
+        except GraphQLError as e:
+            return ExecutionResult(errors=[e])
+
+        operation_ast = get_operation_ast(document, operation_name)
+        if (
+            request.method.lower() == "get"
+            and operation_ast is not None
+            and operation_ast.operation != OperationType.QUERY
+        ):
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseNotAllowed(
+                ["POST"], f"Can only perform a {operation_ast.operation.value} operation from a POST request."))
+
+        if validation_errors:
+            return ExecutionResult(data=None, errors=list(validation_errors))
+
+        error = self.check_query_cost(request, document, variables, operation_name)
+        if error:
+            return ExecutionResult(data=None, errors=[error])
+
+        return self.execute_document(request, document, variables, operation_name, operation_ast)
+
+    def resolve_query(self, request, data, query):
+        """
+        Replace the hash of a persisted query with its registered document.
+        An unknown hash falls back to the query text sent along with it, unless strict mode is enabled.
+        :return: the query text to execute
+        """
+        digest = get_requested_hash(request, data)
+        persisted = get_persisted_query(digest) if digest else None
+        if persisted is not None:
+            return persisted
+
+        if GRAPHQL_PERSISTED_QUERIES_STRICT and (query or digest):
+            raise GraphQLError("Only persisted queries are allowed.")
+        if digest and not query:
+            raise GraphQLError("PersistedQueryNotFound")
+        return query
+
+    def execute_document(self, request, document, variables, operation_name, operation_ast):
+        try:
+            execute_options = {
+                "root_value": self.get_root_value(request),
+                "context_value": self.get_context(request),
+                "variable_values": variables,
+                "operation_name": operation_name,
+                "middleware": self.get_middleware(request),
+            }
+            if self.execution_context_class:
+                execute_options["execution_context_class"] = self.execution_context_class
+
+            if (
+                operation_ast is not None
+                and operation_ast.operation == OperationType.MUTATION
+                and (
+                    graphene_settings.ATOMIC_MUTATIONS is True
+                    or connection.settings_dict.get("ATOMIC_MUTATIONS", False) is True
+                )
+            ):
+                with transaction.atomic():
+                    result = execute(self.schema.graphql_schema, document, **execute_options)
+                    if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                        transaction.set_rollback(True)
+                return result
+
+            return execute(self.schema.graphql_schema, document, **execute_options)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+    def check_query_cost(self, request, document, variables, operation_name):
+        """
+        Cost the operation and charge it to the client's budget.
+        :return: a GraphQLError when the operation must be rejected, otherwise None
+        """
+        query_cost = analyze_query_cost(self.schema.graphql_schema, document, variables, operation_name)
+        request.graphql_cost = {
+            "cost": query_cost.cost,
+            "depth": query_cost.depth,
+            "maxCost": GRAPHQL_MAX_QUERY_COST,
+            "maxDepth": GRAPHQL_MAX_QUERY_DEPTH,
+        }
+
+        if query_cost.depth > GRAPHQL_MAX_QUERY_DEPTH:
+            return GraphQLError(
+                f"Query depth {query_cost.depth} exceeds the maximum depth of {GRAPHQL_MAX_QUERY_DEPTH}.")
+        if query_cost.cost > GRAPHQL_MAX_QUERY_COST:
+            return GraphQLError(
+                f"Query cost {query_cost.cost} exceeds the maximum cost of {GRAPHQL_MAX_QUERY_COST}.")
+
+        client = get_client_key(request)
+        spent = consume_cost_budget(client, query_cost.cost)
+        request.graphql_cost["remainingBudget"] = max(GRAPHQL_COST_BUDGET - spent, 0)
+        metrics.record(METRICS_NAMESPACE, operations=1, total_cost=query_cost.cost)
+
+        if spent > GRAPHQL_COST_BUDGET:
+            metrics.record(METRICS_NAMESPACE, throttled=1)
+            return GraphQLError("Query cost budget exhausted, please try again later.")
+        return None
+
+    def json_encode(self, request, d, pretty=False):
+        query_cost = getattr(request, 'graphql_cost', None)
+        if query_cost is not None and isinstance(d, dict):
+            d = {**d, "extensions": {"cost": query_cost}}
+        return super().json_encode(request, d, pretty)
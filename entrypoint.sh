@@ -10,6 +10,7 @@ echo "Postgres is ready"
 # Run Django setup commands
 python manage.py makemigrations
 python manage.py migrate
+python manage.py setup_periodic_tasks
 python manage.py collectstatic --noinput
 
 # Start ASGI server
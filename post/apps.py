@@ -1,5 +1,3 @@
-import os
-
 from django.apps import AppConfig
 
 
@@ -8,7 +6,4 @@ class PostConfig(AppConfig):
     name = 'post'
 
     def ready(self):
-        # if os.environ.get('RUN_MAIN') == 'true':
-        #     from .beat_setup import create_periodic_task
-        #     create_periodic_task()
-        import post.signals
\ No newline at end of file
+        import post.signals
@@ -1,5 +1,6 @@
 from django_celery_beat.models import IntervalSchedule
 
+from alx_project_nexus.settings import VIEW_FLUSH_INTERVAL
 from utils.celery_beats import create_or_update_task
 
 
@@ -7,6 +8,10 @@ def create_periodic_task():
     """
     Create a periodic task to update expired stories.
     This task runs every minute and checks for stories that have expired.
+    Hourly tasks repair the engagement counters, delete the expired uploads and requeue the moderation of
+    posts and stories left pending.
+    The trending hashtags are checkpointed with the expired stories, every five minutes.
+    The buffered views are flushed every VIEW_FLUSH_INTERVAL seconds.
     :return:
     """
     schedule, _ = IntervalSchedule.objects.get_or_create(
@@ -14,3 +19,18 @@ def create_periodic_task():
         period=IntervalSchedule.MINUTES,
     )
     create_or_update_task("Update Expired Stories", "post.tasks.delete_expired_stories", schedule)
+    create_or_update_task("Checkpoint Trending Hashtags", "post.tasks.checkpoint_trending_hashtags", schedule)
+
+    hourly, _ = IntervalSchedule.objects.get_or_create(
+        every=1,
+        period=IntervalSchedule.HOURS,
+    )
+    create_or_update_task("Reconcile Engagement Counters", "post.tasks.reconcile_engagement_counters", hourly)
+    create_or_update_task("Delete Expired Uploads", "post.tasks.delete_expired_uploads", hourly)
+    create_or_update_task("Requeue Pending Moderation", "post.tasks.requeue_pending_moderation", hourly)
+
+    frequent, _ = IntervalSchedule.objects.get_or_create(
+        every=VIEW_FLUSH_INTERVAL,
+        period=IntervalSchedule.SECONDS,
+    )
+    create_or_update_task("Flush Buffered Views", "post.tasks.flush_views", frequent)
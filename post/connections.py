@@ -0,0 +1,160 @@
+import json
+
+import graphene
+from django.db import connection as db_connection
+from django.db.models import BooleanField, F, Func, Value
+from graphene import relay
+from graphene_django.utils import maybe_queryset
+from graphql import GraphQLError
+from graphql_relay.utils import base64, unbase64
+
+from post.loaders import BatchedConnectionField
+
+KEYSET_FIELDS = ('created_at', 'id')
+CURSOR_PREFIX = "keyset:"
+
+
+class RowValueCompare(Func):
+    """
+    Row-value comparison such as (created_at, id) < (%s, %s).
+    Postgres answers it with a single range scan of a (created_at, id) index.
+    """
+    output_field = BooleanField()
+
+    def __init__(self, fields, operator, values):
+        self.operator = operator
+        super().__init__(*fields, *values)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        parts, params = [], []
+        for expression in self.get_source_expressions():
+            sql, expression_params = compiler.compile(expression)
+            parts.append(sql)
+            params.extend(expression_params)
+
+        half = len(parts) // 2
+        return f"({', '.join(parts[:half])}) {self.operator} ({', '.join(parts[half:])})", params
+
+
+def encode_cursor(node):
+    return base64(f"{CURSOR_PREFIX}{node.created_at.isoformat()}|{node.id}")
+
+
+def decode_cursor(model, cursor):
+    """
+    Decode a keyset cursor into the (created_at, id) values it points at.
+    :param model:
+    :param cursor:
+    :return: the values converted by the model fields
+    """
+    try:
+        value = unbase64(cursor)
+        if not value.startswith(CURSOR_PREFIX):
+            raise ValueError(cursor)
+        created_at, pk = value[len(CURSOR_PREFIX):].split('|')
+        return [model._meta.get_field(field).to_python(raw) for field, raw in zip(KEYSET_FIELDS, (created_at, pk))]
+    except Exception:
+        raise GraphQLError("Invalid cursor.")
+
+
+def keyset_filter(queryset, cursor, operator):
+    values = decode_cursor(queryset.model, cursor)
+    return queryset.filter(RowValueCompare(
+        [F(field) for field in KEYSET_FIELDS],
+        operator,
+        [Value(value, output_field=queryset.model._meta.get_field(field)) for field, value in zip(KEYSET_FIELDS, values)],
+    ))
+
+
+def estimate_count(queryset):
+    """
+    Estimate the number of rows of a queryset from the Postgres planner statistics.
+    :param queryset:
+    :return: the estimated row count, or None on other databases
+    """
+    if db_connection.vendor != 'postgresql':
+        return None
+
+    plan = queryset.order_by().explain(format='json')
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetConnection(relay.Connection):
+    """
+    Relay connection paged by KeysetConnectionField.
+    totalCount runs a COUNT(*) of the filtered queryset and is only computed when it is requested,
+    estimatedTotalCount reads the planner estimate instead.
+    """
+
+    class Meta:
+        abstract = True
+
+    total_count = graphene.Int()
+    estimated_total_count = graphene.Int()
+
+    def resolve_total_count(self, info):
+        return self.iterable.count()
+
+    def resolve_estimated_total_count(self, info):
+        return estimate_count(self.iterable)
+
+
+class KeysetConnectionField(BatchedConnectionField):
+    """
+    Connection field that pages with opaque (created_at, id) cursors instead of offsets.
+    Every page is a `WHERE (created_at, id) < (...)` range read, newest first, so deep pages cost the same
+    as the first one and no COUNT(*) is run unless totalCount is requested.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._base_args.pop('offset', None)
+
+    @classmethod
+    def resolve_connection(cls, connection, args, iterable, max_limit=None):
+        queryset = maybe_queryset(iterable)
+        first = args.get('first')
+        last = args.get('last')
+        after = args.get('after')
+        before = args.get('before')
+        for name, value in (('first', first), ('last', last)):
+            if value is not None and value < 0:
+                raise GraphQLError(f"Argument `{name}` must be a non-negative integer.")
+        if first is None and last is None:
+            first = max_limit
+
+        window = queryset
+        if after:
+            window = keyset_filter(window, after, '<')
+        if before:
+            window = keyset_filter(window, before, '>')
+
+        if first is None:
+            rows = list(window.order_by(*KEYSET_FIELDS)[:last + 1])
+            has_previous_page = len(rows) > last
+            rows = rows[:last][::-1]
+            has_next_page = before is not None
+        else:
+            rows = list(window.order_by(*(f'-{field}' for field in KEYSET_FIELDS))[:first + 1])
+            has_next_page = len(rows) > first
+            rows = rows[:first]
+            has_previous_page = after is not None
+            if last is not None and len(rows) > last:
+                rows = rows[-last:]
+                has_previous_page = True
+
+        edges = [connection.Edge(node=node, cursor=encode_cursor(node)) for node in rows]
+        resolved = connection(
+            edges=edges,
+            page_info=relay.PageInfo(
+                start_cursor=edges[0].cursor if edges else None,
+                end_cursor=edges[-1].cursor if edges else None,
+                has_previous_page=has_previous_page,
+                has_next_page=has_next_page,
+            ),
+        )
+        resolved.iterable = queryset
+        resolved.length = len(rows)
+        return resolved
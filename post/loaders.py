@@ -0,0 +1,131 @@
+from django.db.models import Count
+from graphene_django.filter import DjangoFilterConnectionField
+
+from post.models import Post, Like
+from user.models import Follow, User
+from user.utils.followees import get_followee_ids
+
+
+class BatchLoader:
+    """
+    Request-scoped batch loader for GraphQL resolvers.
+    Keys are collected with prime() while a list of nodes is resolved, and the first load() that
+    misses the cache answers every pending key with a single call to the batch function.
+    The batch function receives a list of keys and returns a dict of key to value.
+    """
+
+    def __init__(self, batch_load_fn, default=None):
+        self.batch_load_fn = batch_load_fn
+        self.default = default
+        self.cache = {}
+        self.pending = set()
+
+    def prime(self, keys):
+        self.pending.update(key for key in keys if key not in self.cache)
+
+    def put(self, key, value):
+        self.cache[key] = value
+        self.pending.discard(key)
+
+    def load(self, key):
+        if key not in self.cache:
+            self.pending.add(key)
+            keys = list(self.pending)
+            self.pending.clear()
+            results = self.batch_load_fn(keys)
+            for pending_key in keys:
+                self.cache[pending_key] = results.get(pending_key, self.default)
+        return self.cache[key]
+
+
+def load_authors(user_ids):
+    return User.objects.in_bulk(user_ids)
+
+
+def load_user_counts(user_ids):
+    """
+    Count followers, followings and posts for a batch of users with one grouped query per kind.
+    :param user_ids:
+    :return:
+    """
+    followers = dict(Follow.objects.filter(following_id__in=user_ids).order_by().values(
+        'following_id').annotate(total=Count('id')).values_list('following_id', 'total'))
+    following = dict(Follow.objects.filter(follower_id__in=user_ids).order_by().values(
+        'follower_id').annotate(total=Count('id')).values_list('follower_id', 'total'))
+    posts = dict(Post.objects.filter(author_id__in=user_ids).order_by().values(
+        'author_id').annotate(total=Count('id')).values_list('author_id', 'total'))
+
+    return {
+        user_id: {
+            'followers': followers.get(user_id, 0),
+            'following': following.get(user_id, 0),
+            'posts': posts.get(user_id, 0),
+        }
+        for user_id in user_ids
+    }
+
+
+class Loaders:
+    """
+    The batch loaders of one GraphQL operation, bound to the viewer of the request.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.liked = BatchLoader(self.load_liked, default=False)
+        self.following_author = BatchLoader(self.load_following_author, default=False)
+        self.user_counts = BatchLoader(load_user_counts)
+        self.authors = BatchLoader(load_authors)
+
+    def load_liked(self, post_ids):
+        liked = set(Like.objects.filter(user=self.user, post_id__in=post_ids).values_list('post_id', flat=True))
+        return {post_id: post_id in liked for post_id in post_ids}
+
+    def load_following_author(self, author_ids):
+        followees = set(get_followee_ids(self.user.id))
+        return {author_id: str(author_id) in followees for author_id in author_ids}
+
+    def prime_posts(self, posts):
+        """
+        Register every post of a page so the per-node resolvers are answered in one batch.
+        :param posts:
+        :return:
+        """
+        for post in posts:
+            if Post.author.is_cached(post):
+                self.authors.put(post.author_id, post.author)
+        self.authors.prime(post.author_id for post in posts)
+
+        if self.user.is_authenticated:
+            self.liked.prime(post.id for post in posts)
+            self.following_author.prime(post.author_id for post in posts)
+
+
+def get_loaders(info):
+    """
+    Get the loaders of the current operation, creating them on first use.
+    They are stored on the request so they live exactly as long as the operation.
+    :param info:
+    :return:
+    """
+    loaders = getattr(info.context, 'loaders', None)
+    if loaders is None:
+        loaders = Loaders(info.context.user)
+        info.context.loaders = loaders
+    return loaders
+
+
+class BatchedConnectionField(DjangoFilterConnectionField):
+    """
+    DjangoFilterConnectionField that primes the batch loaders with the nodes of the resolved page.
+    """
+
+    @classmethod
+    def connection_resolver(cls, resolver, connection, default_manager, queryset_resolver, max_limit,
+                            enforce_first_or_last, root, info, **args):
+        resolved = super().connection_resolver(resolver, connection, default_manager, queryset_resolver, max_limit,
+                                               enforce_first_or_last, root, info, **args)
+        posts = [edge.node for edge in resolved.edges if isinstance(edge.node, Post)]
+        if posts:
+            get_loaders(info).prime_posts(posts)
+        return resolved
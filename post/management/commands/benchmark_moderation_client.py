@@ -0,0 +1,54 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management import BaseCommand
+
+from alx_project_nexus.settings import MODERATION_BATCH_SIZE
+from post.utils.fake_model_server import FakeModelServer, TOXIC_WORDS
+from post.utils.moderation_client import ModerationClient
+
+WORDS = ['sunset', 'coffee', 'beach', 'friends', 'weekend', 'city', 'music', 'travel'] + sorted(TOXIC_WORDS)
+
+
+class Command(BaseCommand):
+    """
+    Command to compare the moderation throughput with and without micro-batching.
+    It classifies random captions from concurrent threads, first with batches of one text then with
+    MODERATION_BATCH_SIZE, against a local fake model server with a fixed latency or against --url.
+    Usage:
+        python manage.py benchmark_moderation_client --requests 2000 --concurrency 32 --latency 20
+    """
+    help = 'Benchmark the batching moderation client'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Number of classified captions per run')
+        parser.add_argument('--concurrency', type=int, default=32, help='Number of classifying threads')
+        parser.add_argument('--latency', type=float, default=20, help='Fake model latency per request, in ms')
+        parser.add_argument('--url', help='Benchmark a real model API instead of the fake server')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **kwargs):
+        rng = random.Random(kwargs['seed'])
+        captions = [' '.join(rng.choices(WORDS, k=6)) for _ in range(kwargs['requests'])]
+
+        if kwargs['url']:
+            self.run(kwargs['url'], captions, kwargs['concurrency'])
+        else:
+            with FakeModelServer(latency=kwargs['latency'] / 1000) as server:
+                self.run(server.url, captions, kwargs['concurrency'])
+
+        self.stdout.write(self.style.SUCCESS('Benchmark finished'))
+
+    def run(self, url, captions, concurrency):
+        for name, batch_size in (('unbatched', 1), ('batched', MODERATION_BATCH_SIZE)):
+            client = ModerationClient(url=url, batch_size=batch_size)
+            try:
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                    list(executor.map(client.classify, captions))
+                elapsed = time.perf_counter() - started
+            finally:
+                client.close()
+            self.stdout.write(f"{name} (batch size {batch_size}): {len(captions) / elapsed:.0f} captions/s, "
+                              f"{elapsed:.2f}s")
@@ -0,0 +1,66 @@
+import random
+import string
+import time
+
+from django.core.management import BaseCommand
+
+from utils import typeahead
+
+BENCHMARK_INDEX = "benchmark"
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    """
+    Command to measure the typeahead lookup latency on a synthetic index.
+    It fills a separate index with random names whose popularity follows a power law, runs lookups for
+    prefixes of 1 to 6 characters taken from those names, prints the latency percentiles and deletes the index.
+    Usage:
+        python manage.py benchmark_typeahead --entries 1000000 --queries 10000
+    """
+    help = 'Benchmark the typeahead index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entries', type=int, default=1000000, help='Number of indexed names')
+        parser.add_argument('--queries', type=int, default=10000, help='Number of timed lookups')
+        parser.add_argument('--target-ms', type=float, default=5.0, help='p99 latency target in milliseconds')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark index afterwards')
+
+    def handle(self, *args, **kwargs):
+        rng = random.Random(kwargs['seed'])
+        typeahead.clear(BENCHMARK_INDEX)
+
+        self.stdout.write(f"Indexing {kwargs['entries']} names")
+        started = time.perf_counter()
+        names = []
+        batch = {}
+        for i in range(kwargs['entries']):
+            name = ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 12))) + str(i)
+            names.append(name)
+            batch[name] = int(rng.paretovariate(1.2))
+            if len(batch) == BATCH_SIZE:
+                typeahead.update(BENCHMARK_INDEX, batch, mode='set')
+                batch = {}
+        typeahead.update(BENCHMARK_INDEX, batch, mode='set')
+        self.stdout.write(f"Indexed in {time.perf_counter() - started:.1f}s")
+
+        latencies = []
+        for _ in range(kwargs['queries']):
+            name = rng.choice(names)
+            prefix = name[:rng.randint(1, 6)]
+            started = time.perf_counter()
+            typeahead.complete(BENCHMARK_INDEX, prefix, 10)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+        latencies.sort()
+        percentiles = {p: latencies[min(int(len(latencies) * p / 100), len(latencies) - 1)] for p in (50, 95, 99)}
+        self.stdout.write(', '.join(f"p{p} {value:.3f} ms" for p, value in percentiles.items()))
+
+        if not kwargs['keep']:
+            typeahead.clear(BENCHMARK_INDEX)
+
+        if percentiles[99] <= kwargs['target_ms']:
+            self.stdout.write(self.style.SUCCESS(f"p99 is within the {kwargs['target_ms']} ms target"))
+        else:
+            self.stdout.write(self.style.ERROR(f"p99 is above the {kwargs['target_ms']} ms target"))
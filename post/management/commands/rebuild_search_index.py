@@ -0,0 +1,18 @@
+from django.core.management import BaseCommand
+
+from post.utils.search import get_search_backend
+
+
+class Command(BaseCommand):
+    """
+    Command to rebuild the full-text search index of every post.
+    The index is kept up to date by the post signals, this is only needed to backfill existing posts
+    or after changing the SEARCH_CONFIG setting.
+    Usage:
+        python manage.py rebuild_search_index
+    """
+    help = 'Rebuild the post search index'
+
+    def handle(self, *args, **kwargs):
+        total = get_search_backend().rebuild()
+        self.stdout.write(self.style.SUCCESS(f'{total} posts indexed'))
@@ -0,0 +1,48 @@
+from django.core.management import BaseCommand
+from django.db.models import Count
+
+from post.models import Hashtag
+from user.models import User
+from utils import typeahead
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    """
+    Command to rebuild the hashtag and username typeahead indexes from the database.
+    Hashtags are ranked by their number of posts and users by their number of followers.
+    Usage:
+        python manage.py rebuild_typeahead
+    or
+        python manage.py rebuild_typeahead --index users
+    """
+    help = 'Rebuild the typeahead indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--index', choices=[typeahead.HASHTAG_INDEX, typeahead.USER_INDEX],
+                            help='Only rebuild one index')
+
+    def handle(self, *args, **kwargs):
+        sources = {
+            typeahead.HASHTAG_INDEX: Hashtag.objects.values_list('name', 'post_count'),
+            typeahead.USER_INDEX: User.objects.annotate(total=Count('followers')).values_list('username', 'total'),
+        }
+
+        for kind, rows in sources.items():
+            if kwargs['index'] and kwargs['index'] != kind:
+                continue
+
+            typeahead.clear(kind)
+            batch = {}
+            total = 0
+            for name, score in rows.iterator(chunk_size=BATCH_SIZE):
+                batch[name] = score
+                if len(batch) == BATCH_SIZE:
+                    typeahead.update(kind, batch, mode='set')
+                    total += len(batch)
+                    batch = {}
+            typeahead.update(kind, batch, mode='set')
+            total += len(batch)
+
+            self.stdout.write(self.style.SUCCESS(f'{total} {kind} indexed'))
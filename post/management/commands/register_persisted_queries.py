@@ -0,0 +1,35 @@
+import json
+from pathlib import Path
+
+from django.core.management import BaseCommand, CommandError
+from graphql import GraphQLError
+
+from alx_project_nexus.persisted_queries import register_query
+
+
+class Command(BaseCommand):
+    """
+    Command to register GraphQL documents as persisted queries.
+    Each file holds one document, and a manifest of hashes to file names is printed so the clients
+    can send the hashes instead of the documents.
+    Usage:
+        python manage.py register_persisted_queries queries/feed.graphql queries/profile.graphql
+    """
+    help = 'Register GraphQL documents as persisted queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+', help='GraphQL documents to register')
+
+    def handle(self, *args, **kwargs):
+        manifest = {}
+        for file in kwargs['files']:
+            path = Path(file)
+            try:
+                manifest[register_query(path.read_text())] = path.name
+            except OSError as e:
+                raise CommandError(f'Could not read {file}: {e}')
+            except GraphQLError as e:
+                raise CommandError(f'{file} is not a valid GraphQL document: {e.message}')
+
+        self.stdout.write(json.dumps(manifest, indent=2))
+        self.stdout.write(self.style.SUCCESS(f'{len(manifest)} queries registered'))
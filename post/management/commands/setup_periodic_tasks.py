@@ -0,0 +1,17 @@
+from django.core.management import BaseCommand
+
+from post.beat_setup import create_periodic_task
+
+
+class Command(BaseCommand):
+    """
+    Command to register the periodic tasks of the post app in the Celery beat database scheduler.
+    It is idempotent, existing tasks are updated to the current schedule, so it runs on every deploy after migrate.
+    Usage:
+        python manage.py setup_periodic_tasks
+    """
+    help = 'Register the periodic tasks with Celery beat'
+
+    def handle(self, *args, **kwargs):
+        create_periodic_task()
+        self.stdout.write(self.style.SUCCESS('Periodic tasks registered'))
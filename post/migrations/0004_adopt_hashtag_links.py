@@ -0,0 +1,100 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def backfill_created_at(apps, schema_editor):
+    """
+    Copy the creation time of the post or story to the links, the column was added with the migration time.
+    """
+    for link_name, owner_name, fk_field in (('PostHashtag', 'Post', 'post'), ('StoryHashtag', 'Story', 'story')):
+        link = apps.get_model('post', link_name)
+        owner = apps.get_model('post', owner_name)
+        link.objects.update(created_at=Subquery(
+            owner.objects.filter(pk=OuterRef(f'{fk_field}_id')).values('created_at')[:1]))
+
+
+class Migration(migrations.Migration):
+    """
+    Turn the implicit many-to-many of Post.hashtags and Story.hashtags into the PostHashtag and StoryHashtag
+    link models.
+    Django does not alter a many-to-many to an explicit through model, so the link models adopt the tables of
+    the implicit many-to-many in the state only: post_post_hashtags and post_story_hashtags already have the id,
+    the foreign key columns and the unique constraint of the models, and the existing links are kept as they are.
+    The database operations then add what the tables lack, the created_at column, backfilled from the post or
+    story, and the hashtag feed index.
+    """
+
+    dependencies = [
+        ('post', '0003_mediablob_trendinghashtag_upload_and_more'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='PostHashtag',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False,
+                                                   verbose_name='ID')),
+                        ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                                   related_name='hashtag_links', to='post.post')),
+                        ('hashtag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                                      related_name='post_links', to='post.hashtag')),
+                    ],
+                    options={
+                        'db_table': 'post_post_hashtags',
+                        'unique_together': {('post', 'hashtag')},
+                    },
+                ),
+                migrations.CreateModel(
+                    name='StoryHashtag',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False,
+                                                   verbose_name='ID')),
+                        ('story', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                                    related_name='hashtag_links', to='post.story')),
+                        ('hashtag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                                      related_name='story_links', to='post.hashtag')),
+                    ],
+                    options={
+                        'db_table': 'post_story_hashtags',
+                        'unique_together': {('story', 'hashtag')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='post',
+                    name='hashtags',
+                    field=models.ManyToManyField(related_name='posts', through='post.PostHashtag',
+                                                 to='post.hashtag'),
+                ),
+                migrations.AlterField(
+                    model_name='story',
+                    name='hashtags',
+                    field=models.ManyToManyField(related_name='story', through='post.StoryHashtag',
+                                                 to='post.hashtag'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='posthashtag',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='storyhashtag',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        # The indexes go before the backfill, Postgres does not alter a table with pending trigger events.
+        migrations.AddIndex(
+            model_name='posthashtag',
+            index=models.Index(fields=['hashtag', 'created_at', 'post'], name='posthashtag_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='storyhashtag',
+            index=models.Index(fields=['hashtag', 'created_at', 'story'], name='storyhashtag_feed_idx'),
+        ),
+        migrations.RunPython(backfill_created_at, migrations.RunPython.noop),
+    ]
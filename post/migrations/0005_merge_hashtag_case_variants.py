@@ -0,0 +1,51 @@
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models.functions import Lower
+
+
+def merge_case_variants(apps, schema_editor):
+    """
+    Merge the hashtags differing only by case into their lowercase row, hashtags are now stored lowercase.
+    The links of the variants move to the lowercase row, a post or story already linked to it keeps its link,
+    and the post count of the merged row is recounted.
+    """
+    Hashtag = apps.get_model('post', 'Hashtag')
+    PostHashtag = apps.get_model('post', 'PostHashtag')
+    StoryHashtag = apps.get_model('post', 'StoryHashtag')
+    TrendingHashtag = apps.get_model('post', 'TrendingHashtag')
+
+    groups = defaultdict(list)
+    for hashtag in Hashtag.objects.exclude(name=Lower('name')).order_by('id'):
+        groups[hashtag.name.lower()].append(hashtag)
+
+    for name, variants in groups.items():
+        target = Hashtag.objects.filter(name=name).first() or variants[0]
+        others = [hashtag.pk for hashtag in variants if hashtag.pk != target.pk]
+        for other in others:
+            for link_model, fk_field in ((PostHashtag, 'post_id'), (StoryHashtag, 'story_id')):
+                linked = link_model.objects.filter(hashtag=target).values(fk_field)
+                link_model.objects.filter(hashtag_id=other, **{f'{fk_field}__in': linked}).delete()
+                link_model.objects.filter(hashtag_id=other).update(hashtag=target)
+        if not TrendingHashtag.objects.filter(hashtag=target).exists():
+            trending = TrendingHashtag.objects.filter(hashtag_id__in=others).order_by('-score').first()
+            if trending is not None:
+                trending.hashtag = target
+                trending.save(update_fields=['hashtag'])
+        Hashtag.objects.filter(pk__in=others).delete()
+
+        target.name = name
+        target.post_count = PostHashtag.objects.filter(hashtag=target, post__moderation_status='published',
+                                                       post__is_deleted=False).count()
+        target.save(update_fields=['name', 'post_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0004_adopt_hashtag_links'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_case_variants, migrations.RunPython.noop),
+    ]
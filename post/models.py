@@ -1,7 +1,44 @@
 import uuid
 from mptt.models import MPTTModel, TreeForeignKey
 
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.utils import timezone
+
+
+class ModerationStatus(models.TextChoices):
+    PENDING = 'pending', 'Pending'
+    PUBLISHED = 'published', 'Published'
+    REJECTED = 'rejected', 'Rejected'
+
+
+class UploadStatus(models.TextChoices):
+    PENDING = 'pending', 'Pending'
+    COMPLETE = 'complete', 'Complete'
+    CONSUMED = 'consumed', 'Consumed'
+
+
+class MediaBlob(models.Model):
+    """
+    Represents an image of the content-addressed media store.
+    Each blob is stored once under the sha256 of its uploaded bytes, and posts or stories uploading the same bytes
+    share it instead of storing a copy. The stored file is the upload stripped of its metadata.
+    The phash and dhash fields hold the perceptual hashes of the image as signed 64 bit integers,
+    the phash_band fields split the pHash in four indexed 16 bit bands for the near-duplicate lookup.
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    file = models.FileField(upload_to='blobs/')
+    size = models.PositiveBigIntegerField()
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    phash = models.BigIntegerField()
+    dhash = models.BigIntegerField()
+    phash_band0 = models.PositiveIntegerField(db_index=True)
+    phash_band1 = models.PositiveIntegerField(db_index=True)
+    phash_band2 = models.PositiveIntegerField(db_index=True)
+    phash_band3 = models.PositiveIntegerField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
 
 
 class Hashtag(models.Model):
@@ -11,8 +48,10 @@ class Hashtag(models.Model):
     The name is stored as a CharField with a maximum length of 100 characters.
     The __str__ method returns the hashtag name prefixed with a hash symbol.
     This model is used to categorize posts and allow users to search for content related to specific topics
+    The post_count field caches the number of posts tagged with the hashtag, kept in sync by the m2m signals.
     """
     name = models.CharField(max_length=100, unique=True)
+    post_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f"#{self.name}"
@@ -26,6 +65,15 @@ class Post(models.Model):
     The created_at and updated_at fields track when the post was created and last updated.
     The is_deleted field is used to mark a post as deleted without actually removing it from the
     database.
+    The like_count, comment_count and view_count fields are denormalized engagement counters kept in sync
+    by the like, comment and view signals.
+    The search_vector field holds the full-text document of the caption and hashtags, it is kept up to date
+    by the post signals and answered by a GIN index.
+    The moderation_status field is set to pending when a caption is written through the API, the moderation
+    task then publishes or rejects the post. Posts that are not published are only visible to their author.
+    The image_variants field describes the resized, re-encoded copies of the image, generated by a task
+    after each upload, which also computes the image_blurhash placeholder shown while the image loads.
+    The media field is the blob of the media store holding the image, shared by the posts uploading the same bytes.
     The __str__ method returns the caption of the post.
     The Meta class specifies the ordering of posts by creation date in descending order
     and sets a verbose name for the model.
@@ -34,14 +82,28 @@ class Post(models.Model):
     caption = models.TextField()
     author = models.ForeignKey('user.User', on_delete=models.CASCADE, related_name='posts')
     image = models.ImageField(upload_to='posts')
-    hashtags = models.ManyToManyField(Hashtag, related_name='posts')
+    hashtags = models.ManyToManyField(Hashtag, related_name='posts', through='PostHashtag')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_deleted = models.BooleanField(default=False)
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    view_count = models.PositiveIntegerField(default=0)
+    moderation_status = models.CharField(max_length=10, choices=ModerationStatus.choices,
+                                         default=ModerationStatus.PUBLISHED)
+    search_vector = SearchVectorField(null=True, editable=False)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    image_blurhash = models.CharField(max_length=100, blank=True, editable=False)
+    media = models.ForeignKey(MediaBlob, on_delete=models.SET_NULL, related_name='posts', null=True, blank=True,
+                              editable=False)
 
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Post'
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='post_created_at_id_idx'),
+            GinIndex(fields=['search_vector'], name='post_search_vector_idx'),
+        ]
 
 
 class Story(models.Model):
@@ -50,6 +112,9 @@ class Story(models.Model):
     Each story has a unique identifier, a caption, an image, an author (user),
     and an expiration date.
     The created_at field tracks when the story was created.
+    The like_count and view_count fields are denormalized engagement counters kept in sync
+    by the story like and story view signals.
+    The moderation_status, image_variants, image_blurhash and media fields work as on Post.
     The Meta class specifies the ordering of stories by creation date in descending order
     and sets a verbose name for the model.
     """
@@ -57,15 +122,74 @@ class Story(models.Model):
     caption = models.TextField()
     image = models.ImageField(upload_to='stories/')
     author = models.ForeignKey('user.User', on_delete=models.CASCADE, related_name='stories')
-    hashtags = models.ManyToManyField(Hashtag, related_name='story')
+    hashtags = models.ManyToManyField(Hashtag, related_name='story', through='StoryHashtag')
     created_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField()
     is_deleted = models.BooleanField(default=False)
     is_expired = models.BooleanField(default=False)
+    like_count = models.PositiveIntegerField(default=0)
+    view_count = models.PositiveIntegerField(default=0)
+    moderation_status = models.CharField(max_length=10, choices=ModerationStatus.choices,
+                                         default=ModerationStatus.PUBLISHED)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    image_blurhash = models.CharField(max_length=100, blank=True, editable=False)
+    media = models.ForeignKey(MediaBlob, on_delete=models.SET_NULL, related_name='stories', null=True, blank=True,
+                              editable=False)
 
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Story'
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='story_created_at_id_idx'),
+        ]
+
+
+class PostHashtag(models.Model):
+    """
+    Links a post to a hashtag.
+    The created_at field holds the creation time of the post, so a hashtag feed is a keyset range scan
+    of the (hashtag, created_at, post) index instead of a join sorted by the post table.
+    The model keeps the table of the former implicit many-to-many, see migration 0004_adopt_hashtag_links.
+    """
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='hashtag_links')
+    hashtag = models.ForeignKey(Hashtag, on_delete=models.CASCADE, related_name='post_links')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'post_post_hashtags'
+        unique_together = ('post', 'hashtag')
+        indexes = [
+            models.Index(fields=['hashtag', 'created_at', 'post'], name='posthashtag_feed_idx'),
+        ]
+
+
+class StoryHashtag(models.Model):
+    """
+    Links a story to a hashtag.
+    The created_at field holds the creation time of the story, see PostHashtag.
+    """
+    story = models.ForeignKey(Story, on_delete=models.CASCADE, related_name='hashtag_links')
+    hashtag = models.ForeignKey(Hashtag, on_delete=models.CASCADE, related_name='story_links')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'post_story_hashtags'
+        unique_together = ('story', 'hashtag')
+        indexes = [
+            models.Index(fields=['hashtag', 'created_at', 'story'], name='storyhashtag_feed_idx'),
+        ]
+
+
+class TrendingHashtag(models.Model):
+    """
+    Checkpoint of the trending hashtags engine.
+    The live scores are kept in a Redis sorted set, a periodic task saves them here so the engine
+    can be restored after Redis loses its data.
+    The score is the decayed number of uses of the hashtag at checkpointed_at.
+    """
+    hashtag = models.OneToOneField(Hashtag, on_delete=models.CASCADE, related_name='trending')
+    score = models.FloatField()
+    checkpointed_at = models.DateTimeField()
 
 
 class Like(models.Model):
@@ -85,6 +209,9 @@ class Like(models.Model):
     class Meta:
         unique_together = ('post', 'user')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='like_created_at_id_idx'),
+        ]
 
 
 class StoryLike(models.Model):
@@ -103,6 +230,9 @@ class StoryLike(models.Model):
     class Meta:
         unique_together = ('story', 'user')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='storylike_created_at_id_idx'),
+        ]
 
 
 class Comment(models.Model):
@@ -126,6 +256,9 @@ class Comment(models.Model):
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Comment'
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='comment_created_at_id_idx'),
+        ]
 
 
 class View(models.Model):
@@ -139,7 +272,7 @@ class View(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='views')
     user = models.ForeignKey('user.User', on_delete=models.CASCADE, related_name='views')
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         unique_together = ('post', 'user')
@@ -157,8 +290,34 @@ class StoryView(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     story = models.ForeignKey(Story, on_delete=models.CASCADE, related_name='views')
     user = models.ForeignKey('user.User', on_delete=models.CASCADE, related_name='story_views')
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         unique_together = ('story', 'user')
         ordering = ['-created_at']
+
+
+class Upload(models.Model):
+    """
+    Represents a resumable media upload.
+    The client declares the filename and size, then sends the file in chunks which are appended to a partial
+    file on disk, the received field holds the offset the next chunk must start at.
+    Once every byte is received the upload is completed: the image is verified and stored in the media store.
+    A post or story then references the upload by id instead of sending the file, which consumes the upload.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey('user.User', on_delete=models.CASCADE, related_name='uploads')
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=50, blank=True)
+    size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=UploadStatus.choices, default=UploadStatus.PENDING)
+    media = models.ForeignKey(MediaBlob, on_delete=models.SET_NULL, related_name='uploads', null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'updated_at'], name='upload_status_updated_idx'),
+        ]
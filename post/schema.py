@@ -4,15 +4,24 @@ import uuid
 import django_filters
 import graphene
 from django.core.files.base import ContentFile
+from django.db import transaction
 from django.db.models import Q
 from graphene import relay
 from graphene_django import DjangoObjectType
-from graphene_django.filter import DjangoFilterConnectionField
 from graphene_file_upload.scalars import Upload
 from graphql import GraphQLError
-
-from .models import Post, Like, Comment, Story, View
+from rest_framework.exceptions import APIException
+
+from .connections import KeysetConnection, KeysetConnectionField
+from .loaders import get_loaders
+from .models import ModerationStatus, Post, Story
+from .tasks import remove_post_from_timelines
+from .utils import trending
+from .utils.hashtags import sync_hashtags
+from .utils.moderation import visible_filter
+from .utils.uploads import request_media
 from user.models import User, PrivacyChoice
+from user.utils.followees import get_followee_ids
 
 
 class PostFilterSet(django_filters.FilterSet):
@@ -51,9 +60,11 @@ class PostType(DjangoObjectType):
     GraphQL type for Post model.
     This type includes fields such as id, title, caption, image, like_count, comment
     count, and author.
-    The like_count and comment_count fields are resolved dynamically to count the
-    number of likes and comments associated with the post.
+    The like_count, comment_count and view_count fields read the denormalized counters
+    stored on the post.
     The author field resolves to the UserType, representing the user who created the post.
+    The author, liked and is_following_author fields are answered by the request-scoped batch loaders.
+    The image_blurhash field is a BlurHash placeholder clients can draw until the image is downloaded.
     """
     like_count = graphene.Int()
     comment_count = graphene.Int()
@@ -65,56 +76,74 @@ class PostType(DjangoObjectType):
     class Meta:
         model = Post
         interfaces = (relay.Node,)
-        fields = ("id", "caption", "author", "created_at", 'image', 'like_count', 'comment_count')
-
-    def resolve_like_count(self, info):
-        return Like.objects.filter(post_id=self.id).count()
-
-    def resolve_comment_count(self, info):
-        return Comment.objects.filter(post_id=self.id).count()
+        connection_class = KeysetConnection
+        fields = ("id", "caption", "author", "created_at", 'image', 'image_blurhash', 'like_count', 'comment_count',
+                  'view_count')
 
     def resolve_author(self, info):
-        return self.author
-
-    def resolve_view_count(self, info):
-        return View.objects.filter(post_id=self.id).count()
+        if Post.author.is_cached(self):
+            return self.author
+        return get_loaders(info).authors.load(self.author_id)
 
     def resolve_is_following_author(self, info):
         user = info.context.user
         if not user.is_authenticated:
             return False
 
-        return self.author.followers.filter(follower=user).exists()
+        return get_loaders(info).following_author.load(self.author_id)
 
     def resolve_liked(self, info):
         user = info.context.user
         if not user.is_authenticated:
             return False
 
-        return Like.objects.filter(post_id=self.id, user=user).exists()
+        return get_loaders(info).liked.load(self.id)
 
 
 class PostInput(graphene.InputObjectType):
     caption = graphene.String(required=True)
 
 
+def mutation_media(image, upload_id, user):
+    """
+    Store the image of a mutation in the media store, or claim its chunked upload.
+    The REST errors of the uploads are turned into GraphQL errors.
+    """
+    try:
+        return request_media(image, upload_id, user)
+    except APIException as exc:
+        raise GraphQLError(str(exc.detail))
+
+
 class CreatePost(graphene.Mutation):
+    """
+    Create a post from an uploaded image, or from the upload_id of a complete chunked upload.
+    The image goes through the media store, so a repost of stored bytes reuses them.
+    """
     class Arguments:
         input = PostInput(required=True)
-        image = Upload(required=True)
+        image = Upload(required=False)
+        upload_id = graphene.UUID(required=False)
 
     post = graphene.Field(PostType)
 
-    def mutate(self, info, input, image):
+    def mutate(self, info, input, image=None, upload_id=None):
         user = info.context.user
         if not user.is_authenticated:
             raise Exception("Authentication required")
-
-        post = Post.objects.create(
-            caption=input.caption,
-            image=image,
-            author=user
-        )
+        media = mutation_media(image, upload_id, user)
+        if not media:
+            raise GraphQLError("An image or an upload_id is required.")
+
+        with transaction.atomic():
+            post = Post.objects.create(
+                caption=input.caption,
+                image=media.file.name,
+                media=media,
+                author=user,
+                moderation_status=ModerationStatus.PENDING
+            )
+            sync_hashtags(post, post.caption, created=True)
         return CreatePost(post=post)
 
 
@@ -123,21 +152,31 @@ class UpdatePost(graphene.Mutation):
         id = graphene.ID(required=True)
         caption = graphene.String(required=False)
         image = Upload(required=False)
+        upload_id = graphene.UUID(required=False)
 
     post = graphene.Field(PostType)
 
-    def mutate(self, info, id, caption=None, image=None):
+    def mutate(self, info, id, caption=None, image=None, upload_id=None):
         try:
             post = Post.objects.get(pk=id)
         except Post.DoesNotExist:
             raise GraphQLError("Post not found.")
+        media = mutation_media(image, upload_id, info.context.user)
 
-        if caption:
+        update_fields = ['updated_at']
+        if caption and caption != post.caption:
             post.caption = caption
-        if image:
-            post.image = image
-
-        post.save()
+            post.moderation_status = ModerationStatus.PENDING
+            update_fields += ['caption', 'moderation_status']
+        if media:
+            post.image = media.file.name
+            post.media = media
+            update_fields += ['image', 'media']
+
+        with transaction.atomic():
+            post.save(update_fields=update_fields)
+            if caption:
+                sync_hashtags(post, caption)
         return UpdatePost(post=post)
 
 
@@ -151,7 +190,8 @@ class DeletePost(graphene.Mutation):
         try:
             post = Post.objects.get(pk=id)
             post.is_deleted = True
-            post.save()
+            post.save(update_fields=['is_deleted', 'updated_at'])
+            remove_post_from_timelines.delay(str(post.id))
             return DeletePost(ok=True)
         except Post.DoesNotExist:
             raise GraphQLError("Post not found.")
@@ -166,28 +206,42 @@ class StoryType(DjangoObjectType):
     It also includes a field for the author, which returns the UserType.
     """
     author = graphene.Field(UserType)
+    like_count = graphene.Int()
+    view_count = graphene.Int()
 
     class Meta:
         model = Story
         interfaces = (relay.Node,)
-        fields = ("id", "caption", "author", "created_at", "expires_at")
+        connection_class = KeysetConnection
+        fields = ("id", "caption", "author", "created_at", "expires_at", "image_blurhash", "like_count", "view_count")
 
     def resolve_author(self, info):
         return self.author
 
 
+class TrendingHashtagType(graphene.ObjectType):
+    """
+    GraphQL type for a trending hashtag, the score is the time decayed number of recent uses.
+    """
+    name = graphene.String()
+    score = graphene.Float()
+
+
 class Query(graphene.ObjectType):
     """
     GraphQL query for fetching all posts and stories.
     This query allows clients to retrieve all posts amd stories with optional filtering.
-    It uses the DjangoFilterConnectionField to enable filtering based on the PostFilterSet or StoryFilterSet.
+    It uses the KeysetConnectionField to enable filtering based on the PostFilterSet or StoryFilterSet,
+    paging with (created_at, id) cursors instead of offsets.
     The resolve_all_posts method retrieves all posts from the database, selecting related
     author information to optimize database queries.
     The resolve_all_stories method retrieves all stories from the database, also selecting
     related author information.
+    The trending_hashtags field reads the most used recent hashtags from the trending engine.
     """
-    all_posts = DjangoFilterConnectionField(PostType, filterset_class=PostFilterSet)
-    all_stories = DjangoFilterConnectionField(StoryType, filterset_class=StoryFilterSet)
+    all_posts = KeysetConnectionField(PostType, filterset_class=PostFilterSet)
+    all_stories = KeysetConnectionField(StoryType, filterset_class=StoryFilterSet)
+    trending_hashtags = graphene.List(TrendingHashtagType, limit=graphene.Int(default_value=10))
 
     def resolve_all_posts(root, info, **kwargs):
         user = info.context.user
@@ -195,10 +249,10 @@ class Query(graphene.ObjectType):
         base_filter = Q(author__privacy_choice=PrivacyChoice.PUBLIC)
 
         if user.is_authenticated:
-            base_filter |= Q(author__in=User.objects.filter(followers__follower=user))
+            base_filter |= Q(author_id__in=get_followee_ids(user.id))
 
         queryset = Post.objects.select_related('author').filter(
-            Q(is_deleted=False) & base_filter
+            Q(is_deleted=False) & base_filter & visible_filter(user)
         )
 
         if user.is_authenticated:
@@ -206,16 +260,19 @@ class Query(graphene.ObjectType):
 
         return queryset.order_by('-created_at')
 
+    def resolve_trending_hashtags(root, info, limit):
+        return [TrendingHashtagType(name=name, score=score) for name, score in trending.top(min(max(limit, 1), 100))]
+
     def resolve_all_stories(root, info, **kwargs):
         user = info.context.user
 
         base_filter = Q(author__privacy_choice=PrivacyChoice.PUBLIC)
 
         if user.is_authenticated:
-            base_filter |= Q(author__in=User.objects.filter(followers__follower=user))
+            base_filter |= Q(author_id__in=get_followee_ids(user.id))
 
         return Story.objects.select_related('author').filter(
-            Q(is_deleted=False) & base_filter
+            Q(is_deleted=False) & base_filter & visible_filter(user)
         )
 
 
@@ -1,12 +1,15 @@
 from datetime import timedelta
 
+from django.db import transaction
 from django.utils import timezone
 from rest_framework import serializers
 
-from post.models import Post, Hashtag, Like, Comment, Story, StoryLike, View
-from post.utils.check_toxicity import is_flagged
-from post.utils.hashtags import extract_hashtags
+from alx_project_nexus.settings import UPLOAD_CHUNK_SIZE, UPLOAD_MAX_SIZE
+from post.models import Post, Like, Comment, Story, StoryLike, View, Hashtag, ModerationStatus, Upload
+from post.utils.hashtags import sync_hashtags
+from post.utils.uploads import request_media
 from user.serializers import UserSerializer, SimpleUserSerializer
+from utils.images import ImageVariantsField
 
 
 class PostSerializer(serializers.ModelSerializer):
@@ -16,32 +19,38 @@ class PostSerializer(serializers.ModelSerializer):
     It includes fields such as caption, image, author, created_at, and updated_at.
     The create method is overridden to handle post creation, including extracting hashtags from the caption.
     The update method is overridden to handle post updates, including updating the image and hashtags.
+    Posts are created pending and go back to pending when their caption changes, the moderation task
+    publishes or rejects them without holding the request.
+    Instead of sending the image, the request can reference a complete chunked upload by its upload_id.
     """
     image = serializers.ImageField(required=False, allow_null=True)
+    image_variants = ImageVariantsField()
+    upload_id = serializers.UUIDField(write_only=True, required=False)
 
     class Meta:
         model = Post
-        fields = ('id', 'caption', 'image', 'author', 'created_at', 'updated_at')
-        read_only_fields = ('id', 'author', 'created_at', 'updated_at')
+        fields = ('id', 'caption', 'image', 'image_variants', 'image_blurhash', 'upload_id', 'author', 'created_at',
+                  'updated_at', 'like_count', 'comment_count', 'view_count', 'moderation_status')
+        read_only_fields = ('id', 'author', 'created_at', 'updated_at', 'like_count', 'comment_count', 'view_count',
+                            'moderation_status')
 
     def validate_caption(self, value):
-        if is_flagged(value):
-            raise serializers.ValidationError("Caption contains toxic content.")
         return value.lower()
 
     def create(self, validated_data):
         request = self.context.get('request')
         user = request.user
         image = request.FILES.get('image') if request else None
-        if not image:
+        validated_data.pop('image', None)
+        media = request_media(image, validated_data.pop('upload_id', None), user)
+        if not media:
             raise serializers.ValidationError("Image is required for creating a post.")
 
-        hashtags = extract_hashtags(validated_data['caption'])
-        post = Post.objects.create(**validated_data, author=user)
-
-        for tag_name in hashtags:
-            tag, _ = Hashtag.objects.get_or_create(name=tag_name.lower())
-            post.hashtags.add(tag)
+        # The moderation task is queued on commit, the hashtags must be linked by then.
+        with transaction.atomic():
+            post = Post.objects.create(**validated_data, image=media.file.name, media=media, author=user,
+                                       moderation_status=ModerationStatus.PENDING)
+            sync_hashtags(post, post.caption, created=True)
 
         return post
 
@@ -50,19 +59,23 @@ class PostSerializer(serializers.ModelSerializer):
         image = request.FILES.get('image') if request else None
         caption = validated_data.get('caption')
 
-        if caption:
+        update_fields = ['updated_at']
+        if caption and caption != instance.caption:
             instance.caption = caption
+            instance.moderation_status = ModerationStatus.PENDING
+            update_fields += ['caption', 'moderation_status']
 
-        if image:
-            instance.image = image
-
-        instance.save()
+        media = request_media(image, validated_data.get('upload_id'), request.user)
+        if media:
+            instance.image = media.file.name
+            instance.media = media
+            update_fields += ['image', 'media']
 
-        hashtags = extract_hashtags(caption)
-        instance.hashtags.clear()
-        for tag_name in hashtags:
-            tag, _ = Hashtag.objects.get_or_create(name=tag_name.lower())
-            instance.hashtags.add(tag)
+        # Only the edited columns are written, a full save would overwrite the counters bumped meanwhile.
+        with transaction.atomic():
+            instance.save(update_fields=update_fields)
+            if caption:
+                sync_hashtags(instance, caption)
 
         return instance
 
@@ -75,13 +88,19 @@ class PostListSerializer(serializers.ModelSerializer):
     The author field is a nested serializer that represents the user who created the post.
     The read_only_fields are set to ensure that certain fields cannot be modified
     when creating or updating a post.
+    The image_variants field maps the resized copies of the image to their URLs, so mobile clients can pick
+    a size and a format instead of downloading the original, and image_blurhash is a BlurHash placeholder
+    to draw until the image arrives. Both are empty until the image is processed.
     """
     author = UserSerializer(read_only=True)
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Post
-        fields = ('id', 'caption', 'image', 'author', 'created_at', 'updated_at')
-        read_only_fields = ('id', 'author', 'created_at', 'updated_at')
+        fields = ('id', 'caption', 'image', 'image_variants', 'image_blurhash', 'author', 'created_at', 'updated_at',
+                  'like_count', 'comment_count', 'view_count', 'moderation_status')
+        read_only_fields = ('id', 'author', 'created_at', 'updated_at', 'like_count', 'comment_count', 'view_count',
+                            'moderation_status')
 
 
 class PostViewSerializer(serializers.Serializer):
@@ -99,33 +118,36 @@ class StorySerializer(serializers.ModelSerializer):
     The create method is overridden to handle story creation, including extracting hashtags from the caption
     and setting an expiration time for the story.
     The update method is overridden to handle story updates, including updating the image and hashtags.
+    Stories are moderated asynchronously like posts, and can reference a chunked upload like posts.
     """
     image = serializers.ImageField(required=False, allow_null=True)
+    image_variants = ImageVariantsField()
+    upload_id = serializers.UUIDField(write_only=True, required=False)
 
     class Meta:
         model = Story
-        fields = ('id', 'caption', 'image', 'author', 'created_at', 'expires_at')
-        read_only_fields = ('id', 'author', 'created_at', 'expires_at')
+        fields = ('id', 'caption', 'image', 'image_variants', 'image_blurhash', 'upload_id', 'author', 'created_at',
+                  'expires_at', 'like_count', 'view_count', 'moderation_status')
+        read_only_fields = ('id', 'author', 'created_at', 'expires_at', 'like_count', 'view_count',
+                            'moderation_status')
 
     def validate_caption(self, value):
-        if is_flagged(value):
-            raise serializers.ValidationError("Caption contains toxic content.")
         return value.lower()
 
     def create(self, validated_data):
         request = self.context.get('request')
         user = request.user
         image = request.FILES.get('image') if request else None
-        if not image:
+        validated_data.pop('image', None)
+        media = request_media(image, validated_data.pop('upload_id', None), user)
+        if not media:
             raise serializers.ValidationError("Image is required for creating a story.")
 
-        hashtags = extract_hashtags(validated_data['caption'])
         expires_at = timezone.now() + timedelta(hours=24)
-        story = Story.objects.create(**validated_data, author=user, expires_at=expires_at)
-
-        for tag_name in hashtags:
-            tag, _ = Hashtag.objects.get_or_create(name=tag_name.lower())
-            story.hashtags.add(tag)
+        with transaction.atomic():
+            story = Story.objects.create(**validated_data, image=media.file.name, media=media, author=user,
+                                         expires_at=expires_at, moderation_status=ModerationStatus.PENDING)
+            sync_hashtags(story, story.caption, created=True)
 
         return story
 
@@ -134,19 +156,24 @@ class StorySerializer(serializers.ModelSerializer):
         image = request.FILES.get('image') if request else None
         caption = validated_data.get('caption')
 
-        if caption:
+        update_fields = []
+        if caption and caption != instance.caption:
             instance.caption = caption
-
-        if image:
-            instance.image = image
-
-        instance.save()
-
-        hashtags = extract_hashtags(caption)
-        instance.hashtags.clear()
-        for tag_name in hashtags:
-            tag, _ = Hashtag.objects.get_or_create(name=tag_name.lower())
-            instance.hashtags.add(tag)
+            instance.moderation_status = ModerationStatus.PENDING
+            update_fields += ['caption', 'moderation_status']
+
+        media = request_media(image, validated_data.get('upload_id'), request.user)
+        if media:
+            instance.image = media.file.name
+            instance.media = media
+            update_fields += ['image', 'media']
+
+        # Only the edited columns are written, a full save would overwrite the counters bumped meanwhile.
+        with transaction.atomic():
+            if update_fields:
+                instance.save(update_fields=update_fields)
+            if caption:
+                sync_hashtags(instance, caption)
 
         return instance
 
@@ -159,12 +186,15 @@ class StoryListSerializer(serializers.ModelSerializer):
     The author field is a nested serializer that represents the user who created the story.
     The read_only_fields are set to ensure that certain fields cannot be modified
     when creating or updating a story.
+    The image_variants and image_blurhash fields work as on PostListSerializer.
     """
     author = UserSerializer(read_only=True)
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Story
-        fields = ('id', 'caption', 'author', 'created_at', 'expires_at')
+        fields = ('id', 'caption', 'image_variants', 'image_blurhash', 'author', 'created_at', 'expires_at',
+                  'like_count', 'view_count', 'moderation_status')
 
 
 class LikeSerializer(serializers.ModelSerializer):
@@ -250,3 +280,44 @@ class CommentListSerializer(serializers.ModelSerializer):
 
     def get_children(self, obj):
         return CommentListSerializer(getattr(obj, "_children", []), many=True, context=self.context).data
+
+
+class HashtagSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the Hashtag model.
+    """
+
+    class Meta:
+        model = Hashtag
+        fields = ('id', 'name', 'post_count')
+        read_only_fields = ('id', 'name', 'post_count')
+
+
+class TrendingHashtagSerializer(serializers.Serializer):
+    """
+    Serializer for a trending hashtag, the score is the time decayed number of recent uses.
+    """
+    name = serializers.CharField()
+    score = serializers.FloatField()
+
+
+class UploadSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the Upload model.
+    It is used to start a chunked upload from its filename and size, and to report its progress:
+    the received field is the offset the next chunk must start at and chunk_size the largest chunk accepted.
+    """
+    chunk_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Upload
+        fields = ('id', 'filename', 'size', 'content_type', 'received', 'status', 'chunk_size', 'created_at')
+        read_only_fields = ('id', 'content_type', 'received', 'status', 'created_at')
+
+    def get_chunk_size(self, obj):
+        return UPLOAD_CHUNK_SIZE
+
+    def validate_size(self, value):
+        if not 0 < value <= UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f"Uploads must be between 1 and {UPLOAD_MAX_SIZE} bytes.")
+        return value
@@ -1,8 +1,16 @@
+from django.db import transaction
 from django.db.models import signals
 from django.dispatch import receiver
 
 from notification.tasks import create_notification
-from post.models import Like, StoryLike, Comment
+from post.models import Like, StoryLike, Comment, Post, View, Story, StoryView, Hashtag, ModerationStatus
+from post.tasks import fan_out_post, moderate_post, moderate_story, generate_post_image_variants, \
+    generate_story_image_variants
+from post.utils import response_cache, trending
+from post.utils.counters import HASHTAG_COUNTERS, increment, decrement, recount
+from post.utils.search import get_search_backend
+from utils import typeahead
+from utils.images import needs_variants
 
 
 @receiver(signals.post_save, sender=Like)
@@ -24,3 +32,185 @@ def send_like_notification(sender, instance, created, **kwargs):
     if created:
         create_notification.delay(instance.post.author.id, f"{instance.user.username} commented in your post",
                                   "Comment Notification")
+
+
+def was_published(instance, created, update_fields):
+    """
+    Whether a save made a post or story visible to everyone, either created published or published by moderation.
+    """
+    if instance.moderation_status != ModerationStatus.PUBLISHED:
+        return False
+    return created or bool(update_fields and 'moderation_status' in update_fields)
+
+
+@receiver(signals.post_save, sender=Post)
+@receiver(signals.post_save, sender=Story)
+def queue_moderation(sender, instance, created, update_fields=None, **kwargs):
+    # Only a new caption needs a decision, other saves of a pending post must not queue it again.
+    caption_saved = created or bool(update_fields and 'caption' in update_fields)
+    if caption_saved and instance.moderation_status == ModerationStatus.PENDING and not instance.is_deleted:
+        task = moderate_post if sender is Post else moderate_story
+        # Queued on commit, so the worker sees the hashtags linked in the same transaction: a post published
+        # before its links exist would never count them.
+        transaction.on_commit(lambda: task.delay(str(instance.id)))
+
+
+@receiver(signals.post_save, sender=Post)
+@receiver(signals.post_save, sender=Story)
+def queue_image_variants(sender, instance, **kwargs):
+    if needs_variants(instance.image, instance.image_variants):
+        task = generate_post_image_variants if sender is Post else generate_story_image_variants
+        task.delay(str(instance.id))
+
+
+@receiver(signals.post_save, sender=Post)
+def push_post_to_timelines(sender, instance, created, update_fields=None, **kwargs):
+    if was_published(instance, created, update_fields):
+        fan_out_post.delay(str(instance.id))
+
+
+@receiver(signals.post_save, sender=Post)
+def invalidate_post_responses(sender, instance, created, update_fields=None, **kwargs):
+    response_cache.bump_author(instance.author_id)
+    if created or was_published(instance, created, update_fields):
+        response_cache.bump_collection('posts')
+
+
+@receiver(signals.post_save, sender=Story)
+def invalidate_story_responses(sender, instance, created, update_fields=None, **kwargs):
+    response_cache.bump_author(instance.author_id)
+    if created or was_published(instance, created, update_fields):
+        response_cache.bump_collection('stories')
+
+
+@receiver(signals.m2m_changed, sender=Post.hashtags.through)
+@receiver(signals.m2m_changed, sender=Story.hashtags.through)
+def invalidate_tagged_responses(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear') and hasattr(instance, 'author_id'):
+        response_cache.bump_author(instance.author_id)
+
+
+def is_visible(instance):
+    return instance.moderation_status == ModerationStatus.PUBLISHED and not instance.is_deleted
+
+
+@receiver(signals.m2m_changed, sender=Post.hashtags.through)
+@receiver(signals.m2m_changed, sender=Story.hashtags.through)
+def record_trending_hashtags(sender, instance, action, reverse, model, pk_set, **kwargs):
+    # Tags of pending posts and stories are recorded when moderation publishes them, rejected ones never are.
+    if action != 'post_add' or not pk_set:
+        return
+
+    if reverse:
+        published = model.objects.filter(pk__in=pk_set, moderation_status=ModerationStatus.PUBLISHED,
+                                         is_deleted=False).count()
+        trending.record([instance.name] * published)
+    elif is_visible(instance):
+        trending.record(Hashtag.objects.filter(pk__in=pk_set).values_list('name', flat=True))
+
+
+@receiver(signals.post_save, sender=Post)
+@receiver(signals.post_save, sender=Story)
+def record_published_hashtags(sender, instance, created, update_fields=None, **kwargs):
+    # A post created published gets its tags afterwards, they are recorded by record_trending_hashtags.
+    if not created and was_published(instance, created, update_fields) and not instance.is_deleted:
+        trending.record(instance.hashtags.values_list('name', flat=True))
+
+
+@receiver(signals.post_save, sender=Post)
+def index_post_caption(sender, instance, created, update_fields=None, **kwargs):
+    if created or update_fields is None or 'caption' in update_fields:
+        get_search_backend().update([instance.pk])
+
+
+@receiver(signals.m2m_changed, sender=Post.hashtags.through)
+def index_post_hashtags(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        get_search_backend().update([instance.pk])
+    elif action != 'post_clear' and pk_set:
+        get_search_backend().update(pk_set)
+
+
+def recount_hashtag_posts(hashtag_ids):
+    """
+    Recount the published posts of hashtags and rank them by it in the typeahead.
+    """
+    if not hashtag_ids:
+        return
+    recount(Hashtag, hashtag_ids, HASHTAG_COUNTERS)
+    typeahead.update(typeahead.HASHTAG_INDEX, dict(
+        Hashtag.objects.filter(pk__in=hashtag_ids).values_list('name', 'post_count')
+    ), mode='set')
+
+
+@receiver(signals.m2m_changed, sender=Post.hashtags.through)
+def update_hashtag_post_count(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # The cleared rows are not passed to post_clear, remember them before they go.
+        instance._cleared_hashtag_ids = set(instance.post_links.values_list('hashtag_id', flat=True) if reverse
+                                            else instance.hashtag_links.values_list('hashtag_id', flat=True))
+        return
+    if action == 'post_clear':
+        hashtag_ids = [instance.pk] if reverse else instance.__dict__.pop('_cleared_hashtag_ids', set())
+    elif action in ('post_add', 'post_remove') and pk_set:
+        hashtag_ids = [instance.pk] if reverse else pk_set
+    else:
+        return
+    # Links of posts nobody can see yet do not change the counts, the publication recounts them.
+    if reverse or is_visible(instance):
+        recount_hashtag_posts(hashtag_ids)
+
+
+@receiver(signals.post_save, sender=Post)
+def recount_post_hashtags(sender, instance, created, update_fields=None, **kwargs):
+    # Publishing, hiding for moderation or deleting a post changes the counts of the tags it holds.
+    if not created and (update_fields is None or {'moderation_status', 'is_deleted'} & set(update_fields)):
+        recount_hashtag_posts(list(instance.hashtag_links.values_list('hashtag_id', flat=True)))
+
+
+@receiver(signals.post_save, sender=Like)
+def increment_post_like_count(sender, instance, created, **kwargs):
+    if created:
+        increment(Post, instance.post_id, 'like_count')
+
+
+@receiver(signals.post_delete, sender=Like)
+def decrement_post_like_count(sender, instance, **kwargs):
+    decrement(Post, instance.post_id, 'like_count')
+
+
+@receiver(signals.post_save, sender=Comment)
+def increment_post_comment_count(sender, instance, created, **kwargs):
+    if created:
+        increment(Post, instance.post_id, 'comment_count')
+
+
+@receiver(signals.post_delete, sender=Comment)
+def decrement_post_comment_count(sender, instance, **kwargs):
+    decrement(Post, instance.post_id, 'comment_count')
+
+
+@receiver(signals.post_save, sender=View)
+def increment_post_view_count(sender, instance, created, **kwargs):
+    if created:
+        increment(Post, instance.post_id, 'view_count')
+
+
+@receiver(signals.post_save, sender=StoryLike)
+def increment_story_like_count(sender, instance, created, **kwargs):
+    if created:
+        increment(Story, instance.story_id, 'like_count')
+
+
+@receiver(signals.post_delete, sender=StoryLike)
+def decrement_story_like_count(sender, instance, **kwargs):
+    decrement(Story, instance.story_id, 'like_count')
+
+
+@receiver(signals.post_save, sender=StoryView)
+def increment_story_view_count(sender, instance, created, **kwargs):
+    if created:
+        increment(Story, instance.story_id, 'view_count')
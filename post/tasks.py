@@ -1,7 +1,11 @@
 from celery import shared_task
 from django.utils import timezone
 
-from post.models import Story
+from alx_project_nexus.settings import MODERATION_MAX_RETRIES, MODERATION_RETRY_DELAY
+from post.models import ModerationStatus, Post, Story
+from post.utils import media_store, moderation, response_cache, timeline, trending, uploads, view_buffer
+from post.utils.counters import reconcile_engagement_counters as reconcile_counters
+from utils.images import generate_variants
 
 
 @shared_task
@@ -18,4 +22,167 @@ def delete_expired_stories():
     expired = Story.objects.filter(expires_at__lte=now)
     for story in expired:
         story.is_expired = True
-        story.save()
+        story.save(update_fields=['is_expired'])
+
+
+@shared_task
+def fan_out_post(post_id):
+    """
+    Task to push a new post into the home timelines of its author and their followers.
+    It is queued from the post_save signal so post creation does not wait on the fan-out.
+    :param post_id:
+    :return: the number of timelines that received the post
+    """
+    post = Post.objects.filter(id=post_id, is_deleted=False, moderation_status=ModerationStatus.PUBLISHED).first()
+    if not post:
+        return 0
+    return timeline.fan_out_post(post)
+
+
+@shared_task
+def remove_post_from_timelines(post_id):
+    """
+    Task to remove a soft deleted post from the home timelines it was pushed to.
+    :param post_id:
+    :return:
+    """
+    post = Post.objects.filter(id=post_id).first()
+    if post:
+        timeline.remove_post(post)
+
+
+@shared_task
+def rebuild_timeline(user_id):
+    """
+    Task to rebuild the home timeline of a user from the database.
+    :param user_id:
+    :return: the number of posts written to the timeline
+    """
+    return timeline.rebuild_timeline(user_id)
+
+
+@shared_task
+def reconcile_engagement_counters():
+    """
+    Task to repair the denormalized like, comment and view counters of posts and stories.
+    The counters are maintained with F() updates from the signals, this task fixes any drift
+    caused by writes that bypass them (bulk deletes, raw SQL, failed transactions).
+    :return: the number of repaired posts and stories
+    """
+    return reconcile_counters()
+
+
+@shared_task
+def checkpoint_trending_hashtags():
+    """
+    Task to save the trending hashtag scores from Redis to the database.
+    It is scheduled periodically so the trending engine survives a Redis restart.
+    :return: the number of saved hashtags
+    """
+    return trending.checkpoint()
+
+
+@shared_task
+def delete_expired_uploads():
+    """
+    Task to delete the chunked uploads that were abandoned or never used by a post or story, then the blobs
+    of the media store that nothing uses anymore.
+    :return: the number of deleted uploads and blobs
+    """
+    return uploads.delete_expired_uploads() + media_store.delete_orphan_blobs()
+
+
+@shared_task
+def flush_views():
+    """
+    Task to write the buffered post and story views to the database and bump their view counters.
+    :return: the number of inserted views
+    """
+    return view_buffer.flush()
+
+
+@shared_task(bind=True, max_retries=MODERATION_MAX_RETRIES, default_retry_delay=MODERATION_RETRY_DELAY)
+def moderate_post(self, post_id):
+    """
+    Task to classify the caption of a pending post and publish or reject it.
+    It is queued from the post_save signal, so creating or editing a post does not wait on the model API.
+    Model API errors are retried. Once the retries are spent the local lexicon decides, and a caption it
+    cannot decide stays pending until requeue_pending_moderation queues it again.
+    :param post_id:
+    :return: the new moderation status
+    """
+    post = Post.objects.filter(id=post_id).first()
+    if not post:
+        return None
+    try:
+        return moderation.moderate(post)
+    except Exception as exc:
+        if self.request.retries >= self.max_retries:
+            return moderation.moderate_with_lexicon(post)
+        raise self.retry(exc=exc)
+
+
+@shared_task(bind=True, max_retries=MODERATION_MAX_RETRIES, default_retry_delay=MODERATION_RETRY_DELAY)
+def moderate_story(self, story_id):
+    """
+    Task to classify the caption of a pending story and publish or reject it, see moderate_post.
+    :param story_id:
+    :return: the new moderation status
+    """
+    story = Story.objects.filter(id=story_id).first()
+    if not story:
+        return None
+    try:
+        return moderation.moderate(story)
+    except Exception as exc:
+        if self.request.retries >= self.max_retries:
+            return moderation.moderate_with_lexicon(story)
+        raise self.retry(exc=exc)
+
+
+@shared_task
+def requeue_pending_moderation():
+    """
+    Task to queue the moderation of the posts and stories left pending, e.g. held while the model was down.
+    Moderating an instance twice is harmless, only one decision is saved.
+    :return: the number of queued posts and stories
+    """
+    post_ids = [str(pk) for pk in moderation.stale_pending(Post)]
+    story_ids = [str(pk) for pk in moderation.stale_pending(Story)]
+    for post_id in post_ids:
+        moderate_post.delay(post_id)
+    for story_id in story_ids:
+        moderate_story.delay(story_id)
+    return len(post_ids) + len(story_ids)
+
+
+@shared_task
+def generate_post_image_variants(post_id):
+    """
+    Task to resize and re-encode the image of a post into its thumb, feed and full variants, and to compute
+    its BlurHash placeholder.
+    It is queued from the post_save signal whenever a post gets a new image.
+    :param post_id:
+    :return: the stored variants
+    """
+    post = Post.objects.filter(id=post_id).first()
+    if not post:
+        return None
+    variants = generate_variants(post, 'image', 'image_variants', 'image_blurhash')
+    response_cache.bump_author(post.author_id)
+    return variants
+
+
+@shared_task
+def generate_story_image_variants(story_id):
+    """
+    Task to generate the image variants of a story, see generate_post_image_variants.
+    :param story_id:
+    :return: the stored variants
+    """
+    story = Story.objects.filter(id=story_id).first()
+    if not story:
+        return None
+    variants = generate_variants(story, 'image', 'image_variants', 'image_blurhash')
+    response_cache.bump_author(story.author_id)
+    return variants
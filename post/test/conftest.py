@@ -6,6 +6,13 @@ from rest_framework.test import APIClient
 
 from post.models import Post
 from user.models import User
+from utils.redis_client import redis_client
+
+
+@pytest.fixture(autouse=True)
+def clear_response_cache():
+    for key in redis_client.scan_iter("response_cache:*"):
+        redis_client.delete(key)
 
 
 @pytest.fixture()
@@ -20,6 +27,17 @@ def user():
         email="test@gmail.com")
 
 
+@pytest.fixture()
+def other_user():
+    return User.objects.create_user(
+        username='otheruser',
+        password='testpassword',
+        full_name='Other User',
+        is_active=True,
+        email_verified=True,
+        email="other@gmail.com")
+
+
 @pytest.fixture
 def image():
     return SimpleUploadedFile(
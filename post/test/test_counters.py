@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+
+import pytest
+from django.utils import timezone
+
+from post.models import Like, Comment, View, Post, Story, StoryView
+from post.serializers import PostSerializer, StorySerializer
+from post.tasks import delete_expired_stories
+from post.utils.counters import reconcile_engagement_counters
+
+
+@pytest.mark.django_db
+def test_like_updates_post_like_count(created_like):
+    post = created_like.post
+    post.refresh_from_db()
+    assert post.like_count == 1
+
+    created_like.delete()
+    post.refresh_from_db()
+    assert post.like_count == 0
+
+
+@pytest.mark.django_db
+def test_comment_and_view_update_post_counters(created_comment, user):
+    post = created_comment.post
+    View.objects.create(post=post, user=user)
+    post.refresh_from_db()
+    assert post.comment_count == 1
+    assert post.view_count == 1
+
+
+@pytest.mark.django_db
+def test_story_view_updates_story_view_count(created_story, user):
+    StoryView.objects.create(story=created_story, user=user)
+    created_story.refresh_from_db()
+    assert created_story.view_count == 1
+
+
+@pytest.mark.django_db
+def test_reconcile_repairs_drift(created_like, created_story):
+    post = created_like.post
+    Post.objects.filter(pk=post.pk).update(like_count=7, comment_count=3)
+
+    assert reconcile_engagement_counters() == {'posts': 1, 'stories': 0, 'hashtags': 0}
+    post.refresh_from_db()
+    assert (post.like_count, post.comment_count, post.view_count) == (1, 0, 0)
+    assert Like.objects.count() == 1 and Comment.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_edits_keep_counters_bumped_meanwhile(created_post, created_story, user):
+    request = SimpleNamespace(FILES={}, user=user)
+    Post.objects.filter(pk=created_post.pk).update(like_count=5, view_count=9)
+    Story.objects.filter(pk=created_story.pk).update(like_count=4)
+
+    serializer = PostSerializer(created_post, data={'caption': 'edited'}, partial=True, context={'request': request})
+    serializer.is_valid(raise_exception=True)
+    serializer.save()
+    serializer = StorySerializer(created_story, data={'caption': 'edited'}, partial=True, context={'request': request})
+    serializer.is_valid(raise_exception=True)
+    serializer.save()
+    Story.objects.filter(pk=created_story.pk).update(expires_at=timezone.now())
+    delete_expired_stories()
+
+    created_post.refresh_from_db()
+    created_story.refresh_from_db()
+    assert (created_post.caption, created_post.like_count, created_post.view_count) == ('edited', 5, 9)
+    assert (created_story.caption, created_story.like_count, created_story.is_expired) == ('edited', 4, True)
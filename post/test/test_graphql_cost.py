@@ -0,0 +1,127 @@
+import json
+
+import pytest
+from graphql import parse
+from graphql_jwt.shortcuts import get_token
+from rest_framework.test import APIClient
+
+from alx_project_nexus import views
+from alx_project_nexus.query_cost import analyze_query_cost
+from alx_project_nexus.schema import schema
+from utils import metrics
+from utils.redis_client import redis_client
+
+POSTS_QUERY = """
+query ($first: Int) {
+  allPosts(first: $first) {
+    edges { node { id caption author { username } } }
+  }
+}
+"""
+
+
+@pytest.fixture(autouse=True)
+def clear_cost_budgets():
+    for key in redis_client.scan_iter(views.GRAPHQL_COST_KEY.format(client='*')):
+        redis_client.delete(key)
+
+
+def post_graphql(client, query, **variables):
+    response = client.post('/graphql/', data=json.dumps({"query": query, "variables": variables}),
+                           content_type='application/json')
+    return response.json()
+
+
+def cost_of(query, **variables):
+    return analyze_query_cost(schema.graphql_schema, parse(query), variables)
+
+
+def test_list_cost_is_multiplied_by_first():
+    small = cost_of(POSTS_QUERY, first=5)
+    large = cost_of(POSTS_QUERY, first=50)
+
+    # allPosts weight + first * (edges, node and author)
+    assert small.cost == 2 + 5 * 3
+    assert large.cost == 2 + 50 * 3
+    assert small.depth == large.depth == 5
+
+
+def test_fragments_are_costed_like_inline_selections():
+    inline = cost_of(POSTS_QUERY, first=10)
+    fragment = cost_of("""
+    query ($first: Int) { allPosts(first: $first) { edges { node { ...PostFields } } } }
+    fragment PostFields on PostType { id caption author { username } }
+    """, first=10)
+
+    assert fragment.cost == inline.cost
+    assert fragment.depth == inline.depth
+
+
+@pytest.mark.django_db
+def test_cost_is_reported_in_extensions(created_post):
+    result = post_graphql(APIClient(), POSTS_QUERY, first=5)
+
+    assert "errors" not in result
+    assert result["extensions"]["cost"]["cost"] == 17
+    assert result["extensions"]["cost"]["depth"] == 5
+
+
+@pytest.mark.django_db
+def test_expensive_query_is_rejected(created_post):
+    result = post_graphql(APIClient(), POSTS_QUERY, first=5000)
+
+    assert result.get("data") is None
+    assert "exceeds the maximum cost" in result["errors"][0]["message"]
+    assert result["extensions"]["cost"]["cost"] > result["extensions"]["cost"]["maxCost"]
+
+
+@pytest.mark.django_db
+def test_deep_query_is_rejected(monkeypatch, created_post):
+    monkeypatch.setattr(views, 'GRAPHQL_MAX_QUERY_DEPTH', 4)
+    result = post_graphql(APIClient(), POSTS_QUERY, first=1)
+
+    assert result.get("data") is None
+    assert "exceeds the maximum depth" in result["errors"][0]["message"]
+
+
+@pytest.mark.django_db
+def test_client_is_throttled_once_budget_is_spent(monkeypatch, created_post):
+    monkeypatch.setattr(views, 'GRAPHQL_COST_BUDGET', 40)
+    client = APIClient()
+
+    first = post_graphql(client, POSTS_QUERY, first=5)
+    second = post_graphql(client, POSTS_QUERY, first=5)
+    third = post_graphql(client, POSTS_QUERY, first=5)
+
+    assert "errors" not in first and "errors" not in second
+    assert second["extensions"]["cost"]["remainingBudget"] == 40 - 2 * 17
+    assert third.get("data") is None
+    assert "budget exhausted" in third["errors"][0]["message"]
+
+
+@pytest.mark.django_db
+def test_jwt_clients_are_budgeted_per_user(monkeypatch, created_post, user):
+    monkeypatch.setattr(views, 'GRAPHQL_COST_BUDGET', 40)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"JWT {get_token(user)}", HTTP_X_FORWARDED_FOR='203.0.113.7')
+
+    assert "errors" not in post_graphql(client, POSTS_QUERY, first=5)
+    assert int(redis_client.get(views.GRAPHQL_COST_KEY.format(client=f"user:{user.id}"))) == 17
+    assert not redis_client.exists(views.GRAPHQL_COST_KEY.format(client="ip:203.0.113.7"))
+
+    # Another address does not reset the budget of the user.
+    client.credentials(HTTP_AUTHORIZATION=f"JWT {get_token(user)}", HTTP_X_FORWARDED_FOR='203.0.113.8')
+    post_graphql(client, POSTS_QUERY, first=5)
+    assert "budget exhausted" in post_graphql(client, POSTS_QUERY, first=5)["errors"][0]["message"]
+
+
+@pytest.mark.django_db
+def test_cost_metrics_do_not_grow_per_client(monkeypatch, created_post):
+    monkeypatch.setattr(views, 'GRAPHQL_COST_BUDGET', 20)
+    redis_client.delete(metrics.metrics_key(views.METRICS_NAMESPACE))
+    for address in ('203.0.113.1', '203.0.113.2'):
+        client = APIClient(HTTP_X_FORWARDED_FOR=address)
+        post_graphql(client, POSTS_QUERY, first=5)
+        post_graphql(client, POSTS_QUERY, first=5)
+
+    assert metrics.snapshot(views.METRICS_NAMESPACE) == {'operations': 4, 'total_cost': 68, 'throttled': 2}
@@ -0,0 +1,73 @@
+import pytest
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from graphql_relay import to_global_id
+
+from alx_project_nexus.schema import schema
+from post.models import Post, Like
+from user.models import Follow
+from user.utils.followees import get_followee_ids
+
+ALL_POSTS_QUERY = """
+query ($first: Int) {
+  allPosts(first: $first) {
+    edges { node { id caption likeCount liked isFollowingAuthor author { username } } }
+  }
+}
+"""
+
+USER_QUERY = """
+query ($id: ID!) {
+  user(id: $id) {
+    username followersCount followingCount postCount
+    posts { id liked isFollowingAuthor author { username } }
+  }
+}
+"""
+
+
+def execute(query, user, **variables):
+    request = RequestFactory().post('/graphql/')
+    request.user = user
+    with CaptureQueriesContext(connection) as queries:
+        result = schema.execute(query, variable_values=variables, context_value=request)
+    assert result.errors is None, result.errors
+    return result.data, len(queries)
+
+
+def create_posts(author, image, count):
+    return [Post.objects.create(caption=f"post {i}", author=author, image=image) for i in range(count)]
+
+
+@pytest.mark.django_db
+def test_all_posts_query_count_is_constant(user, other_user, image):
+    Follow.objects.create(follower=user, following=other_user)
+    posts = create_posts(other_user, image, 2)
+    Like.objects.create(post=posts[0], user=user)
+    get_followee_ids(user.id)
+
+    data, small_page = execute(ALL_POSTS_QUERY, user, first=2)
+    create_posts(other_user, image, 6)
+    data, large_page = execute(ALL_POSTS_QUERY, user, first=8)
+
+    assert small_page == large_page
+    nodes = [edge['node'] for edge in data['allPosts']['edges']]
+    assert len(nodes) == 8
+    assert all(node['isFollowingAuthor'] for node in nodes)
+    assert [node['liked'] for node in nodes].count(True) == 1
+
+
+@pytest.mark.django_db
+def test_user_query_count_is_constant(user, other_user, image):
+    user_id = to_global_id('UserDetailType', other_user.id)
+    create_posts(other_user, image, 2)
+    get_followee_ids(user.id)
+    data, small_page = execute(USER_QUERY, user, id=user_id)
+    create_posts(other_user, image, 6)
+    data, large_page = execute(USER_QUERY, user, id=user_id)
+
+    assert small_page == large_page
+    assert data['user']['postCount'] == 8
+    assert len(data['user']['posts']) == 8
+    assert data['user']['posts'][0]['author']['username'] == other_user.username
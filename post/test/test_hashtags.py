@@ -0,0 +1,149 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from post.models import Hashtag, Post, PostHashtag
+from post.utils import trending
+from post.utils.hashtags import get_or_create_hashtags, normalize_hashtags, sync_hashtags
+
+
+def tag_names(instance):
+    return set(instance.hashtags.values_list('name', flat=True))
+
+
+def test_normalize_hashtags():
+    assert normalize_hashtags(['Django', 'django', 'Python', '', 'x' * 101]) == ['django', 'python']
+
+
+@pytest.mark.django_db
+def test_get_or_create_reuses_existing_tags():
+    existing = Hashtag.objects.create(name='django')
+
+    tags = get_or_create_hashtags(['Django', 'python'])
+
+    assert {tag.name for tag in tags} == {'django', 'python'}
+    assert existing in tags
+    assert Hashtag.objects.count() == 2
+
+
+def count_sync_queries(post, caption):
+    with CaptureQueriesContext(connection) as queries:
+        sync_hashtags(post, caption, created=True)
+    return len(queries)
+
+
+@pytest.mark.django_db
+def test_sync_cost_does_not_grow_with_tag_count(user, image):
+    few = Post.objects.create(caption='few', author=user, image=image)
+    many = Post.objects.create(caption='many', author=user, image=image)
+    # Restoring the trending engine from its checkpoint happens once, outside of the measured syncs.
+    trending.get_landmark()
+
+    few_queries = count_sync_queries(few, '#tag0 #tag1')
+    many_queries = count_sync_queries(many, ' '.join(f'#tag{i}' for i in range(2, 22)))
+
+    assert len(tag_names(many)) == 20
+    assert many_queries == few_queries
+
+
+@pytest.mark.django_db
+def test_sync_only_writes_changed_rows(created_post):
+    sync_hashtags(created_post, '#keep #drop', created=True)
+    through = Post.hashtags.through
+    kept = through.objects.get(post=created_post, hashtag__name='keep')
+
+    sync_hashtags(created_post, '#keep #add')
+
+    assert tag_names(created_post) == {'keep', 'add'}
+    assert through.objects.filter(pk=kept.pk).exists()
+
+
+@pytest.mark.django_db
+def test_update_without_caption_keeps_tags(logged_in_client, post_data):
+    response = logged_in_client.post(reverse("posts-list"), data={**post_data, 'caption': 'hello #World'})
+    post = Post.objects.get(pk=response.json()['id'])
+
+    response = logged_in_client.patch(reverse("posts-detail", args=[post.id]), data={})
+
+    assert response.status_code == 200
+
+    assert tag_names(post) == {'world'}
+
+
+@pytest.mark.django_db
+def test_hashtag_post_count(user, image):
+    first = Post.objects.create(caption='first', author=user, image=image)
+    second = Post.objects.create(caption='second', author=user, image=image)
+    sync_hashtags(first, '#django #python', created=True)
+    sync_hashtags(second, '#django', created=True)
+
+    sync_hashtags(first, '#python')
+
+    counts = dict(Hashtag.objects.values_list('name', 'post_count'))
+    assert counts == {'django': 1, 'python': 1}
+
+
+@pytest.mark.django_db
+def test_hashtag_feed_pages_by_tagged_time(client, user, image):
+    posts = [Post.objects.create(caption=f'post {i} #django', author=user, image=image) for i in range(3)]
+    for post in posts:
+        sync_hashtags(post, post.caption, created=True)
+    Post.objects.create(caption='untagged', author=user, image=image)
+
+    first = client.get(reverse('posts-list'), {'hashtag': 'Django', 'page_size': 2}).json()
+    ids = [post['id'] for post in first['results']]
+    if first['next']:
+        ids += [post['id'] for post in client.get(first['next']).json()['results']]
+
+    assert ids == [str(post.id) for post in reversed(posts)]
+    assert client.get(reverse('posts-list'), {'hashtag': 'missing'}).json()['results'] == []
+
+
+@pytest.mark.django_db(transaction=True)
+def test_link_models_adopt_the_former_m2m_table(user):
+    executor = MigrationExecutor(connection)
+    executor.migrate([('post', '0003_mediablob_trendinghashtag_upload_and_more')])
+    # The tables as the implicit many-to-many created them.
+    apps = executor.loader.project_state(('post', '0003_mediablob_trendinghashtag_upload_and_more')).apps
+    posts = apps.get_model('post', 'Post').objects
+    post = posts.create(caption='#legacy', author_id=user.id)
+    post.hashtags.add(apps.get_model('post', 'Hashtag').objects.create(name='legacy'))
+    created_at = timezone.now() - timedelta(days=3)
+    posts.filter(pk=post.pk).update(created_at=created_at)
+
+    executor = MigrationExecutor(connection)
+    executor.migrate(executor.loader.graph.leaf_nodes())
+
+    link = PostHashtag.objects.get(post_id=post.pk)
+    assert link.hashtag.name == 'legacy'
+    assert link.created_at == created_at
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, PostHashtag._meta.db_table)
+    assert 'posthashtag_feed_idx' in constraints
+
+
+@pytest.mark.django_db(transaction=True)
+def test_hashtags_differing_by_case_are_merged(user):
+    executor = MigrationExecutor(connection)
+    executor.migrate([('post', '0004_adopt_hashtag_links')])
+    apps = executor.loader.project_state(('post', '0004_adopt_hashtag_links')).apps
+    posts = apps.get_model('post', 'Post').objects
+    hashtags = apps.get_model('post', 'Hashtag').objects
+    # Tags stored in their original case, as before the names were lowercased.
+    title, upper = hashtags.create(name='Django'), hashtags.create(name='DJANGO')
+    first, second = posts.create(caption='#Django', author_id=user.id), posts.create(caption='x', author_id=user.id)
+    first.hashtags.add(title)
+    second.hashtags.add(title, upper)
+
+    executor = MigrationExecutor(connection)
+    executor.migrate(executor.loader.graph.leaf_nodes())
+
+    hashtag = Hashtag.objects.get(name__iexact='django')
+    assert hashtag.name == 'django'
+    assert hashtag.post_count == 2
+    assert set(hashtag.posts.values_list('id', flat=True)) == {first.id, second.id}
@@ -0,0 +1,116 @@
+from io import BytesIO
+
+import pytest
+from PIL import Image
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory
+from django.urls import reverse
+
+from alx_project_nexus.schema import schema
+from post import signals
+from post.models import Post
+from post.tasks import generate_post_image_variants
+from utils import blurhash, images
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+
+
+def photo(width=2000, height=1000, orientation=None):
+    exif = Image.Exif()
+    exif[0x010F] = "Camera maker"
+    if orientation:
+        exif[0x0112] = orientation
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), "red").save(buffer, format="JPEG", exif=exif)
+    return SimpleUploadedFile("photo.jpg", buffer.getvalue(), content_type="image/jpeg")
+
+
+def open_variant(name):
+    with default_storage.open(name) as file:
+        image = Image.open(BytesIO(file.read()))
+        image.load()
+    return image
+
+
+@pytest.mark.django_db
+def test_new_image_queues_variants(post_data, logged_in_client, monkeypatch):
+    queued = []
+    monkeypatch.setattr(signals.generate_post_image_variants, 'delay', queued.append)
+
+    response = logged_in_client.post(reverse('posts-list'), data=post_data)
+
+    assert queued == [response.data['id']]
+    assert response.data['image_variants'] == {}
+
+
+@pytest.mark.django_db
+def test_variants_are_resized_and_stripped(user):
+    post = Post.objects.create(caption='photo', author=user, image=photo())
+
+    variants = generate_post_image_variants(str(post.id))
+
+    assert variants['source'] == post.image.name
+    assert {name: (size['width'], size['height']) for name, size in variants['sizes'].items()} == {
+        'thumb': (150, 75), 'feed': (640, 320), 'full': (1440, 720)}
+    for size in variants['sizes'].values():
+        assert set(size['formats']) == set(images.supported_formats())
+        for name in size['formats'].values():
+            assert not open_variant(name).getexif()
+
+    post.refresh_from_db()
+    assert post.image_variants == variants
+    assert not images.needs_variants(post.image, post.image_variants)
+
+
+@pytest.mark.django_db
+def test_variants_are_content_hashed_and_never_upscaled(user):
+    first = Post.objects.create(caption='first', author=user, image=photo(300, 600, orientation=6))
+    second = Post.objects.create(caption='second', author=user, image=photo(300, 600, orientation=6))
+
+    first_variants = generate_post_image_variants(str(first.id))
+    second_variants = generate_post_image_variants(str(second.id))
+
+    assert first.image.name != second.image.name
+    assert first_variants['sizes'] == second_variants['sizes']
+    # The EXIF orientation is applied before the metadata is dropped.
+    assert (first_variants['sizes']['full']['width'], first_variants['sizes']['full']['height']) == (600, 300)
+    assert first_variants['sizes']['full']['formats']['jpeg'].endswith('_full.jpg')
+
+
+@pytest.mark.django_db
+def test_list_exposes_a_srcset_map(user, logged_in_client):
+    post = Post.objects.create(caption='photo', author=user, image=photo())
+    generate_post_image_variants(str(post.id))
+
+    result = logged_in_client.get(reverse('posts-list')).json()['results'][0]
+
+    variants = result['image_variants']
+    assert variants['sizes']['thumb']['jpeg'].startswith('http://testserver/image/posts/variants/')
+    assert variants['srcset']['jpeg'] == ', '.join(
+        f"{variants['sizes'][size]['jpeg']} {variants['sizes'][size]['width']}w" for size in ('thumb', 'feed', 'full'))
+
+
+def test_blurhash_of_a_plain_image():
+    assert blurhash.encode(Image.new("RGB", (64, 48), "black")) == "L00000fQfQfQfQfQfQfQfQfQfQfQ"
+    assert len(blurhash.encode(Image.new("RGB", (300, 100), "red"))) == 28
+
+
+@pytest.mark.django_db
+def test_placeholder_is_returned_inline(user, other_user, logged_in_client):
+    post = Post.objects.create(caption='photo', author=user, image=photo())
+    generate_post_image_variants(str(post.id))
+    post.refresh_from_db()
+
+    assert post.image_blurhash == post.image_variants['blurhash']
+    assert post.image_blurhash.startswith('L')
+    result = logged_in_client.get(reverse('posts-list')).json()['results'][0]
+    assert result['image_blurhash'] == post.image_blurhash
+
+    request = RequestFactory().post('/graphql/')
+    request.user = other_user
+    data = schema.execute('{ allPosts(first: 1) { edges { node { imageBlurhash } } } }', context_value=request).data
+    assert data['allPosts']['edges'][0]['node']['imageBlurhash'] == post.image_blurhash
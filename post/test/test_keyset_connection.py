@@ -0,0 +1,94 @@
+import pytest
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from alx_project_nexus.schema import schema
+from post.models import Post
+
+PAGE_QUERY = """
+query ($first: Int, $after: String, $last: Int, $before: String) {
+  allPosts(first: $first, after: $after, last: $last, before: $before) {
+    edges { cursor node { caption } }
+    pageInfo { hasNextPage hasPreviousPage startCursor endCursor }
+  }
+}
+"""
+
+
+def execute(query, user, **variables):
+    request = RequestFactory().post('/graphql/')
+    request.user = user
+    with CaptureQueriesContext(connection) as queries:
+        result = schema.execute(query, variable_values=variables, context_value=request)
+    return result, [query['sql'] for query in queries]
+
+
+@pytest.fixture
+def posts(other_user, image):
+    created = [Post.objects.create(caption=f"post {i}", author=other_user, image=image) for i in range(5)]
+    # Two posts share a timestamp so the id has to break the tie.
+    same_time = timezone.now()
+    Post.objects.filter(id__in=[created[1].id, created[2].id]).update(created_at=same_time)
+    return list(Post.objects.order_by('-created_at', '-id'))
+
+
+def captions(result):
+    return [edge['node']['caption'] for edge in result.data['allPosts']['edges']]
+
+
+@pytest.mark.django_db
+def test_pages_follow_created_at_and_id(user, posts):
+    first, _ = execute(PAGE_QUERY, user, first=2)
+    second, _ = execute(PAGE_QUERY, user, first=2, after=first.data['allPosts']['pageInfo']['endCursor'])
+    third, _ = execute(PAGE_QUERY, user, first=2, after=second.data['allPosts']['pageInfo']['endCursor'])
+
+    assert captions(first) + captions(second) + captions(third) == [post.caption for post in posts]
+    assert first.data['allPosts']['pageInfo']['hasNextPage'] is True
+    assert second.data['allPosts']['pageInfo']['hasPreviousPage'] is True
+    assert third.data['allPosts']['pageInfo']['hasNextPage'] is False
+
+
+@pytest.mark.django_db
+def test_backward_pages(user, posts):
+    first, _ = execute(PAGE_QUERY, user, first=4)
+    previous, _ = execute(PAGE_QUERY, user, last=2, before=first.data['allPosts']['pageInfo']['endCursor'])
+
+    assert captions(previous) == [post.caption for post in posts[1:3]]
+    assert previous.data['allPosts']['pageInfo']['hasPreviousPage'] is True
+
+
+@pytest.mark.django_db
+def test_pages_use_row_value_comparison_without_count(user, posts):
+    first, _ = execute(PAGE_QUERY, user, first=2)
+    result, sql = execute(PAGE_QUERY, user, first=2, after=first.data['allPosts']['pageInfo']['endCursor'])
+
+    assert result.errors is None
+    assert not any('COUNT(' in statement for statement in sql)
+    assert any('("post_post"."created_at", "post_post"."id") <' in statement for statement in sql)
+
+
+@pytest.mark.django_db
+def test_total_count_only_when_requested(user, posts):
+    result, sql = execute("{ allPosts(first: 1) { totalCount estimatedTotalCount } }", user)
+
+    assert result.errors is None
+    assert result.data['allPosts']['totalCount'] == len(posts)
+    assert isinstance(result.data['allPosts']['estimatedTotalCount'], int)
+    assert sum('COUNT(' in statement for statement in sql) == 1
+
+
+@pytest.mark.django_db
+def test_invalid_cursor(user, posts):
+    result, _ = execute(PAGE_QUERY, user, first=2, after="not-a-cursor")
+
+    assert result.errors[0].message == "Invalid cursor."
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('arguments', [{'first': -1}, {'last': -2}])
+def test_negative_page_size(user, posts, arguments):
+    result, _ = execute(PAGE_QUERY, user, **arguments)
+
+    assert result.errors[0].message == f"Argument `{next(iter(arguments))}` must be a non-negative integer."
@@ -0,0 +1,136 @@
+import os
+from io import BytesIO
+
+import pytest
+from PIL import ExifTags, Image, ImageDraw
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from post.models import MediaBlob, Post
+from post.tasks import generate_post_image_variants
+from post.utils import media_store
+from utils import images
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+
+
+def picture(size=(256, 256), quality=90, rotate=0):
+    image = Image.linear_gradient('L').convert('RGB')
+    ImageDraw.Draw(image).rectangle((40, 60, 140, 200), fill='orange')
+    image = image.rotate(rotate).resize(size)
+    buffer = BytesIO()
+    image.save(buffer, format='JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+def upload(data, name='meme.jpg'):
+    return SimpleUploadedFile(name, data, content_type='image/jpeg')
+
+
+def blob_with_hash(phash):
+    return MediaBlob.objects.create(sha256=f'{phash:064x}', file='blobs/x.jpg', size=1, width=1, height=1,
+                                    phash=media_store.to_signed(phash), dhash=0, **media_store.band_fields(phash))
+
+
+@pytest.fixture()
+def staff_client(other_user):
+    other_user.is_staff = True
+    other_user.save()
+    client = APIClient()
+    client.force_authenticate(other_user)
+    return client
+
+
+@pytest.mark.django_db
+def test_exact_reposts_share_a_blob(logged_in_client, tmp_path):
+    data = picture()
+    first = logged_in_client.post(reverse('posts-list'), data={'caption': 'meme', 'image': upload(data)})
+    second = logged_in_client.post(reverse('posts-list'), data={'caption': 'repost', 'image': upload(data, 'copy.jpg')})
+
+    assert first.status_code == second.status_code == 201
+    posts = Post.objects.filter(pk__in=[first.data['id'], second.data['id']])
+    assert {post.media_id for post in posts} == {MediaBlob.objects.get().pk}
+    assert {post.image.name for post in posts} == {MediaBlob.objects.get().file.name}
+    assert sum(len(files) for _, _, files in os.walk(tmp_path)) == 1
+
+
+def with_exif(data, orientation):
+    exif = Image.Exif()
+    exif[ExifTags.Base.Orientation] = orientation
+    exif[ExifTags.Base.Make] = 'Phone'
+    exif.get_ifd(ExifTags.IFD.GPSInfo)[ExifTags.GPS.GPSLatitudeRef] = 'N'
+    buffer = BytesIO()
+    Image.open(BytesIO(data)).save(buffer, format='JPEG', quality='keep', exif=exif, comment=b'secret')
+    return buffer.getvalue()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('orientation, size', [(1, (256, 128)), (6, (128, 256))])
+def test_stored_originals_are_stripped_of_metadata(orientation, size):
+    blob = media_store.store_media(upload(with_exif(picture(size=(256, 128)), orientation)))
+
+    with Image.open(blob.file) as stored:
+        assert stored.format == 'JPEG'
+        assert stored.size == (blob.width, blob.height) == size
+        assert not stored.getexif()
+        assert 'comment' not in stored.info
+
+
+@pytest.mark.django_db
+def test_near_duplicates_survive_resizing_and_recompression():
+    original = media_store.store_media(upload(picture()))
+    resized = media_store.store_media(upload(picture(size=(180, 180), quality=40)))
+    rotated = media_store.store_media(upload(picture(rotate=90)))
+
+    matches = media_store.near_duplicates(original)
+
+    assert original.pk != resized.pk
+    assert [blob for blob, distance in matches] == [resized]
+    assert media_store.hamming(original.phash, rotated.phash) > media_store.MAX_DISTANCE
+
+
+@pytest.mark.django_db
+def test_band_lookup_finds_every_hash_within_the_max_distance():
+    origin = blob_with_hash(0)
+    # Seven bits: two in three of the bands and one in the last band.
+    close = blob_with_hash(0b11 | 0b11 << 16 | 0b11 << 32 | 0b1 << 48)
+    # Eight bits, two in every band: too far for the band lookup.
+    far = blob_with_hash(0b11 | 0b11 << 16 | 0b11 << 32 | 0b11 << 48)
+
+    assert media_store.near_duplicates(origin, distance=10) == [(close, 7)]
+    assert media_store.hamming(origin.phash, far.phash) == 8
+
+
+@pytest.mark.django_db
+def test_moderators_list_near_duplicates(user, logged_in_client, staff_client):
+    blob = media_store.store_media(upload(picture()))
+    near = media_store.store_media(upload(picture(size=(180, 180), quality=40)))
+    post = Post.objects.create(caption='original', author=user, image=blob.file.name, media=blob)
+    repost = Post.objects.create(caption='repost', author=user, image=blob.file.name, media=blob)
+    edited = Post.objects.create(caption='edited', author=user, image=near.file.name, media=near)
+    url = reverse('posts-near-duplicates', kwargs={'pk': post.pk})
+
+    assert logged_in_client.get(url).status_code == 403
+
+    results = staff_client.get(url).json()
+    assert [(item['id'], item['distance']) for item in results['posts']] == [
+        (str(repost.pk), 0), (str(edited.pk), media_store.hamming(blob.phash, near.phash))]
+    assert results['stories'] == []
+
+
+@pytest.mark.django_db
+def test_reposts_reuse_image_variants(user, monkeypatch):
+    blob = media_store.store_media(upload(picture()))
+    first = Post.objects.create(caption='first', author=user, image=blob.file.name, media=blob)
+    second = Post.objects.create(caption='second', author=user, image=blob.file.name, media=blob)
+    variants = generate_post_image_variants(str(first.id))
+
+    def decode(file):
+        raise AssertionError('the variants of a repost must be reused')
+    monkeypatch.setattr(images, 'build_variants', decode)
+
+    assert generate_post_image_variants(str(second.id)) == variants
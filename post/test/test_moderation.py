@@ -0,0 +1,166 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from post import signals
+from post.models import Hashtag, ModerationStatus, Post
+from post.tasks import fan_out_post, moderate_post, requeue_pending_moderation
+from post.utils import check_toxicity, moderation, trending
+from user.models import Follow
+from utils.redis_client import redis_client
+
+
+@pytest.fixture()
+def notifications(monkeypatch):
+    sent = []
+    monkeypatch.setattr(moderation.create_notification, 'delay', lambda *args: sent.append(args))
+    return sent
+
+
+@pytest.fixture()
+def follower_client(user, other_user, monkeypatch):
+    monkeypatch.setattr(signals.fan_out_post, 'delay', lambda post_id: fan_out_post(post_id))
+    Follow.objects.create(follower=other_user, following=user)
+    client = APIClient()
+    client.force_authenticate(other_user)
+    return client
+
+
+def feed_ids(client):
+    return [post['id'] for post in client.get(reverse('posts-list')).json()['results']]
+
+
+@pytest.mark.django_db
+def test_create_does_not_call_the_model(post_data, logged_in_client, monkeypatch):
+    def unavailable(text):
+        raise AssertionError('the model must not be called during the request')
+    monkeypatch.setattr(check_toxicity, 'make_request', unavailable)
+
+    response = logged_in_client.post(reverse('posts-list'), data=post_data)
+
+    assert response.status_code == 201
+    assert response.data['moderation_status'] == ModerationStatus.PENDING
+
+
+@pytest.mark.django_db
+def test_pending_post_is_only_visible_to_its_author(post_data, logged_in_client, follower_client, notifications,
+                                                    monkeypatch):
+    post_id = logged_in_client.post(reverse('posts-list'), data=post_data).data['id']
+
+    assert feed_ids(follower_client) == []
+    assert APIClient().get(reverse('posts-detail', kwargs={'pk': post_id})).status_code == 404
+    assert logged_in_client.get(reverse('posts-detail', kwargs={'pk': post_id})).status_code == 200
+
+    monkeypatch.setattr(moderation, 'predict_flagged', lambda text: False)
+    assert moderate_post(post_id) == ModerationStatus.PUBLISHED
+
+    assert feed_ids(follower_client) == [post_id]
+    assert notifications[0][1] == 'Your post has been published'
+
+
+@pytest.mark.django_db
+def test_flagged_post_is_rejected(created_post, notifications, monkeypatch):
+    Post.objects.filter(pk=created_post.pk).update(moderation_status=ModerationStatus.PENDING)
+    monkeypatch.setattr(moderation, 'predict_flagged', lambda text: True)
+
+    assert moderate_post(str(created_post.pk)) == ModerationStatus.REJECTED
+    created_post.refresh_from_db()
+    assert created_post.moderation_status == ModerationStatus.REJECTED
+    assert notifications[0][0] == str(created_post.author_id)
+
+    # A post is only moderated once per caption.
+    assert moderate_post(str(created_post.pk)) is None
+    assert len(notifications) == 1
+
+
+@pytest.mark.django_db
+def test_caption_edit_goes_back_to_pending(created_post, logged_in_client):
+    url = reverse('posts-detail', kwargs={'pk': created_post.pk})
+    Post.objects.filter(pk=created_post.pk).update(caption='same caption')
+
+    logged_in_client.patch(url, data={'caption': 'Same caption'})
+    created_post.refresh_from_db()
+    assert created_post.moderation_status == ModerationStatus.PUBLISHED
+
+    logged_in_client.patch(url, data={'caption': 'a new caption'})
+    created_post.refresh_from_db()
+    assert created_post.moderation_status == ModerationStatus.PENDING
+
+
+@pytest.mark.django_db
+def test_lexicon_decides_once_model_retries_are_spent(created_post, notifications, monkeypatch):
+    Post.objects.filter(pk=created_post.pk).update(moderation_status=ModerationStatus.PENDING,
+                                                   caption='you stupid idiot')
+    calls = []
+
+    def unavailable(text):
+        calls.append(text)
+        raise ConnectionError('model unavailable')
+    monkeypatch.setattr(moderation, 'predict_flagged', unavailable)
+
+    result = moderate_post.apply(args=[str(created_post.pk)])
+
+    assert result.successful()
+    assert len(calls) == moderate_post.max_retries + 1
+    created_post.refresh_from_db()
+    assert created_post.moderation_status == ModerationStatus.REJECTED
+    assert notifications[0][1].startswith('Your post was rejected')
+
+
+@pytest.mark.django_db
+def test_undecided_post_is_held_and_requeued(created_post, notifications, monkeypatch):
+    Post.objects.filter(pk=created_post.pk).update(moderation_status=ModerationStatus.PENDING,
+                                                   caption='I will shoot you tomorrow')
+
+    def unavailable(text):
+        raise ConnectionError('model unavailable')
+    monkeypatch.setattr(moderation, 'predict_flagged', unavailable)
+
+    assert moderate_post.apply(args=[str(created_post.pk)]).result is None
+    created_post.refresh_from_db()
+    assert created_post.moderation_status == ModerationStatus.PENDING
+    assert notifications == []
+
+    queued = []
+    monkeypatch.setattr(moderate_post, 'delay', queued.append)
+    Post.objects.filter(pk=created_post.pk).update(created_at=timezone.now() - timedelta(hours=2))
+    assert requeue_pending_moderation() == 1
+    assert queued == [str(created_post.pk)]
+
+
+@pytest.mark.django_db
+def test_moderation_is_only_queued_for_new_captions(post_data, logged_in_client, monkeypatch,
+                                                   django_capture_on_commit_callbacks):
+    queued = []
+    monkeypatch.setattr(signals.moderate_post, 'delay', queued.append)
+    with django_capture_on_commit_callbacks(execute=True):
+        post_id = logged_in_client.post(reverse('posts-list'), data=post_data).data['id']
+    assert queued == [post_id]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        post = Post.objects.get(pk=post_id)
+        post.save(update_fields=['like_count'])
+        logged_in_client.patch(reverse('posts-detail', kwargs={'pk': post_id}), data={'caption': post.caption})
+    assert queued == [post_id]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        logged_in_client.patch(reverse('posts-detail', kwargs={'pk': post_id}), data={'caption': 'a new caption'})
+    assert queued == [post_id, post_id]
+
+
+@pytest.mark.django_db
+def test_moderation_is_queued_once_the_hashtags_are_linked(image, logged_in_client, notifications, monkeypatch,
+                                                          django_capture_on_commit_callbacks):
+    redis_client.delete(trending.TRENDING_KEY, trending.LANDMARK_KEY)
+    monkeypatch.setattr(moderation, 'predict_flagged', lambda text: False)
+    # The worker decides before the request goes on.
+    monkeypatch.setattr(signals.moderate_post, 'delay', lambda post_id: moderate_post(post_id))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        logged_in_client.post(reverse('posts-list'), data={'caption': 'sunset #beach', 'image': image})
+
+    assert Hashtag.objects.get(name='beach').post_count == 1
+    assert [name for name, score in trending.top()] == ['beach']
@@ -0,0 +1,92 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from post.models import ModerationStatus, Post
+from post.utils import moderation
+from post.utils.fake_model_server import FakeModelServer
+from post.utils.moderation_client import CircuitBreaker, ModelUnavailable, ModerationClient
+
+
+@pytest.fixture()
+def model_server():
+    with FakeModelServer(latency=0.01) as server:
+        yield server
+
+
+def make_client(url, **kwargs):
+    kwargs.setdefault('breaker', CircuitBreaker(threshold=2, reset_timeout=0.2))
+    return ModerationClient(url=url, **kwargs)
+
+
+def test_concurrent_calls_are_batched(model_server):
+    client = make_client(model_server.url, batch_size=8, batch_wait_ms=50)
+    texts = [f'caption {i}' for i in range(15)] + ['you idiot']
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        predictions = list(executor.map(client.classify, texts))
+    client.close()
+
+    assert sum(model_server.batch_sizes) == 16
+    assert model_server.requests < 16
+    assert max(model_server.batch_sizes) <= 8
+    assert predictions[0][0] == {'label': 'toxic', 'score': 0.05}
+    assert predictions[-1][0] == {'label': 'toxic', 'score': 0.9}
+
+
+def test_slow_model_raises_model_unavailable(model_server):
+    model_server.server.latency = 0.5
+    client = make_client(model_server.url, timeout=0.1, batch_wait_ms=1)
+
+    with pytest.raises(ModelUnavailable):
+        client.classify('hello')
+    client.close()
+
+
+def test_breaker_opens_then_lets_a_trial_through(model_server):
+    client = make_client('http://127.0.0.1:9/', timeout=0.2, batch_wait_ms=1)
+    for _ in range(2):
+        with pytest.raises(ModelUnavailable):
+            client.classify('hello')
+    assert client.breaker.is_open
+
+    model_server.reset()
+    client.url = model_server.url
+    with pytest.raises(ModelUnavailable, match='circuit is open'):
+        client.classify('hello')
+    assert model_server.requests == 0
+
+    time.sleep(0.25)
+    assert client.classify('hello')
+    assert not client.breaker.is_open
+    client.close()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('policy, status', [('publish', ModerationStatus.PUBLISHED),
+                                            ('reject', ModerationStatus.REJECTED)])
+def test_degrade_policy_decides_without_the_model(created_post, monkeypatch, policy, status):
+    Post.objects.filter(pk=created_post.pk).update(moderation_status=ModerationStatus.PENDING)
+    created_post.refresh_from_db()
+    monkeypatch.setattr(moderation.create_notification, 'delay', lambda *args: None)
+    monkeypatch.setattr(moderation, 'MODERATION_DEGRADE_POLICY', policy)
+
+    def unavailable(text):
+        raise ModelUnavailable('circuit open')
+    monkeypatch.setattr(moderation, 'predict_flagged', unavailable)
+
+    assert moderation.moderate(created_post) == status
+
+
+@pytest.mark.django_db
+def test_retry_policy_raises(created_post, monkeypatch):
+    Post.objects.filter(pk=created_post.pk).update(moderation_status=ModerationStatus.PENDING)
+    created_post.refresh_from_db()
+
+    def unavailable(text):
+        raise ModelUnavailable('circuit open')
+    monkeypatch.setattr(moderation, 'predict_flagged', unavailable)
+
+    with pytest.raises(ModelUnavailable):
+        moderation.moderate(created_post)
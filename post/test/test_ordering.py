@@ -0,0 +1,85 @@
+import pytest
+from django.urls import get_resolver, reverse, URLPattern, URLResolver
+from rest_framework.test import APIClient
+
+from post.models import Post
+from user.models import Follow
+from utils.pagination import CursorSetPagination
+
+
+def iter_view_classes(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from iter_view_classes(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and hasattr(pattern.callback, 'cls'):
+            yield pattern.callback.cls
+
+
+def paginated_views():
+    views = {view for view in iter_view_classes(get_resolver().url_patterns)
+             if getattr(view, 'pagination_class', None) is CursorSetPagination}
+    return sorted(views, key=lambda view: view.__name__)
+
+
+def get_model(view):
+    queryset = getattr(view, 'queryset', None)
+    if queryset is not None:
+        return queryset.model
+    return view.serializer_class.Meta.model
+
+
+def is_indexed(model, ordering):
+    """
+    An ordering is backed when its field is a unique column of the model, or when the model has an index ending
+    on (field, id).
+    Related orderings such as following__username sort across a join no index of the model backs.
+    """
+    if '__' in ordering:
+        return False
+
+    field = model._meta.get_field(ordering)
+    if field.primary_key or field.unique:
+        return True
+    return any(index.fields[-2:] == [ordering, 'id'] for index in model._meta.indexes)
+
+
+@pytest.mark.parametrize('view', paginated_views(), ids=lambda view: view.__name__)
+def test_every_allowed_ordering_is_indexed(view):
+    model = get_model(view)
+    orderings = set(getattr(view, 'ordering_fields', None) or [])
+    orderings.update(field.lstrip('-') for field in view.ordering)
+
+    assert orderings, f"{view.__name__} declares no ordering"
+    for ordering in orderings:
+        assert is_indexed(model, ordering), f"{view.__name__} orders {model.__name__} by unindexed {ordering}"
+
+
+def test_related_orderings_are_not_indexed():
+    assert not is_indexed(Follow, 'following__username')
+    assert is_indexed(Follow, 'created_at')
+
+
+@pytest.mark.django_db
+def test_unsupported_ordering_is_rejected(created_post):
+    response = APIClient().get(reverse('posts-list'), {'ordering': 'caption'})
+
+    assert response.status_code == 400
+    assert 'ordering' in response.json()
+
+
+@pytest.mark.django_db
+def test_multiple_orderings_are_rejected(created_post):
+    response = APIClient().get(reverse('posts-list'), {'ordering': 'created_at,caption'})
+
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_allowed_ordering(post_data, image, user):
+    older = Post.objects.create(**post_data)
+    newer = Post.objects.create(caption='newer', author=user, image=image)
+
+    response = APIClient().get(reverse('posts-list'), {'ordering': 'created_at'})
+
+    assert response.status_code == 200
+    assert [post['id'] for post in response.json()['results']] == [str(older.id), str(newer.id)]
@@ -0,0 +1,97 @@
+import json
+
+import pytest
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from alx_project_nexus import views
+from alx_project_nexus.persisted_queries import PERSISTED_QUERIES_KEY, get_document, query_hash, register_query
+from alx_project_nexus.schema import schema
+from utils.redis_client import redis_client
+
+FEED_QUERY = """
+query Feed($first: Int) {
+  allPosts(first: $first) { edges { node { id caption } } }
+}
+"""
+
+
+@pytest.fixture(autouse=True)
+def clear_persisted_queries():
+    redis_client.delete(PERSISTED_QUERIES_KEY)
+    for key in redis_client.scan_iter(views.GRAPHQL_COST_KEY.format(client='*')):
+        redis_client.delete(key)
+    get_document.cache_clear()
+
+
+def post_graphql(payload):
+    response = APIClient().post('/graphql/', data=json.dumps(payload), content_type='application/json')
+    return response.json()
+
+
+def persisted(digest, **payload):
+    return {"extensions": {"persistedQuery": {"version": 1, "sha256Hash": digest}}, **payload}
+
+
+@pytest.mark.django_db
+def test_registered_hash_executes_the_stored_document(created_post):
+    digest = register_query(FEED_QUERY)
+
+    result = post_graphql(persisted(digest, variables={"first": 5}))
+
+    assert "errors" not in result
+    assert result["data"]["allPosts"]["edges"][0]["node"]["caption"] == created_post.caption
+
+
+@pytest.mark.django_db
+def test_unknown_hash_falls_back_to_the_query_text(created_post):
+    result = post_graphql(persisted(query_hash(FEED_QUERY), query=FEED_QUERY, variables={"first": 5}))
+
+    assert "errors" not in result
+    assert len(result["data"]["allPosts"]["edges"]) == 1
+
+
+@pytest.mark.django_db
+def test_unknown_hash_without_query_is_reported():
+    result = post_graphql(persisted("0" * 64))
+
+    assert result["errors"][0]["message"] == "PersistedQueryNotFound"
+
+
+@pytest.mark.django_db
+def test_strict_mode_only_allows_registered_queries(monkeypatch, created_post):
+    monkeypatch.setattr(views, 'GRAPHQL_PERSISTED_QUERIES_STRICT', True)
+    digest = register_query(FEED_QUERY)
+
+    rejected = post_graphql({"query": FEED_QUERY, "variables": {"first": 5}})
+    allowed = post_graphql(persisted(digest, variables={"first": 5}))
+
+    assert rejected["errors"][0]["message"] == "Only persisted queries are allowed."
+    assert "errors" not in allowed
+
+
+@pytest.mark.django_db
+def test_documents_are_parsed_once(created_post):
+    for _ in range(3):
+        post_graphql({"query": FEED_QUERY, "variables": {"first": 5}})
+
+    info = get_document.cache_info()
+    assert info.misses == 1
+    assert info.hits == 2
+
+
+def test_validation_errors_are_cached():
+    document, errors = get_document(schema.graphql_schema, "{ allPosts { edges { node { missing } } } }")
+
+    assert errors
+    assert get_document.cache_info().currsize == 1
+
+
+@pytest.mark.django_db
+def test_register_command(tmp_path):
+    path = tmp_path / "feed.graphql"
+    path.write_text(FEED_QUERY)
+
+    call_command('register_persisted_queries', str(path))
+
+    assert redis_client.hget(PERSISTED_QUERIES_KEY, query_hash(FEED_QUERY)).decode() == FEED_QUERY
@@ -0,0 +1,99 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from post.models import Post
+from post.utils import response_cache
+from user.models import Follow, PrivacyChoice
+from utils import metrics
+
+
+def hits(endpoint, action):
+    return metrics.snapshot(response_cache.METRICS_NAMESPACE).get(f"{endpoint}_{action}_hits", 0)
+
+
+def captions(response):
+    return [post['caption'] for post in response.json()['results']]
+
+
+@pytest.mark.django_db
+def test_list_is_served_from_cache(created_post):
+    client = APIClient()
+    before = hits('posts', 'list')
+
+    first = client.get(reverse('posts-list'))
+    second = client.get(reverse('posts-list'))
+
+    assert first.json() == second.json()
+    assert hits('posts', 'list') == before + 1
+
+
+@pytest.mark.django_db
+def test_post_update_invalidates_cached_pages(created_post):
+    client = APIClient()
+    client.get(reverse('posts-list'))
+    client.get(reverse('posts-detail', args=[created_post.id]))
+
+    created_post.caption = 'edited caption'
+    created_post.save()
+
+    assert captions(client.get(reverse('posts-list'))) == ['edited caption']
+    assert client.get(reverse('posts-detail', args=[created_post.id])).json()['caption'] == 'edited caption'
+
+
+@pytest.mark.django_db
+def test_soft_delete_invalidates_detail(created_post):
+    client = APIClient()
+    assert client.get(reverse('posts-detail', args=[created_post.id])).status_code == 200
+
+    created_post.is_deleted = True
+    created_post.save()
+
+    assert client.get(reverse('posts-detail', args=[created_post.id])).status_code == 404
+
+
+@pytest.mark.django_db
+def test_new_post_appears_on_first_page(created_post, other_user, image):
+    client = APIClient()
+    client.get(reverse('posts-list'))
+
+    Post.objects.create(caption='brand new', author=other_user, image=image)
+
+    assert 'brand new' in captions(client.get(reverse('posts-list')))
+
+
+@pytest.mark.django_db
+def test_privacy_change_invalidates_public_pages(created_post, other_user, image):
+    Post.objects.create(caption='hidden soon', author=other_user, image=image)
+    client = APIClient()
+    assert 'hidden soon' in captions(client.get(reverse('posts-list')))
+
+    other_user.privacy_choice = PrivacyChoice.PRIVATE
+    other_user.save()
+
+    assert 'hidden soon' not in captions(client.get(reverse('posts-list')))
+
+
+@pytest.mark.django_db
+def test_follow_changes_the_viewer_visibility(logged_in_client, user, other_user, image):
+    other_user.privacy_choice = PrivacyChoice.PRIVATE
+    other_user.save()
+    Post.objects.create(caption='followers only', author=other_user, image=image)
+    url = reverse('posts-list') + '?search=followers'
+    assert captions(logged_in_client.get(url)) == []
+
+    Follow.objects.create(follower=user, following=other_user)
+
+    assert captions(logged_in_client.get(url)) == ['followers only']
+
+
+@pytest.mark.django_db
+def test_hit_ratio_is_exposed(admin_user, created_post):
+    client = APIClient()
+    client.get(reverse('posts-list'))
+    client.get(reverse('posts-list'))
+    client.force_authenticate(admin_user)
+
+    response = client.get(reverse('metrics', args=[response_cache.METRICS_NAMESPACE]))
+
+    assert 0 < response.json()['ratios']['posts_list_hit_ratio'] < 1
@@ -0,0 +1,91 @@
+import sqlite3
+import uuid
+
+import pytest
+from django.urls import reverse
+
+from post.models import Post
+from post.utils.hashtags import sync_hashtags
+from post.utils.search import SQLiteSearchBackend
+from utils.pagination import CursorSetPagination
+
+
+def create_post(post_data, caption, tags=None):
+    post_data['image'].seek(0)
+    post = Post.objects.create(**{**post_data, 'caption': caption})
+    sync_hashtags(post, tags or caption, created=True)
+    return post
+
+
+@pytest.mark.django_db
+def test_search_ranks_caption_matches_first(client, post_data):
+    tagged = create_post(post_data, 'Holiday photos', tags='#django')
+    captioned = create_post(post_data, 'Learning django with friends')
+    create_post(post_data, 'Nothing related')
+
+    results = client.get(reverse('posts-search'), {'q': 'Django'}).json()['results']
+
+    assert [result['id'] for result in results] == [str(captioned.id), str(tagged.id)]
+    assert results[0]['highlight'] == 'Learning <mark>django</mark> with friends'
+    assert results[0]['rank'] > results[1]['rank']
+
+
+@pytest.mark.django_db
+def test_search_pages_with_rank_cursor(client, post_data, monkeypatch):
+    monkeypatch.setattr(CursorSetPagination, 'page_size', 2)
+    best = create_post(post_data, 'django loves django')
+    # Tied ranks, so page boundaries fall inside the group.
+    tied = {str(create_post(post_data, f'django post {i}').id) for i in range(5)}
+
+    pages = []
+    url, params = reverse('posts-search'), {'q': 'django'}
+    while url:
+        page = client.get(url, params).json()
+        pages.append([result['id'] for result in page['results']])
+        url, params = page['next'], None
+        assert len(pages) <= 4
+
+    seen = [pk for page in pages for pk in page]
+    assert [len(page) for page in pages] == [2, 2, 2]
+    assert seen[0] == str(best.id)
+    assert len(seen) == len(set(seen)) == 6
+    assert set(seen[1:]) == tied
+
+
+@pytest.mark.django_db
+def test_search_validates_input(client):
+    assert client.get(reverse('posts-search'), {'q': '  '}).status_code == 400
+    assert client.get(reverse('posts-search'), {'q': 'django', 'cursor': 'bad'}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_search_filter_and_caption_updates(client, post_data):
+    post = create_post(post_data, 'Cooking #pasta')
+
+    assert [p['id'] for p in client.get(reverse('posts-list'), {'search': 'pasta'}).json()['results']] == [str(post.id)]
+
+    post.caption = 'Cooking #risotto'
+    post.save()
+    sync_hashtags(post, post.caption)
+
+    assert client.get(reverse('posts-list'), {'search': 'pasta'}).json()['results'] == []
+    assert client.get(reverse('posts-search'), {'q': 'risotto'}).json()['results'][0]['id'] == str(post.id)
+
+
+def test_sqlite_backend_ranks_and_pages():
+    backend = SQLiteSearchBackend(sqlite3.connect(':memory:'))
+    ids = [uuid.uuid4() for _ in range(3)]
+    backend.index([
+        (ids[0], 'Holiday photos', 'django'),
+        (ids[1], 'Learning django with friends', ''),
+        (ids[2], 'Nothing related', 'python'),
+    ])
+
+    rows = backend.match('Django')
+    assert [row[0] for row in rows] == [str(ids[1]), str(ids[0])]
+    assert rows[0][2] == 'Learning <mark>django</mark> with friends'
+
+    assert [row[0] for row in backend.match('django', after=(rows[0][1], rows[0][0]))] == [str(ids[0])]
+
+    backend.index([(ids[1], 'Learning flask', '')])
+    assert [row[0] for row in backend.match('django')] == [str(ids[0])]
@@ -0,0 +1,97 @@
+import pytest
+from django.urls import reverse
+
+from post.models import Post
+from post.utils import timeline
+from user.models import Follow, User
+from utils import metrics
+from utils.redis_client import redis_client
+
+
+@pytest.fixture()
+def followed_post(user, other_user, image):
+    Follow.objects.create(follower=user, following=other_user)
+    return Post.objects.create(caption="followed post", author=other_user, image=image)
+
+
+@pytest.mark.django_db
+def test_rebuild_timeline(user, followed_post):
+    redis_client.delete(timeline.timeline_key(user.id))
+    assert timeline.rebuild_timeline(user.id) == 1
+    assert timeline.read_timeline(user.id) == [str(followed_post.id)]
+
+
+@pytest.mark.django_db
+def test_empty_timeline_is_not_rebuilt_on_every_read(user, monkeypatch):
+    redis_client.delete(timeline.timeline_key(user.id))
+    rebuilds = []
+    rebuild = timeline.rebuild_timeline
+    monkeypatch.setattr(timeline, 'rebuild_timeline', lambda user_id: rebuilds.append(user_id) or rebuild(user_id))
+
+    assert timeline.read_timeline(user.id) == []
+    assert timeline.read_timeline(user.id) == []
+    assert timeline.read_timeline(user.id, reverse=True) == []
+    assert len(rebuilds) == 1
+    assert redis_client.ttl(timeline.timeline_key(user.id)) > 0
+
+
+@pytest.mark.django_db
+def test_fan_out_only_pushes_to_warm_timelines(user, other_user, followed_post, image):
+    timeline.rebuild_timeline(user.id)
+    redis_client.delete(timeline.timeline_key(other_user.id))
+    post = Post.objects.create(caption="second post", author=other_user, image=image)
+
+    assert timeline.fan_out_post(post) == 1
+    assert timeline.read_timeline(user.id) == [str(post.id), str(followed_post.id)]
+
+
+@pytest.mark.django_db
+def test_feed_is_served_from_timeline(user, other_user, followed_post, logged_in_client, image):
+    stranger = User.objects.create_user(username='stranger', password='testpassword', email="stranger@gmail.com")
+    Post.objects.create(caption="not followed", author=stranger, image=image)
+    response = logged_in_client.get(reverse("posts-list"))
+    assert response.status_code == 200
+    assert [item['id'] for item in response.data['results']] == [str(followed_post.id)]
+
+
+@pytest.mark.django_db
+def test_delete_removes_post_from_timeline(user, followed_post):
+    timeline.rebuild_timeline(user.id)
+    followed_post.is_deleted = True
+    followed_post.save()
+    timeline.remove_post(followed_post)
+    assert redis_client.zrange(timeline.timeline_key(user.id), 0, -1) == [timeline.EMPTY_MARKER.encode()]
+
+
+@pytest.mark.django_db
+def test_unfollow_removes_author_posts(user, other_user, image, followed_post):
+    own_post = Post.objects.create(caption="own post", author=user, image=image)
+    timeline.rebuild_timeline(user.id)
+    Follow.objects.filter(follower=user, following=other_user).delete()
+    assert timeline.read_timeline(user.id) == [str(own_post.id)]
+
+
+@pytest.mark.django_db
+def test_timeline_window_follows_cursor(user, other_user, image):
+    Follow.objects.create(follower=user, following=other_user)
+    posts = [Post.objects.create(caption=f"post {i}", author=other_user, image=image) for i in range(3)]
+    timeline.rebuild_timeline(user.id)
+
+    window = timeline.read_timeline(user.id, str(posts[2].created_at), count=10)
+    assert window == [str(posts[1].id), str(posts[0].id)]
+    window = timeline.read_timeline(user.id, str(posts[0].created_at), reverse=True, count=1)
+    assert window == [str(posts[1].id)]
+
+
+@pytest.mark.django_db
+def test_high_follower_author_is_merged_at_read_time(user, followed_post, other_user, image, monkeypatch):
+    monkeypatch.setattr(timeline, 'FEED_FANOUT_FOLLOWER_THRESHOLD', 0)
+    timeline.rebuild_timeline(user.id)
+    post = Post.objects.create(caption="celebrity post", author=other_user, image=image)
+
+    assert timeline.fan_out_post(post) == 0
+    assert redis_client.zscore(timeline.timeline_key(user.id), str(post.id)) is None
+    assert timeline.read_timeline(user.id) == [str(post.id), str(followed_post.id)]
+    assert timeline.read_timeline(user.id, str(post.created_at), count=10) == [str(followed_post.id)]
+    assert metrics.snapshot(timeline.METRICS_NAMESPACE)['pull_merges'] >= 2
+    redis_client.srem(timeline.PULL_AUTHORS_KEY, str(other_user.id))
@@ -0,0 +1,64 @@
+import pytest
+
+from post.utils import check_toxicity, toxicity_cache
+from utils import metrics
+from utils.redis_client import redis_client
+
+
+@pytest.fixture(autouse=True)
+def clear_toxicity_cache():
+    toxicity_cache.local_scores.clear()
+    for key in redis_client.scan_iter("toxicity:*"):
+        redis_client.delete(key)
+    redis_client.delete(metrics.metrics_key(toxicity_cache.METRICS_NAMESPACE))
+
+
+@pytest.fixture()
+def model_calls(monkeypatch):
+    calls = []
+
+    def make_request(text):
+        calls.append(text)
+        return [[{"label": "toxic", "score": 0.7}, {"label": "neutral", "score": 0.3}]]
+    monkeypatch.setattr(check_toxicity, 'make_request', make_request)
+    return calls
+
+
+def test_near_identical_captions_share_an_entry():
+    assert toxicity_cache.normalize_text('  Hello\u200b   WORLD\n') == 'hello world'
+    assert toxicity_cache.text_digest('\uff28ello world') == toxicity_cache.text_digest('hello  world')
+
+
+def test_model_is_called_once_per_text(model_calls):
+    assert check_toxicity.is_flagged('You are awful')
+    assert check_toxicity.is_flagged('you  are AWFUL')
+
+    assert model_calls == ['You are awful']
+    assert metrics.snapshot(toxicity_cache.METRICS_NAMESPACE)['memory_hits'] == 1
+
+
+def test_redis_tier_survives_the_process_cache(model_calls):
+    check_toxicity.is_flagged('You are awful')
+    toxicity_cache.local_scores.clear()
+
+    assert check_toxicity.is_flagged('You are awful')
+    assert len(model_calls) == 1
+    assert metrics.hit_ratios(metrics.snapshot(toxicity_cache.METRICS_NAMESPACE))['redis_hit_ratio'] == 0.5
+
+
+def test_threshold_changes_reuse_cached_scores(model_calls, monkeypatch):
+    assert check_toxicity.is_flagged('You are awful')
+
+    monkeypatch.setattr(check_toxicity, 'THRESHOLD', 0.8)
+
+    assert not check_toxicity.is_flagged('You are awful')
+    assert len(model_calls) == 1
+
+
+def test_model_errors_are_not_cached(monkeypatch):
+    def unavailable(text):
+        raise ConnectionError('model unavailable')
+    monkeypatch.setattr(check_toxicity, 'make_request', unavailable)
+
+    assert not check_toxicity.is_flagged('You are awful')
+    assert not list(redis_client.scan_iter("toxicity:*"))
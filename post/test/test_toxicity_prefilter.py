@@ -0,0 +1,59 @@
+import pytest
+
+from post.utils import check_toxicity, toxicity_cache
+from utils import metrics
+from utils.redis_client import redis_client
+
+
+@pytest.fixture(autouse=True)
+def clear_prefilter():
+    toxicity_cache.local_scores.clear()
+    for key in redis_client.scan_iter("toxicity:*"):
+        redis_client.delete(key)
+    redis_client.delete(metrics.metrics_key(check_toxicity.PREFILTER_METRICS_NAMESPACE))
+
+
+@pytest.fixture()
+def model_calls(monkeypatch):
+    calls = []
+
+    def make_request(text):
+        calls.append(text)
+        return [[{"label": "toxic", "score": 0.1}]]
+    monkeypatch.setattr(check_toxicity, 'make_request', make_request)
+    return calls
+
+
+@pytest.mark.parametrize('text', ['', '🌅🏖️', '12:30 !!!'])
+def test_text_without_letters_skips_the_model(model_calls, text):
+    assert check_toxicity.predict_flagged(text) is False
+    assert model_calls == []
+
+
+@pytest.mark.parametrize('text', ['stupid moron', 'Y0U are an IDIOOOT and a LOSER', 'go kill yourself', 'y0u r3tard'])
+def test_obvious_abuse_skips_the_model(model_calls, text):
+    assert check_toxicity.predict_flagged(text) is True
+    assert model_calls == []
+
+
+@pytest.mark.parametrize('text', ['Sunset at the beach with friends', 'I hate mondays', 'f*ck this',
+                                  "don't be stupid, you'll love this", 'I will shoot you tomorrow', 'go stab him'])
+def test_text_without_obvious_abuse_is_escalated(model_calls, text):
+    assert check_toxicity.predict_flagged(text) is False
+    assert model_calls == [text]
+
+
+def test_flag_score_is_configurable(model_calls, monkeypatch):
+    monkeypatch.setattr(check_toxicity, 'TOXICITY_LEXICON_FLAG_SCORE', 3)
+
+    assert check_toxicity.predict_flagged('stupid moron') is False
+    assert model_calls == ['stupid moron']
+
+
+def test_saved_traffic_is_reported(model_calls):
+    for text in ['🎉', 'stupid idiot', 'I hate rain', 'lovely day']:
+        check_toxicity.predict_flagged(text)
+
+    values = metrics.snapshot(check_toxicity.PREFILTER_METRICS_NAMESPACE)
+    assert values == {'prefilter_hits': 2.0, 'prefilter_misses': 2.0, 'cleared': 1.0, 'flagged': 1.0}
+    assert metrics.hit_ratios(values)['prefilter_hit_ratio'] == 0.5
@@ -0,0 +1,120 @@
+import time
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from alx_project_nexus.settings import TRENDING_HALF_LIFE
+from post.models import Hashtag, ModerationStatus, Post, TrendingHashtag
+from post.utils import moderation, trending
+from post.utils.hashtags import sync_hashtags
+from utils.redis_client import redis_client
+
+
+@pytest.fixture(autouse=True)
+def clear_trending():
+    redis_client.delete(trending.TRENDING_KEY, trending.LANDMARK_KEY)
+
+
+@pytest.mark.django_db
+def test_recent_uses_outrank_old_ones():
+    now = time.time()
+    trending.record(['old'] * 4, timestamp=now - 2 * TRENDING_HALF_LIFE)
+    trending.record(['new'] * 2, timestamp=now)
+
+    scores = dict(trending.top(timestamp=now))
+
+    assert scores['new'] == pytest.approx(2)
+    assert scores['old'] == pytest.approx(1)
+    assert [name for name, score in trending.top(timestamp=now)] == ['new', 'old']
+
+
+@pytest.mark.django_db
+def test_capacity_evicts_the_lowest_tag(monkeypatch):
+    monkeypatch.setattr(trending, 'TRENDING_CAPACITY', 2)
+    trending.record(['a', 'a', 'a', 'b', 'c'])
+
+    scores = dict(trending.top())
+
+    assert set(scores) == {'a', 'c'}
+    assert scores['c'] == pytest.approx(2)
+
+
+@pytest.mark.django_db
+def test_renormalize_keeps_decayed_scores():
+    now = time.time()
+    trending.record(['tag'], timestamp=now - TRENDING_HALF_LIFE)
+    before = trending.top(timestamp=now)
+
+    trending.renormalize(timestamp=now)
+
+    assert trending.get_landmark() == pytest.approx(now)
+    assert trending.top(timestamp=now) == before
+
+
+@pytest.mark.django_db
+def test_attaching_hashtags_records_events(created_post):
+    sync_hashtags(created_post, '#django #python #django', created=True)
+
+    assert dict(trending.top()) == {'django': pytest.approx(1), 'python': pytest.approx(1)}
+
+
+@pytest.mark.django_db
+def test_checkpoint_survives_redis_loss(created_post):
+    sync_hashtags(created_post, '#django #python', created=True)
+    trending.record(['django'])
+
+    assert trending.checkpoint() == 2
+    redis_client.delete(trending.TRENDING_KEY, trending.LANDMARK_KEY)
+
+    assert TrendingHashtag.objects.count() == 2
+    assert [name for name, score in trending.top()] == ['django', 'python']
+
+
+@pytest.mark.django_db
+def test_trending_endpoint_and_graphql_field(created_post):
+    sync_hashtags(created_post, '#django', created=True)
+    client = APIClient()
+
+    response = client.get(reverse('hashtags-trending'), {'limit': 5})
+    graphql = client.post('/graphql/', {'query': '{ trendingHashtags(limit: 5) { name score } }'},
+                          format='json')
+
+    assert response.json() == [{'name': 'django', 'score': pytest.approx(1)}]
+    assert graphql.json()['data']['trendingHashtags'][0]['name'] == 'django'
+
+
+@pytest.mark.django_db
+def test_only_published_posts_are_counted(user, image, monkeypatch):
+    monkeypatch.setattr(moderation.create_notification, 'delay', lambda *args: None)
+    accepted = Post.objects.create(caption='#django', author=user, image=image,
+                                   moderation_status=ModerationStatus.PENDING)
+    rejected = Post.objects.create(caption='#spam', author=user, image=image,
+                                   moderation_status=ModerationStatus.PENDING)
+    sync_hashtags(accepted, accepted.caption, created=True)
+    sync_hashtags(rejected, rejected.caption, created=True)
+
+    assert trending.top() == []
+    assert dict(Hashtag.objects.values_list('name', 'post_count')) == {'django': 0, 'spam': 0}
+
+    monkeypatch.setattr(moderation, 'predict_flagged', lambda text: text == '#spam')
+    moderation.moderate(accepted)
+    moderation.moderate(rejected)
+
+    assert dict(trending.top()) == {'django': pytest.approx(1)}
+    assert dict(Hashtag.objects.values_list('name', 'post_count')) == {'django': 1, 'spam': 0}
+
+    accepted.is_deleted = True
+    accepted.save(update_fields=['is_deleted', 'updated_at'])
+    assert Hashtag.objects.get(name='django').post_count == 0
+
+
+@pytest.mark.django_db
+def test_record_renormalizes_an_old_landmark():
+    now = time.time()
+    redis_client.set(trending.LANDMARK_KEY, now - 400 * 24 * 60 * 60)
+
+    trending.record(['tag'], timestamp=now)
+
+    assert trending.get_landmark() == pytest.approx(now)
+    assert dict(trending.top(timestamp=now)) == {'tag': pytest.approx(1)}
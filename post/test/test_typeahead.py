@@ -0,0 +1,109 @@
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from alx_project_nexus.settings import TYPEAHEAD_MAX_PREFIX
+from post.utils.hashtags import sync_hashtags
+from user.models import Follow, User
+from utils import typeahead
+from utils.redis_client import redis_client
+
+
+@pytest.fixture(autouse=True)
+def clear_typeahead():
+    for key in redis_client.scan_iter("typeahead:*"):
+        redis_client.delete(key)
+
+
+def test_completions_are_ranked_by_popularity():
+    typeahead.update(typeahead.HASHTAG_INDEX, {'django': 5, 'djangorest': 9, 'dogs': 20})
+
+    assert typeahead.complete(typeahead.HASHTAG_INDEX, '#Dj') == ['djangorest', 'django']
+    assert typeahead.complete(typeahead.HASHTAG_INDEX, 'd', limit=1) == ['dogs']
+    assert typeahead.complete(typeahead.HASHTAG_INDEX, '') == []
+
+
+def test_long_prefixes_fall_back_to_the_lexical_index():
+    base = 'x' * TYPEAHEAD_MAX_PREFIX
+    typeahead.update(typeahead.HASHTAG_INDEX, {f'{base}aa': 1, f'{base}ab': 3, f'{base}b': 2})
+
+    assert typeahead.complete(typeahead.HASHTAG_INDEX, f'{base}a') == [f'{base}ab', f'{base}aa']
+
+
+def test_remove_drops_every_prefix():
+    typeahead.update(typeahead.USER_INDEX, {'alice': 1})
+    typeahead.remove(typeahead.USER_INDEX, 'alice')
+
+    assert typeahead.complete(typeahead.USER_INDEX, 'a') == []
+
+
+@pytest.mark.django_db
+def test_attached_hashtags_are_ranked_by_post_count(user, post_data, created_post):
+    sync_hashtags(created_post, '#django #djangocon', created=True)
+    post_data['image'].seek(0)
+    second = type(created_post).objects.create(**post_data)
+    sync_hashtags(second, '#djangocon', created=True)
+
+    assert typeahead.complete(typeahead.HASHTAG_INDEX, 'djan') == ['djangocon', 'django']
+
+
+@pytest.mark.django_db
+def test_usernames_follow_registration_renames_and_follows(user, other_user):
+    Follow.objects.create(follower=user, following=other_user)
+    assert typeahead.complete(typeahead.USER_INDEX, '@') == []
+    assert typeahead.complete(typeahead.USER_INDEX, 't') == ['testuser']
+
+    user.username = 'tom'
+    user.save()
+    other_user.username = 'tina'
+    other_user.save()
+
+    assert typeahead.complete(typeahead.USER_INDEX, 't') == ['tina', 'tom']
+    assert typeahead.complete(typeahead.USER_INDEX, 'te') == []
+
+
+@pytest.mark.django_db
+def test_removed_users_are_replaced_by_trimmed_completions(user, other_user, monkeypatch):
+    monkeypatch.setattr(typeahead, 'TYPEAHEAD_PREFIX_SIZE', 2)
+    tina = User.objects.create_user(username='tina', password='testpassword', email='tina@gmail.com')
+    tom = User.objects.create_user(username='tom', password='testpassword', email='tom@gmail.com')
+    Follow.objects.create(follower=other_user, following=tina)
+    Follow.objects.create(follower=other_user, following=tom)
+    Follow.objects.create(follower=user, following=tom)
+    assert typeahead.complete(typeahead.USER_INDEX, 't') == ['tom', 'tina']
+
+    tom.delete()
+    assert typeahead.complete(typeahead.USER_INDEX, 't') == ['tina', 'testuser']
+
+    tina.username = 'nina'
+    tina.save()
+    assert typeahead.complete(typeahead.USER_INDEX, 't') == ['testuser']
+
+
+@pytest.mark.django_db
+def test_autocomplete_endpoints(client, user, created_post):
+    sync_hashtags(created_post, '#python', created=True)
+
+    assert client.get(reverse('hashtags-autocomplete'), {'q': 'py'}).json() == {'results': ['python']}
+    assert client.get(reverse('users-autocomplete'), {'q': '@test'}).json() == {'results': ['testuser']}
+    assert client.get(reverse('users-autocomplete'), {'q': 'test', 'limit': 'x'}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_rebuild_restores_the_index(user, other_user, created_post):
+    Follow.objects.create(follower=user, following=other_user)
+    sync_hashtags(created_post, '#python', created=True)
+    for key in redis_client.scan_iter("typeahead:*"):
+        redis_client.delete(key)
+
+    call_command('rebuild_typeahead')
+
+    assert typeahead.complete(typeahead.HASHTAG_INDEX, 'p') == ['python']
+    assert typeahead.complete(typeahead.USER_INDEX, 'o') == ['otheruser']
+    assert redis_client.zscore(typeahead.SCORES_KEY.format(kind=typeahead.USER_INDEX), 'otheruser') == 1
+
+
+def test_benchmark_command_cleans_up():
+    call_command('benchmark_typeahead', entries=500, queries=50)
+
+    assert not list(redis_client.scan_iter("typeahead:benchmark:*"))
@@ -0,0 +1,139 @@
+import os
+from datetime import timedelta
+from io import BytesIO
+
+import pytest
+from PIL import Image
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from post.models import MediaBlob, Post, Upload, UploadStatus
+from post.tasks import delete_expired_uploads
+from post.utils import uploads
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+
+
+@pytest.fixture()
+def photo():
+    buffer = BytesIO()
+    Image.new("RGB", (64, 48), "blue").save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def start_upload(client, data):
+    response = client.post(reverse('uploads-list'), data={'filename': 'photo.jpg', 'size': len(data)})
+    assert response.status_code == 201
+    return response.data['id']
+
+
+def send_chunk(client, upload_id, data, start, end):
+    return client.put(reverse('uploads-detail', kwargs={'pk': upload_id}), data=data[start:end + 1],
+                      content_type='application/octet-stream',
+                      HTTP_CONTENT_RANGE=f"bytes {start}-{end}/{len(data)}")
+
+
+def upload_file(client, data, chunk=400):
+    upload_id = start_upload(client, data)
+    for start in range(0, len(data), chunk):
+        assert send_chunk(client, upload_id, data, start, min(start + chunk, len(data)) - 1).status_code == 200
+    assert client.post(reverse('uploads-complete', kwargs={'pk': upload_id})).status_code == 200
+    return upload_id
+
+
+@pytest.mark.django_db
+def test_post_created_from_a_chunked_upload(logged_in_client, photo, monkeypatch):
+    monkeypatch.setattr(uploads, 'UPLOAD_BUFFER_SIZE', 64)
+    upload_id = upload_file(logged_in_client, photo)
+
+    upload = Upload.objects.get(pk=upload_id)
+    assert upload.status == UploadStatus.COMPLETE
+    assert upload.content_type == 'image/jpeg'
+    with default_storage.open(upload.media.file.name) as file:
+        assert file.read() == photo
+    assert not os.path.exists(uploads.partial_path(upload))
+
+    response = logged_in_client.post(reverse('posts-list'), data={'caption': 'chunked', 'upload_id': upload_id})
+    assert response.status_code == 201
+    post = Post.objects.get(pk=response.data['id'])
+    assert post.media == upload.media
+    assert post.image.name == upload.media.file.name
+
+    # An upload can only be used once.
+    response = logged_in_client.post(reverse('posts-list'), data={'caption': 'again', 'upload_id': upload_id})
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_upload_resumes_from_the_received_offset(logged_in_client, photo):
+    upload_id = start_upload(logged_in_client, photo)
+    url = reverse('uploads-detail', kwargs={'pk': upload_id})
+
+    assert send_chunk(logged_in_client, upload_id, photo, 0, 99).data['received'] == 100
+    response = send_chunk(logged_in_client, upload_id, photo, 200, 299)
+    assert response.status_code == 409
+
+    # A retried chunk is acknowledged without being written twice.
+    assert send_chunk(logged_in_client, upload_id, photo, 0, 99).data['received'] == 100
+    assert logged_in_client.get(url).data['received'] == 100
+
+    response = logged_in_client.post(reverse('uploads-complete', kwargs={'pk': upload_id}))
+    assert response.status_code == 400
+
+    send_chunk(logged_in_client, upload_id, photo, 100, len(photo) - 1)
+    response = logged_in_client.post(reverse('uploads-complete', kwargs={'pk': upload_id}))
+    assert response.data['status'] == UploadStatus.COMPLETE
+
+
+@pytest.mark.django_db
+def test_non_images_are_rejected_on_the_first_chunk(logged_in_client):
+    data = b'#!/bin/sh\n' + b'x' * 500
+    upload_id = start_upload(logged_in_client, data)
+
+    response = send_chunk(logged_in_client, upload_id, data, 0, 99)
+
+    assert response.status_code == 400
+    assert Upload.objects.get(pk=upload_id).received == 0
+
+
+@pytest.mark.django_db
+def test_chunks_are_bounded(logged_in_client, photo, monkeypatch):
+    monkeypatch.setattr(uploads, 'UPLOAD_CHUNK_SIZE', 100)
+    upload_id = start_upload(logged_in_client, photo)
+
+    assert send_chunk(logged_in_client, upload_id, photo, 0, 100).status_code == 400
+    assert send_chunk(logged_in_client, upload_id, photo, 0, 99).status_code == 200
+
+
+@pytest.mark.django_db
+def test_uploads_are_private(logged_in_client, other_user, photo):
+    upload_id = upload_file(logged_in_client, photo)
+    client = APIClient()
+    client.force_authenticate(other_user)
+
+    assert client.get(reverse('uploads-detail', kwargs={'pk': upload_id})).status_code == 404
+    response = client.post(reverse('posts-list'), data={'caption': 'stolen', 'upload_id': upload_id})
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_expired_uploads_are_deleted(logged_in_client, photo):
+    complete_id = upload_file(logged_in_client, photo)
+    pending_id = start_upload(logged_in_client, photo)
+    send_chunk(logged_in_client, pending_id, photo, 0, 99)
+    partial = uploads.partial_path(Upload.objects.get(pk=pending_id))
+    blob_name = Upload.objects.get(pk=complete_id).media.file.name
+    Upload.objects.update(updated_at=timezone.now() - timedelta(days=2))
+    MediaBlob.objects.update(created_at=timezone.now() - timedelta(days=2))
+
+    # The two uploads, then the blob that only the complete upload used.
+    assert delete_expired_uploads() == 3
+    assert not Upload.objects.exists()
+    assert not MediaBlob.objects.exists()
+    assert not os.path.exists(partial)
+    assert not default_storage.exists(blob_name)
@@ -0,0 +1,119 @@
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django_celery_beat.models import PeriodicTask
+
+from alx_project_nexus.settings import VIEW_FLUSH_INTERVAL
+from post.models import View, StoryView
+from post.utils import view_buffer
+from utils import metrics
+from utils.redis_client import redis_client
+
+
+@pytest.fixture(autouse=True)
+def clear_view_buffer():
+    for key in redis_client.scan_iter("views:*"):
+        redis_client.delete(key)
+    redis_client.delete(metrics.metrics_key(view_buffer.METRICS_NAMESPACE))
+    yield
+    for key in redis_client.scan_iter("views:*"):
+        redis_client.delete(key)
+
+
+@pytest.mark.django_db
+def test_view_post_is_buffered_until_flush(logged_in_client, created_post, user):
+    response = logged_in_client.post(reverse('posts-view-post', args=[created_post.id]))
+
+    assert response.status_code == 202
+    assert not View.objects.exists()
+    assert redis_client.llen(view_buffer.buffer_key('post')) == 1
+
+    assert view_buffer.flush() == 1
+    created_post.refresh_from_db()
+    assert created_post.view_count == 1
+    assert View.objects.get().user_id == user.id
+    assert redis_client.llen(view_buffer.buffer_key('post')) == 0
+
+
+@pytest.mark.django_db
+def test_repeated_views_are_counted_once(created_post, created_story, user, other_user):
+    View.objects.create(post=created_post, user=user)
+    for _ in range(3):
+        view_buffer.record_view('post', created_post.id, user.id)
+        view_buffer.record_view('post', created_post.id, other_user.id)
+        view_buffer.record_view('story', created_story.id, other_user.id)
+
+    assert view_buffer.flush() == 2
+    created_post.refresh_from_db()
+    created_story.refresh_from_db()
+    assert created_post.view_count == 2
+    assert created_story.view_count == 1
+    assert StoryView.objects.get().user_id == other_user.id
+    assert metrics.snapshot(view_buffer.METRICS_NAMESPACE)['duplicates'] == 7
+
+
+@pytest.mark.django_db
+def test_flush_keeps_the_view_time(created_post, user):
+    view_buffer.record_view('post', created_post.id, user.id, timestamp=1_700_000_000.5)
+    view_buffer.flush()
+    assert View.objects.get().created_at.timestamp() == 1_700_000_000.5
+
+
+@pytest.mark.django_db
+def test_flush_stops_after_max_batches(created_post, user, other_user):
+    view_buffer.record_view('post', created_post.id, user.id)
+    view_buffer.record_view('post', created_post.id, other_user.id)
+    view_buffer.record_view('post', created_post.id, user.id)
+
+    assert view_buffer.flush(batch_size=1, max_batches=2) == 2
+    assert redis_client.llen(view_buffer.buffer_key('post')) == 1
+    assert view_buffer.flush(batch_size=1, max_batches=2) == 0
+    created_post.refresh_from_db()
+    assert created_post.view_count == 2
+
+
+@pytest.mark.django_db
+def test_flush_skips_while_another_run_holds_the_lock(created_post, user):
+    view_buffer.record_view('post', created_post.id, user.id)
+    redis_client.set(view_buffer.FLUSH_LOCK_KEY, 'other-run', ex=view_buffer.FLUSH_LOCK_TIMEOUT)
+
+    assert view_buffer.flush() is None
+    assert redis_client.llen(view_buffer.buffer_key('post')) == 1
+
+
+@pytest.mark.django_db
+def test_flush_keeps_a_lock_taken_over_by_another_run(created_post, user, monkeypatch):
+    write_batch = view_buffer.write_batch
+
+    def expire_lock(kind, batch):
+        # The lock of this run expired mid-flush and another run took it.
+        redis_client.set(view_buffer.FLUSH_LOCK_KEY, 'other-run')
+        return write_batch(kind, batch)
+
+    monkeypatch.setattr(view_buffer, 'write_batch', expire_lock)
+    view_buffer.record_view('post', created_post.id, user.id)
+
+    assert view_buffer.flush() == 1
+    assert redis_client.get(view_buffer.FLUSH_LOCK_KEY) == b'other-run'
+
+
+@pytest.mark.django_db
+def test_flush_drops_views_of_deleted_objects(created_post, created_story, user):
+    view_buffer.record_view('post', created_post.id, user.id)
+    view_buffer.record_view('story', created_story.id, user.id)
+    created_story.delete()
+
+    assert view_buffer.flush() == 1
+    created_post.refresh_from_db()
+    assert created_post.view_count == 1
+    assert not StoryView.objects.exists()
+
+
+@pytest.mark.django_db
+def test_setup_periodic_tasks_schedules_the_flush():
+    call_command('setup_periodic_tasks')
+    call_command('setup_periodic_tasks')
+
+    task = PeriodicTask.objects.get(task='post.tasks.flush_views')
+    assert task.enabled
+    assert task.interval.every == VIEW_FLUSH_INTERVAL
@@ -1,6 +1,7 @@
 from rest_framework.routers import DefaultRouter
 
-from post.views import PostViewSet, LikeViewSet, CommentViewSet, StoryViewSet, StoryLikeViewSet
+from post.views import PostViewSet, LikeViewSet, CommentViewSet, StoryViewSet, StoryLikeViewSet, HashtagViewSet, \
+    UploadViewSet
 
 router = DefaultRouter()
 
@@ -9,5 +10,7 @@ router.register('likes', LikeViewSet, basename='like')
 router.register('story_likes', StoryLikeViewSet, basename='story_like')
 router.register(r'comments', CommentViewSet, basename='comment')
 router.register('stories', StoryViewSet, basename='stories')
+router.register('hashtags', HashtagViewSet, basename='hashtags')
+router.register('uploads', UploadViewSet, basename='uploads')
 
 urlpatterns = router.urls
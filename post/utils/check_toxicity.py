@@ -1,34 +1,88 @@
-import requests
-
-from alx_project_nexus.settings import MODEL_API_URL
-from alx_project_nexus.settings import MODEL_API_TOKEN
+from alx_project_nexus.settings import TOXICITY_LEXICON_FLAG_SCORE, TOXICITY_PREFILTER_ENABLED
+from post.utils.moderation_client import get_client
+from post.utils.toxicity_cache import get_scores
+from post.utils.toxicity_lexicon import scan
+from utils import metrics
 
 
 TOXIC_LABELS = {"toxic", "insult", "obscene", "threat", "identity_hate"}
 THRESHOLD = 0.5
+PREFILTER_METRICS_NAMESPACE = "toxicity_prefilter"
+
 
 def is_flagged(text: str) -> bool:
     try:
-        response = make_request(text)
-        predictions = response[0]
-
-        for pred in predictions:
-            label = pred["label"]
-            score = pred["score"]
-            if label in TOXIC_LABELS and score >= THRESHOLD:
-                return True
-
-        return False
+        return predict_flagged(text)
     except Exception as e:
         print(f"Error in is_flagged: {e}")
         return False
 
 
-def make_request(text: str):
-    headers = {
-        "Authorization": f"Bearer {MODEL_API_TOKEN}"
-    }
+def prefilter(text: str):
+    """
+    Decide obvious cases with the local lexicon, without calling the model.
+    The lexicon only adds flags: a caption holding a severe term, or at least TOXICITY_LEXICON_FLAG_SCORE
+    abusive terms, is flagged. A single insult may be banter ("don't be stupid, you'll love this"), and threats
+    or hate avoid the listed words ("I will shoot you tomorrow"), so any other text with letters goes to the
+    model. Only text without letters, e.g. empty or emoji-only, is cleared.
+    Decisions are counted as prefilter_hits and escalations as prefilter_misses, so the prefilter_hit_ratio
+    of the metrics endpoint is the share of model traffic saved.
+    :param text:
+    :return: True for obvious abuse, False for text without letters, None when the model should decide
+    """
+    if not TOXICITY_PREFILTER_ENABLED:
+        return None
+
+    lexicon = scan(text)
+    if lexicon.severe or lexicon.abusive >= TOXICITY_LEXICON_FLAG_SCORE:
+        decision = True
+    elif any(character.isalpha() for character in text):
+        decision = None
+    else:
+        decision = False
+
+    if decision is None:
+        metrics.record(PREFILTER_METRICS_NAMESPACE, prefilter_misses=1)
+    else:
+        metrics.record(PREFILTER_METRICS_NAMESPACE, prefilter_hits=1, **{"flagged" if decision else "cleared": 1})
+    return decision
+
 
-    response = requests.post(MODEL_API_URL, headers=headers, json={"inputs": text})
-    response.raise_for_status()
-    return response.json()
+def predict_flagged(text: str) -> bool:
+    """
+    Ask whether a text is toxic.
+    Obvious cases are decided by the local prefilter, the others by the model. The label scores are read
+    from the classification cache first, the model is only called on a miss.
+    Unlike is_flagged, errors of the model API are raised so the caller can retry.
+    :param text:
+    :return:
+    """
+    decision = prefilter(text)
+    if decision is not None:
+        return decision
+
+    scores = get_scores(text, classify)
+
+    for label, score in scores.items():
+        if label in TOXIC_LABELS and score >= THRESHOLD:
+            return True
+
+    return False
+
+
+def classify(text: str) -> dict:
+    """
+    Call the model and return the score of every label.
+    :param text:
+    :return:
+    """
+    return {pred["label"]: pred["score"] for pred in make_request(text)[0]}
+
+
+def make_request(text: str):
+    """
+    Classify a single text through the pooled, batching moderation client.
+    :param text:
+    :return: the model response for the text, a list holding its list of {"label", "score"} predictions
+    """
+    return [get_client().classify(text)]
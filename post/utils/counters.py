@@ -0,0 +1,102 @@
+from django.db.models import F, OuterRef, Subquery, Count, IntegerField, Q
+from django.db.models.functions import Coalesce, Greatest
+
+from post.models import Post, Story, Like, Comment, View, StoryLike, StoryView, Hashtag, PostHashtag, ModerationStatus
+
+# counter field -> (model holding the rows, foreign key to the counted object[, filter of the counted rows])
+POST_COUNTERS = {
+    'like_count': (Like, 'post'),
+    'comment_count': (Comment, 'post'),
+    'view_count': (View, 'post'),
+}
+
+STORY_COUNTERS = {
+    'like_count': (StoryLike, 'story'),
+    'view_count': (StoryView, 'story'),
+}
+
+# A hashtag only counts the posts everyone can see, pending, rejected and deleted posts are left out.
+HASHTAG_COUNTERS = {
+    'post_count': (PostHashtag, 'hashtag', {'post__moderation_status': ModerationStatus.PUBLISHED,
+                                            'post__is_deleted': False}),
+}
+
+
+def increment(model, pk, field, amount=1):
+    """
+    Atomically add to a denormalized counter with an F() expression.
+    :param model:
+    :param pk:
+    :param field:
+    :param amount:
+    :return:
+    """
+    model.objects.filter(pk=pk).update(**{field: F(field) + amount})
+
+
+def decrement(model, pk, field, amount=1):
+    """
+    Atomically subtract from a denormalized counter, never going below zero.
+    :param model:
+    :param pk:
+    :param field:
+    :param amount:
+    :return:
+    """
+    model.objects.filter(pk=pk).update(**{field: Greatest(F(field) - amount, 0)})
+
+
+def count_subquery(model, fk_field, filters=None):
+    rows = model.objects.filter(**{fk_field: OuterRef('pk')}, **(filters or {})).order_by().values(fk_field)
+    return Coalesce(Subquery(rows.annotate(total=Count('*')).values('total'), output_field=IntegerField()), 0)
+
+
+def recount(model, pks, counters):
+    """
+    Set counters to the actual number of rows with one UPDATE, for counters whose increments cannot be
+    known from a single change, e.g. a hashtag post count when a post is published or hidden.
+    :param model:
+    :param pks: the rows to recount
+    :param counters: counter field mapped to the (model, foreign key[, filter]) it counts
+    :return:
+    """
+    model.objects.filter(pk__in=list(pks)).update(
+        **{field: count_subquery(*source) for field, source in counters.items()})
+
+
+def reconcile(model, counters, batch_size=500):
+    """
+    Repair counters that drifted from the real number of rows.
+    The drift is detected in SQL, so only rows whose stored value differs from the actual count are
+    loaded and written back.
+    :param model:
+    :param counters: counter field mapped to the (model, foreign key[, filter]) it counts
+    :param batch_size:
+    :return: the number of repaired rows
+    """
+    annotations = {f'actual_{field}': count_subquery(*source) for field, source in counters.items()}
+    drift = Q()
+    for field in counters:
+        drift |= ~Q(**{field: F(f'actual_{field}')})
+
+    drifted = []
+    for instance in model.objects.annotate(**annotations).filter(drift).only(*counters).iterator(
+            chunk_size=batch_size):
+        for field in counters:
+            setattr(instance, field, getattr(instance, f'actual_{field}'))
+        drifted.append(instance)
+
+    model.objects.bulk_update(drifted, list(counters), batch_size=batch_size)
+    return len(drifted)
+
+
+def reconcile_engagement_counters():
+    """
+    Repair the engagement counters of posts and stories, and the post counts of hashtags.
+    :return: the number of repaired posts, stories and hashtags
+    """
+    return {
+        'posts': reconcile(Post, POST_COUNTERS),
+        'stories': reconcile(Story, STORY_COUNTERS),
+        'hashtags': reconcile(Hashtag, HASHTAG_COUNTERS),
+    }
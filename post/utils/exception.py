@@ -10,3 +10,22 @@ class FollowRequestSent(APIException):
     status_code = status.HTTP_202_ACCEPTED
     default_detail = 'Follow request sent.'
     default_code = 'follow_request_sent'
+
+
+class UploadConflict(APIException):
+    """
+    Exception raised when a chunk does not start where the upload stopped.
+    The client should ask for the upload status and resume from its received offset.
+    """
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'The chunk does not start at the received offset.'
+    default_code = 'upload_conflict'
+
+
+class InvalidUpload(APIException):
+    """
+    Exception raised when an upload is not an image, is incomplete or cannot be used by a post or story.
+    """
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = 'Invalid upload.'
+    default_code = 'invalid_upload'
@@ -0,0 +1,82 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TOXIC_WORDS = {"idiot", "stupid", "hate"}
+LABELS = ("toxic", "insult", "obscene", "threat", "identity_hate")
+
+
+def predict(text):
+    score = 0.9 if TOXIC_WORDS & set(text.lower().split()) else 0.05
+    return [{"label": label, "score": score} for label in LABELS]
+
+
+class FakeModelHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps the connections of the client pool alive between requests.
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        inputs = body["inputs"]
+        if isinstance(inputs, str):
+            inputs = [inputs]
+
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.batch_sizes.append(len(inputs))
+        time.sleep(self.server.latency)
+
+        payload = json.dumps([predict(text) for text in inputs]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeModelServer:
+    """
+    Local stand-in for the toxicity model API, for the moderation client tests and benchmark.
+    It answers `{"inputs": [...]}` with one prediction list per input after a fixed latency, flagging texts
+    holding one of TOXIC_WORDS, and counts the requests and batch sizes it served.
+    Usage:
+        with FakeModelServer(latency=0.02) as server:
+            ModerationClient(url=server.url).classify("hello")
+    """
+
+    def __init__(self, latency=0.0):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeModelHandler)
+        self.server.daemon_threads = True
+        self.server.latency = latency
+        self.server.lock = threading.Lock()
+        self.reset()
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/"
+
+    @property
+    def requests(self):
+        return self.server.requests
+
+    @property
+    def batch_sizes(self):
+        return self.server.batch_sizes
+
+    def reset(self):
+        self.server.requests = 0
+        self.server.batch_sizes = []
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
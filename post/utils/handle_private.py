@@ -1,7 +1,7 @@
 from typing import Type, Union
 from django.db.models import QuerySet
 from post.models import Like, Comment, Post, Story, StoryLike
-from user.models import Follow
+from user.utils.followees import is_following
 
 
 def check_owner(author, user):
@@ -33,12 +33,14 @@ def check_private(author, user):
 def check_private_allowed(user, author_id):
     """
     Check if the user is allowed to view the author's private content.
-    This function checks if the user is following the author.
+    This function checks if the user is following the author using the cached followee set.
     :param user:
     :param author_id:
     :return:
     """
-    return Follow.objects.filter(follower=user, following=author_id).exists()
+    if not user.is_authenticated:
+        return False
+    return is_following(user.id, author_id)
 
 
 def generate_like_queryset(content_model_type: Type[Union[Post, Story]], content_id, user) -> QuerySet:
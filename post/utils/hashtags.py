@@ -1,8 +1,84 @@
 import re
 
+from django.db.models import F
+
+from post.models import Hashtag
+
+HASHTAG_MAX_LENGTH = Hashtag._meta.get_field('name').max_length
+
 
 def extract_hashtags(text: str) -> list[str]:
     """
     Extracts hashtags from the given text (without the # symbol).
     """
     return [tag.strip("#") for tag in re.findall(r'#\w+', text)]
+
+
+def normalize_hashtags(names):
+    """
+    Lowercase and deduplicate hashtag names, keeping their first occurrence order.
+    Names longer than the Hashtag name column are dropped.
+    :param names:
+    :return:
+    """
+    return list(dict.fromkeys(
+        name.lower() for name in names if name and len(name) <= HASHTAG_MAX_LENGTH
+    ))
+
+
+def get_or_create_hashtags(names):
+    """
+    Resolve hashtag names to Hashtag rows with one bulk insert and one select, whatever the number of tags.
+    :param names:
+    :return: the Hashtag instances
+    """
+    names = normalize_hashtags(names)
+    if not names:
+        return []
+
+    Hashtag.objects.bulk_create([Hashtag(name=name) for name in names], ignore_conflicts=True)
+    return list(Hashtag.objects.filter(name__in=names))
+
+
+def sync_hashtags(instance, text, created=False):
+    """
+    Make the hashtags of a post or story match the tags of a caption.
+    Only the changed rows of the through table are written, with one bulk insert and one delete.
+    Used by the REST serializers and the GraphQL mutations.
+    :param instance: a Post or Story
+    :param text: the caption
+    :param created: whether the instance was just created and has no hashtags yet
+    :return:
+    """
+    wanted = {tag.id for tag in get_or_create_hashtags(extract_hashtags(text))}
+    current = set() if created else set(instance.hashtags.values_list('id', flat=True))
+
+    stale = current - wanted
+    if stale:
+        instance.hashtags.remove(*stale)
+
+    new = wanted - current
+    if new:
+        instance.hashtags.add(*new, through_defaults={'created_at': instance.created_at})
+
+
+def get_hashtag(name):
+    """
+    Look up a hashtag by name through the unique index, names are stored lowercase.
+    :param name:
+    :return: the Hashtag or None
+    """
+    return Hashtag.objects.filter(name=name.strip('#').lower()).first()
+
+
+def tagged_queryset(queryset, hashtag):
+    """
+    Restrict a post or story queryset to a hashtag.
+    The rows are annotated with tagged_at, the creation time stored on the link, so ordering by it walks
+    the (hashtag, created_at, post) index of the link table.
+    :param queryset: a Post or Story queryset
+    :param hashtag: a Hashtag, or None for an empty result
+    :return:
+    """
+    queryset = queryset.filter(hashtag_links__hashtag=hashtag).annotate(tagged_at=F('hashtag_links__created_at'))
+    return queryset if hashtag is not None else queryset.none()
@@ -0,0 +1,178 @@
+import hashlib
+import math
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from PIL import Image, ImageOps
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from alx_project_nexus.settings import MEDIA_NEAR_DUPLICATE_DISTANCE, UPLOAD_EXPIRY
+from post.models import MediaBlob
+from utils.images import strip_metadata
+
+BLOB_NAME = "blobs/{prefix}/{digest}{extension}"
+EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "GIF": ".gif", "WEBP": ".webp"}
+READ_SIZE = 64 * 1024
+
+# The 64 bit pHash is split in BANDS bands of BAND_BITS bits, each stored in an indexed column.
+# Two hashes within 2 * BANDS - 1 bits have at least one band differing by at most one bit, so a lookup of
+# every band and its one-bit neighbours finds every near duplicate up to that distance.
+BANDS = 4
+BAND_BITS = 16
+MAX_DISTANCE = 2 * BANDS - 1
+
+HASH_SIZE = 8
+DCT_SIZE = 32
+DCT_TABLE = [[math.cos(math.pi * (2 * x + 1) * u / (2 * DCT_SIZE)) for x in range(DCT_SIZE)]
+             for u in range(HASH_SIZE)]
+
+
+def to_signed(value):
+    """
+    Map an unsigned 64 bit hash to the signed range of a bigint column.
+    """
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value):
+    return value & ((1 << 64) - 1)
+
+
+def bits(values, reference):
+    return reduce(lambda hash_value, value: (hash_value << 1) | (value > reference), values, 0)
+
+
+def dhash(image):
+    """
+    Difference hash: one bit per pair of horizontally adjacent pixels of the 9x8 grayscale thumbnail.
+    :param image: a grayscale image
+    :return: an unsigned 64 bit hash
+    """
+    pixels = list(image.resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS).tobytes())
+    hash_value = 0
+    for row in range(HASH_SIZE):
+        for column in range(HASH_SIZE):
+            left = pixels[row * (HASH_SIZE + 1) + column]
+            hash_value = (hash_value << 1) | (left > pixels[row * (HASH_SIZE + 1) + column + 1])
+    return hash_value
+
+
+def phash(image):
+    """
+    Perceptual hash: the signs, against their median, of the 8x8 lowest frequencies of the DCT of the
+    32x32 grayscale thumbnail. It survives rescaling, recompression and small edits.
+    :param image: a grayscale image
+    :return: an unsigned 64 bit hash
+    """
+    pixels = list(image.resize((DCT_SIZE, DCT_SIZE), Image.Resampling.LANCZOS).tobytes())
+    rows = [pixels[y * DCT_SIZE:(y + 1) * DCT_SIZE] for y in range(DCT_SIZE)]
+    # Separable DCT-II, only the low frequencies are computed.
+    row_dct = [[sum(c * p for c, p in zip(DCT_TABLE[u], row)) for u in range(HASH_SIZE)] for row in rows]
+    coefficients = [sum(DCT_TABLE[v][y] * row_dct[y][u] for y in range(DCT_SIZE))
+                    for v in range(HASH_SIZE) for u in range(HASH_SIZE)]
+    # The DC term only holds the average brightness, it is left out of the median.
+    median = sorted(coefficients[1:])[len(coefficients[1:]) // 2]
+    return bits(coefficients, median)
+
+
+def hamming(first, second):
+    return bin(to_unsigned(first) ^ to_unsigned(second)).count("1")
+
+
+def bands(hash_value):
+    mask = (1 << BAND_BITS) - 1
+    return [(to_unsigned(hash_value) >> (BAND_BITS * band)) & mask for band in range(BANDS)]
+
+
+def band_fields(hash_value):
+    return {f"phash_band{band}": value for band, value in enumerate(bands(hash_value))}
+
+
+def file_digest(file):
+    """
+    Hash a file in READ_SIZE blocks, so memory stays bounded whatever its size.
+    :param file:
+    :return: the hex sha256 of the file
+    """
+    digest = hashlib.sha256()
+    file.seek(0)
+    for block in iter(lambda: file.read(READ_SIZE), b""):
+        digest.update(block)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def store_media(file):
+    """
+    Store an uploaded image in the content-addressed media store.
+    An exact duplicate of a stored image reuses its blob: the file is not written again and not decoded.
+    A new image is stripped of its metadata and saved once under the sha256 of the uploaded bytes, with its
+    pHash and dHash for the near-duplicate lookup.
+    :param file: a Django File, e.g. an uploaded file
+    :return: the MediaBlob, whose file name can be assigned to an image field
+    """
+    digest = file_digest(file)
+    blob = MediaBlob.objects.filter(sha256=digest).first()
+    if blob:
+        return blob
+
+    file = strip_metadata(file)
+    with Image.open(file) as image:
+        image_format = image.format
+        width, height = image.size
+        grayscale = ImageOps.exif_transpose(image).convert("L")
+    file.seek(0)
+
+    name = BLOB_NAME.format(prefix=digest[:2], digest=digest, extension=EXTENSIONS.get(image_format, ".img"))
+    if not default_storage.exists(name):
+        name = default_storage.save(name, file)
+
+    perceptual = phash(grayscale)
+    try:
+        with transaction.atomic():
+            return MediaBlob.objects.create(
+                sha256=digest, file=name, size=file.size, width=width, height=height,
+                phash=to_signed(perceptual), dhash=to_signed(dhash(grayscale)), **band_fields(perceptual),
+            )
+    except IntegrityError:
+        # The same image was stored concurrently.
+        return MediaBlob.objects.get(sha256=digest)
+
+
+def near_duplicates(blob, distance=MEDIA_NEAR_DUPLICATE_DISTANCE):
+    """
+    Find the stored images that look like a blob, through the multi-index lookup of the pHash bands.
+    :param blob:
+    :param distance: the largest pHash Hamming distance, at most MAX_DISTANCE
+    :return: a list of (blob, distance) pairs, closest first, without the blob itself
+    """
+    distance = min(distance, MAX_DISTANCE)
+    conditions = []
+    for band, value in enumerate(bands(blob.phash)):
+        neighbours = [value] + [value ^ (1 << bit) for bit in range(BAND_BITS)]
+        conditions.append(Q(**{f"phash_band{band}__in": neighbours}))
+
+    matches = []
+    for candidate in MediaBlob.objects.filter(reduce(or_, conditions)).exclude(pk=blob.pk):
+        candidate_distance = hamming(blob.phash, candidate.phash)
+        if candidate_distance <= distance:
+            matches.append((candidate, candidate_distance))
+    matches.sort(key=lambda match: (match[1], match[0].created_at))
+    return matches
+
+
+def delete_orphan_blobs():
+    """
+    Delete the blobs older than UPLOAD_EXPIRY that no post, story or upload uses, with their files.
+    :return: the number of deleted blobs
+    """
+    cutoff = timezone.now() - timedelta(seconds=UPLOAD_EXPIRY)
+    orphans = list(MediaBlob.objects.filter(created_at__lt=cutoff, posts=None, stories=None, uploads=None))
+    for blob in orphans:
+        blob.file.delete(save=False)
+    MediaBlob.objects.filter(pk__in=[blob.pk for blob in orphans]).delete()
+    return len(orphans)
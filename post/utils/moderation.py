@@ -0,0 +1,114 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from alx_project_nexus.settings import MODERATION_DEGRADE_POLICY, MODERATION_SWEEP_AGE
+from notification.tasks import create_notification
+from post.models import ModerationStatus
+from post.utils.check_toxicity import predict_flagged, prefilter
+from post.utils.moderation_client import ModelUnavailable
+from utils import metrics
+
+METRICS_NAMESPACE = "moderation"
+
+MODERATION_MESSAGES = {
+    ModerationStatus.PUBLISHED: "Your {kind} has been published",
+    ModerationStatus.REJECTED: "Your {kind} was rejected because its caption does not follow the community guidelines",
+}
+
+
+def visible_filter(user):
+    """
+    Filter the posts or stories a viewer may see by moderation status: published ones, and every one of their own.
+    :param user:
+    :return:
+    """
+    published = Q(moderation_status=ModerationStatus.PUBLISHED)
+    if user.is_authenticated:
+        return published | Q(author_id=user.id)
+    return published
+
+
+def moderate(instance):
+    """
+    Classify the caption of a pending post or story, publish or reject it and notify the author.
+    Saving the new status runs the post signals, which fan a published post out to the timelines.
+    When the model is unavailable, MODERATION_DEGRADE_POLICY decides: "retry" raises so the moderation task
+    retries and the instance stays pending meanwhile, "publish" and "reject" decide without the model.
+    :param instance: a Post or a Story
+    :return: the new moderation status, or None if the instance was not pending
+    """
+    if instance.moderation_status != ModerationStatus.PENDING or instance.is_deleted:
+        return None
+
+    caption = instance.caption
+    try:
+        flagged = predict_flagged(caption)
+    except ModelUnavailable:
+        if MODERATION_DEGRADE_POLICY not in ('publish', 'reject'):
+            raise
+        metrics.record(METRICS_NAMESPACE, degraded=1)
+        flagged = MODERATION_DEGRADE_POLICY == 'reject'
+    return apply_decision(instance, caption, flagged)
+
+
+def moderate_with_lexicon(instance):
+    """
+    Decide a pending post or story with the local lexicon only, once the moderation task ran out of retries.
+    A caption the lexicon cannot decide is held for review: it stays pending and the requeue_pending_moderation
+    task moderates it again later.
+    :param instance: a Post or a Story
+    :return: the new moderation status, or None if the instance is held or was not pending
+    """
+    if instance.moderation_status != ModerationStatus.PENDING or instance.is_deleted:
+        return None
+
+    caption = instance.caption
+    flagged = prefilter(caption)
+    if flagged is None:
+        metrics.record(METRICS_NAMESPACE, held=1)
+        return None
+    metrics.record(METRICS_NAMESPACE, lexicon_fallback=1)
+    return apply_decision(instance, caption, flagged)
+
+
+def apply_decision(instance, caption, flagged):
+    """
+    Publish or reject a pending post or story and notify the author.
+    :param instance:
+    :param caption: the caption the decision was made on
+    :param flagged:
+    :return: the new moderation status, or None if the instance is no longer pending with that caption
+    """
+    status = ModerationStatus.REJECTED if flagged else ModerationStatus.PUBLISHED
+
+    with transaction.atomic():
+        # The caption may have been edited while the model was answering, the edit queued its own moderation.
+        instance = type(instance).objects.select_for_update().filter(
+            pk=instance.pk, moderation_status=ModerationStatus.PENDING, caption=caption
+        ).first()
+        if instance is None:
+            return None
+
+        instance.moderation_status = status
+        instance.save(update_fields=['moderation_status'])
+
+    kind = instance._meta.verbose_name.lower()
+    create_notification.delay(str(instance.author_id), MODERATION_MESSAGES[status].format(kind=kind),
+                              "Moderation Notification")
+    return status
+
+
+def stale_pending(model, age=MODERATION_SWEEP_AGE):
+    """
+    Ids of the posts or stories still pending after `age` seconds, e.g. held for review while the model was
+    unavailable.
+    :param model: Post or Story
+    :param age:
+    :return:
+    """
+    cutoff = timezone.now() - timedelta(seconds=age)
+    return model.objects.filter(moderation_status=ModerationStatus.PENDING, is_deleted=False,
+                                created_at__lt=cutoff).values_list('pk', flat=True)
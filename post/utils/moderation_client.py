@@ -0,0 +1,175 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from alx_project_nexus.settings import MODEL_API_URL, MODEL_API_TOKEN, MODERATION_BATCH_SIZE, \
+    MODERATION_BATCH_WAIT_MS, MODERATION_TIMEOUT, MODERATION_POOL_SIZE, MODERATION_BREAKER_THRESHOLD, \
+    MODERATION_BREAKER_RESET
+from utils import metrics
+
+METRICS_NAMESPACE = "moderation_client"
+
+
+class ModelUnavailable(Exception):
+    """
+    Raised when the model API cannot answer in time: timeouts, errors or an open circuit breaker.
+    """
+
+
+class CircuitBreaker:
+    """
+    Stop calling the model API after `threshold` consecutive failures.
+    Once open, calls fail immediately for `reset_timeout` seconds, then a single trial call is let through:
+    its success closes the breaker and its failure opens it again.
+    """
+
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.trial_running or time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.trial_running = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial_running or self.failures >= self.threshold:
+                if self.opened_at is None:
+                    metrics.record(METRICS_NAMESPACE, breaker_opened=1)
+                self.opened_at = time.monotonic()
+                self.trial_running = False
+
+
+class ModerationClient:
+    """
+    Client of the toxicity model API.
+    Concurrent classify() calls are queued and coalesced into micro-batches of at most `batch_size` texts,
+    a batch is sent as soon as it is full or `batch_wait_ms` after its first text arrived. Batches are posted
+    as one `{"inputs": [...]}` request over a pool of keep-alive connections, and each caller gets the
+    predictions of its own text back.
+    Every request has a strict timeout and the client stops calling a failing API through a circuit breaker,
+    callers then get a ModelUnavailable error instead of waiting.
+    Batching only pays off when several threads classify at once, e.g. a threaded Celery pool.
+    """
+
+    def __init__(self, url=MODEL_API_URL, token=MODEL_API_TOKEN, batch_size=MODERATION_BATCH_SIZE,
+                 batch_wait_ms=MODERATION_BATCH_WAIT_MS, timeout=MODERATION_TIMEOUT, pool_size=MODERATION_POOL_SIZE,
+                 breaker=None):
+        self.url = url
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait_ms / 1000
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker(MODERATION_BREAKER_THRESHOLD, MODERATION_BREAKER_RESET)
+
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {token}"
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.pending = queue.Queue()
+        self.senders = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="moderation-batch")
+        self.dispatcher = threading.Thread(target=self.dispatch, name="moderation-dispatcher", daemon=True)
+        self.dispatcher.start()
+
+    def classify(self, text):
+        """
+        Classify a text, waiting at most the batch window plus the request timeout.
+        :param text:
+        :return: the predictions of the text, a list of {"label", "score"}
+        """
+        if not self.breaker.allow():
+            metrics.record(METRICS_NAMESPACE, rejected_open=1)
+            raise ModelUnavailable("The moderation model circuit is open.")
+
+        future = Future()
+        self.pending.put((text, future))
+        try:
+            return future.result(timeout=self.batch_wait + self.timeout * 2)
+        except FutureTimeoutError:
+            metrics.record(METRICS_NAMESPACE, timeouts=1)
+            raise ModelUnavailable("The moderation model did not answer in time.")
+
+    def dispatch(self):
+        while True:
+            batch = [self.pending.get()]
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self.senders.submit(self.send_batch, batch)
+
+    def send_batch(self, batch):
+        started = time.perf_counter()
+        try:
+            response = self.session.post(self.url, json={"inputs": [text for text, future in batch]},
+                                         timeout=(self.timeout, self.timeout))
+            response.raise_for_status()
+            predictions = response.json()
+            if len(predictions) != len(batch):
+                raise ValueError(f"Expected {len(batch)} predictions, got {len(predictions)}.")
+        except Exception as exc:
+            self.breaker.record_failure()
+            metrics.record(METRICS_NAMESPACE, failed_batches=1)
+            for text, future in batch:
+                future.set_exception(ModelUnavailable(str(exc)))
+            return
+
+        self.breaker.record_success()
+        metrics.record(METRICS_NAMESPACE, batches=1, batch_items=len(batch),
+                       request_ms=(time.perf_counter() - started) * 1000)
+        for (text, future), prediction in zip(batch, predictions):
+            future.set_result(prediction)
+
+    def close(self):
+        self.senders.shutdown(wait=False)
+        self.session.close()
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Get the moderation client of the current process.
+    The client owns threads and sockets, so a forked worker creates its own instead of inheriting the parent's.
+    :return:
+    """
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = ModerationClient()
+            _client_pid = os.getpid()
+        return _client
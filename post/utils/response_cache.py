@@ -0,0 +1,154 @@
+import hashlib
+import json
+
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from alx_project_nexus.settings import RESPONSE_CACHE_TTL
+from user.utils.followees import get_followees_version
+from utils import metrics
+from utils.redis_client import redis_client
+
+RESPONSE_CACHE_KEY = "response_cache:{endpoint}:{digest}"
+AUTHOR_VERSION_KEY = "response_cache:author:{author_id}:version"
+COLLECTION_VERSION_KEY = "response_cache:{endpoint}:version"
+PRIVACY_VERSION_KEY = "response_cache:privacy:version"
+METRICS_NAMESPACE = "response_cache"
+
+
+def author_version_key(author_id):
+    return AUTHOR_VERSION_KEY.format(author_id=author_id)
+
+
+def collection_version_key(endpoint):
+    return COLLECTION_VERSION_KEY.format(endpoint=endpoint)
+
+
+def bump_author(author_id):
+    """
+    Invalidate every cached response holding content of an author.
+    Used when a post or story of the author is saved or soft deleted, or when the author profile changes.
+    :param author_id:
+    :return:
+    """
+    redis_client.incr(author_version_key(author_id))
+
+
+def bump_collection(endpoint):
+    """
+    Invalidate the cached pages of an endpoint that can show newly created rows.
+    :param endpoint:
+    :return:
+    """
+    redis_client.incr(collection_version_key(endpoint))
+
+
+def bump_privacy():
+    """
+    Invalidate every cached response after an author changed their privacy, since their content
+    can appear in or disappear from any page.
+    :return:
+    """
+    redis_client.incr(PRIVACY_VERSION_KEY)
+
+
+def get_author_versions(author_ids):
+    author_ids = sorted(str(author_id) for author_id in author_ids)
+    if not author_ids:
+        return {}
+    versions = redis_client.mget([author_version_key(author_id) for author_id in author_ids])
+    return {author_id: int(version or 0) for author_id, version in zip(author_ids, versions)}
+
+
+def visibility_class(user):
+    """
+    Describe what a viewer is allowed to see.
+    Anonymous viewers only see public authors, authenticated viewers also see the authors they follow,
+    so their class changes with the version of their followee set.
+    :param user:
+    :return:
+    """
+    if not user.is_authenticated:
+        return "public"
+    return f"user:{user.id}:{get_followees_version(user.id)}"
+
+
+class CachedResponseMixin:
+    """
+    ViewSet mixin caching the list and retrieve responses in Redis.
+    The key combines the viewer's visibility class, the request path and query (including the cursor) and
+    the privacy version. The first page and pages walking towards newer rows also include the collection
+    version, which is bumped when a row is created.
+    Each entry stores the version of every author it shows, and is only served while all of them are
+    unchanged, so invalidating an author is a single INCR instead of a key scan.
+    Engagement counters are updated without a save and may lag by up to RESPONSE_CACHE_TTL seconds.
+    """
+    cache_endpoint = None
+    cached_actions = ('list', 'retrieve')
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            self.cached_authors = {obj.author_id for obj in page}
+        return page
+
+    def get_object(self):
+        obj = super().get_object()
+        self.cached_authors = {obj.author_id}
+        return obj
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        if request.method != 'GET' or self.action not in self.cached_actions:
+            return handler(request, *args, **kwargs)
+
+        key = self.get_response_cache_key(request)
+        cached = redis_client.get(key)
+        if cached is not None:
+            entry = json.loads(cached)
+            if get_author_versions(entry['authors']) == entry['authors']:
+                self.record_cache(hits=1)
+                return Response(entry['data'])
+
+        self.cached_authors = set()
+        response = handler(request, *args, **kwargs)
+        self.record_cache(misses=1)
+
+        if response.status_code == 200:
+            entry = {'data': response.data, 'authors': get_author_versions(self.cached_authors)}
+            redis_client.set(key, json.dumps(entry, cls=JSONEncoder), ex=RESPONSE_CACHE_TTL)
+        return response
+
+    def get_response_cache_key(self, request):
+        parts = [
+            self.action,
+            request.path,
+            sorted(request.query_params.lists()),
+            visibility_class(request.user),
+            int(redis_client.get(PRIVACY_VERSION_KEY) or 0),
+        ]
+        if self.action == 'list' and self.shows_newest_rows(request):
+            parts.append(int(redis_client.get(collection_version_key(self.cache_endpoint)) or 0))
+
+        digest = hashlib.sha256(json.dumps(parts, cls=JSONEncoder).encode()).hexdigest()
+        return RESPONSE_CACHE_KEY.format(endpoint=self.cache_endpoint, digest=digest)
+
+    def shows_newest_rows(self, request):
+        """
+        A page positioned by a cursor that walks towards older rows can not gain new rows, every other
+        page can.
+        """
+        if request.query_params.get('ordering'):
+            return True
+        cursor = self.paginator.decode_cursor(request)
+        return cursor is None or cursor.reverse or cursor.position is None
+
+    def record_cache(self, **fields):
+        metrics.record(METRICS_NAMESPACE, **{
+            f"{self.cache_endpoint}_{self.action}_{field}": amount for field, amount in fields.items()
+        })
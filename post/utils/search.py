@@ -0,0 +1,209 @@
+import re
+from dataclasses import dataclass
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+from django.db import connection as db_connection
+from django.db.models import F, FloatField, OuterRef, Subquery, TextField, Value
+from django.db.models.functions import Cast, Coalesce
+from graphql_relay.utils import base64, unbase64
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+
+from alx_project_nexus.settings import SEARCH_CONFIG
+from post.connections import RowValueCompare
+from post.models import Post, PostHashtag
+
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_STOP = '</mark>'
+FTS_TABLE = 'post_search'
+
+
+@dataclass
+class SearchResult:
+    post: Post
+    rank: float
+    highlight: str
+
+
+def encode_cursor(result):
+    return base64(f"{result.rank!r}|{result.post.id}")
+
+
+def decode_cursor(cursor):
+    """
+    Decode a search cursor into the (rank, id) of the last result of the previous page.
+    :param cursor:
+    :return:
+    """
+    try:
+        rank, pk = unbase64(cursor).split('|')
+        return float(rank), Post._meta.pk.to_python(pk)
+    except Exception:
+        raise ValidationError({"cursor": "Invalid cursor."})
+
+
+def search_terms(text):
+    return re.findall(r'\w+', text.lower())
+
+
+class PostgresSearchBackend:
+    """
+    Full-text search on the Post.search_vector column.
+    The vector holds the caption (weight A) and the hashtag names (weight B) and is answered by a GIN index.
+    Results are ordered by ts_rank, then id, and paged with a (rank, id) row-value comparison.
+    """
+
+    def document(self):
+        hashtags = PostHashtag.objects.filter(post=OuterRef('pk')).order_by().values('post').annotate(
+            names=StringAgg('hashtag__name', ' ')
+        ).values('names')
+        return (SearchVector('caption', config=SEARCH_CONFIG, weight='A')
+                + SearchVector(Coalesce(Subquery(hashtags), Value(''), output_field=TextField()), config=SEARCH_CONFIG, weight='B'))
+
+    def update(self, post_ids):
+        Post.objects.filter(pk__in=post_ids).update(search_vector=self.document())
+
+    def rebuild(self):
+        return Post.objects.update(search_vector=self.document())
+
+    def query(self, text):
+        return SearchQuery(' '.join(search_terms(text)), config=SEARCH_CONFIG, search_type='plain')
+
+    def filter(self, queryset, text):
+        return queryset.filter(search_vector=self.query(text))
+
+    def search(self, queryset, text, after=None, limit=20):
+        query = self.query(text)
+        # ts_rank returns a real, the cursor holds a Python float: both sides are compared as double precision
+        # so the rank of the last result round-trips exactly and ties resume after it.
+        queryset = queryset.filter(search_vector=query).annotate(
+            rank=Cast(SearchRank(F('search_vector'), query), FloatField()),
+            highlight=SearchHeadline('caption', query, config=SEARCH_CONFIG,
+                                     start_sel=HIGHLIGHT_START, stop_sel=HIGHLIGHT_STOP),
+        )
+        if after:
+            rank, pk = after
+            queryset = queryset.filter(RowValueCompare(
+                [F('rank'), F('id')], '<', [Value(rank), Value(pk, output_field=Post._meta.pk)]
+            ))
+
+        return [SearchResult(post, post.rank, post.highlight)
+                for post in queryset.order_by('-rank', '-id')[:limit + 1]]
+
+
+class SQLiteSearchBackend:
+    """
+    Full-text search on an FTS5 table, used when the project runs on SQLite.
+    The table holds a copy of the caption and hashtag names of every post and is ranked with bm25.
+    It takes a DB-API connection so it can run outside of Django, the default database is used otherwise.
+    """
+
+    def __init__(self, connection=None):
+        self.connection = connection
+
+    def get_connection(self):
+        if self.connection is not None:
+            return self.connection
+        db_connection.ensure_connection()
+        return db_connection.connection
+
+    def execute(self, sql, params=()):
+        cursor = self.get_connection().cursor()
+        try:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def ensure_table(self):
+        self.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                     f"USING fts5(post_id UNINDEXED, caption, hashtags)")
+
+    def index(self, documents):
+        """
+        Replace the indexed documents of some posts.
+        :param documents: (post_id, caption, hashtags) tuples, hashtags being a space separated string
+        :return:
+        """
+        self.ensure_table()
+        for post_id, caption, hashtags in documents:
+            self.execute(f"DELETE FROM {FTS_TABLE} WHERE post_id = ?", (str(post_id),))
+            self.execute(f"INSERT INTO {FTS_TABLE} (post_id, caption, hashtags) VALUES (?, ?, ?)",
+                         (str(post_id), caption, hashtags))
+
+    def update(self, post_ids):
+        names = {}
+        for post_id, name in PostHashtag.objects.filter(post_id__in=post_ids).values_list('post_id', 'hashtag__name'):
+            names.setdefault(post_id, []).append(name)
+        self.index((post.id, post.caption, ' '.join(names.get(post.id, [])))
+                   for post in Post.objects.filter(pk__in=post_ids).only('id', 'caption'))
+
+    def rebuild(self):
+        self.ensure_table()
+        self.execute(f"DELETE FROM {FTS_TABLE}")
+        post_ids = list(Post.objects.values_list('id', flat=True))
+        self.update(post_ids)
+        return len(post_ids)
+
+    def match(self, text, after=None, limit=20):
+        """
+        Run a ranked FTS5 query.
+        :param text:
+        :param after: the (rank, id) of the last result of the previous page
+        :param limit:
+        :return: (post_id, rank, highlight) rows, best match first
+        """
+        terms = search_terms(text)
+        if not terms:
+            return []
+
+        self.ensure_table()
+        params = [HIGHLIGHT_START, HIGHLIGHT_STOP, ' '.join(f'"{term}"' for term in terms)]
+        after_sql = ''
+        if after:
+            after_sql = "WHERE score < ? OR (score = ? AND post_id < ?)"
+            params += [after[0], after[0], str(after[1])]
+        return self.execute(
+            f"SELECT post_id, score, snippet FROM ("
+            f"  SELECT post_id, -bm25({FTS_TABLE}, 0, 2.0, 1.0) AS score,"
+            f"  highlight({FTS_TABLE}, 1, ?, ?) AS snippet"
+            f"  FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ?"
+            f") {after_sql} ORDER BY score DESC, post_id DESC LIMIT ?",
+            params + [limit],
+        )
+
+    def filter(self, queryset, text):
+        return queryset.filter(id__in=[row[0] for row in self.match(text, limit=-1)])
+
+    def search(self, queryset, text, after=None, limit=20):
+        results = []
+        while len(results) <= limit:
+            rows = self.match(text, after, limit + 1)
+            posts = queryset.in_bulk([row[0] for row in rows])
+            results += [SearchResult(posts[Post._meta.pk.to_python(post_id)], rank, highlight)
+                        for post_id, rank, highlight in rows if Post._meta.pk.to_python(post_id) in posts]
+            if len(rows) <= limit:
+                break
+            after = (rows[-1][1], rows[-1][0])
+        return results[:limit + 1]
+
+
+def get_search_backend():
+    if db_connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    return SQLiteSearchBackend()
+
+
+class PostSearchFilter(filters.BaseFilterBackend):
+    """
+    Filter backend answering the `search` query parameter from the full-text index instead of
+    an icontains scan of the caption and hashtag names.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '')
+        if not search_terms(text):
+            return queryset
+        return get_search_backend().filter(queryset, text)
@@ -0,0 +1,289 @@
+import time
+from datetime import datetime, timezone
+
+from django.utils.dateparse import parse_datetime
+
+from alx_project_nexus.settings import TIMELINE_MAX_LENGTH, TIMELINE_TTL, FEED_FANOUT_FOLLOWER_THRESHOLD, \
+    AUTHOR_RECENT_POSTS_LENGTH
+from post.models import ModerationStatus, Post
+from user.models import Follow
+from user.utils.followees import get_followee_ids
+from utils import metrics
+from utils.redis_client import redis_client
+
+TIMELINE_KEY = "timeline:{user_id}"
+AUTHOR_RECENT_KEY = "timeline:author:{author_id}"
+PULL_AUTHORS_KEY = "timeline:pull_authors"
+METRICS_NAMESPACE = "feed"
+
+# Only warm timelines receive pushes; a missing key is rebuilt from Postgres on the
+# next read, so pushing into it would create a partial timeline that looks complete.
+PUSH_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('ZADD', KEYS[1], ARGV[1], ARGV[2])
+    redis.call('ZREMRANGEBYRANK', KEYS[1], 0, -(tonumber(ARGV[3]) + 1))
+    return 1
+end
+return 0
+"""
+
+push_script = redis_client.register_script(PUSH_SCRIPT)
+
+# Redis drops empty sorted sets, so a marker member keeps an empty timeline warm and a user with nothing to
+# read does not rebuild it from Postgres on every request. Its -inf score keeps it out of every read window.
+EMPTY_MARKER = "-"
+EMPTY_SCORE = float('-inf')
+# Exclusive lower bound of the read windows, it skips the marker.
+LOWEST_BOUND = '(-inf'
+
+
+def timeline_key(user_id):
+    return TIMELINE_KEY.format(user_id=user_id)
+
+
+def author_recent_key(author_id):
+    return AUTHOR_RECENT_KEY.format(author_id=author_id)
+
+
+def score_for(created_at):
+    """
+    Convert a post creation time into the sorted set score used by the timelines.
+    :param created_at:
+    :return:
+    """
+    return created_at.timestamp()
+
+
+def get_follower_ids(author_id):
+    return list(Follow.objects.filter(following_id=author_id).values_list('follower_id', flat=True))
+
+
+def push_to_timelines(user_ids, post_id, score):
+    pipe = redis_client.pipeline(transaction=False)
+    for user_id in user_ids:
+        push_script(keys=[timeline_key(user_id)], args=[score, str(post_id), TIMELINE_MAX_LENGTH], client=pipe)
+    return sum(pipe.execute())
+
+
+def fan_out_post(post):
+    """
+    Push a newly created post into the home timeline of the author and each of their followers.
+    Every timeline is trimmed to TIMELINE_MAX_LENGTH entries after the push.
+    Authors with more than FEED_FANOUT_FOLLOWER_THRESHOLD followers are not fanned out, their posts
+    go into a small per-author recent posts cache that is merged into the feed at read time.
+    :param post:
+    :return: the number of timelines that received the post
+    """
+    score = score_for(post.created_at)
+    follower_count = Follow.objects.filter(following_id=post.author_id).count()
+    metrics.set_values(METRICS_NAMESPACE, fanout_follower_threshold=FEED_FANOUT_FOLLOWER_THRESHOLD)
+
+    if follower_count > FEED_FANOUT_FOLLOWER_THRESHOLD:
+        redis_client.sadd(PULL_AUTHORS_KEY, str(post.author_id))
+        push_author_recent(post.author_id, post.id, score)
+        metrics.record(METRICS_NAMESPACE, fanout_skipped=1, fanout_skipped_followers=follower_count)
+        return push_to_timelines([post.author_id], post.id, score)
+
+    recipients = get_follower_ids(post.author_id) + [post.author_id]
+    pushed = push_to_timelines(recipients, post.id, score)
+
+    if redis_client.srem(PULL_AUTHORS_KEY, str(post.author_id)):
+        # The author dropped back under the threshold, posts that were only served by the pull path
+        # have to reach the follower timelines before the read side stops merging them.
+        for post_id, post_score in redis_client.zrange(author_recent_key(post.author_id), 0, -1, withscores=True):
+            push_to_timelines(recipients, post_id.decode(), post_score)
+        redis_client.delete(author_recent_key(post.author_id))
+
+    metrics.record(METRICS_NAMESPACE, fanout_posts=1, fanout_pushes=pushed)
+    return pushed
+
+
+def push_author_recent(author_id, post_id, score):
+    key = author_recent_key(author_id)
+    if not redis_client.exists(key):
+        rebuild_author_recent(author_id)
+        return
+
+    pipe = redis_client.pipeline()
+    pipe.zadd(key, {str(post_id): score})
+    pipe.zremrangebyrank(key, 0, -(AUTHOR_RECENT_POSTS_LENGTH + 1))
+    pipe.expire(key, TIMELINE_TTL)
+    pipe.execute()
+
+
+def rebuild_author_recent(author_id):
+    """
+    Rebuild the recent posts cache of a high-follower author from Postgres.
+    :param author_id:
+    :return:
+    """
+    posts = Post.objects.filter(
+        author_id=author_id, is_deleted=False, moderation_status=ModerationStatus.PUBLISHED
+    ).order_by('-created_at').values_list(
+        'id', 'created_at')[:AUTHOR_RECENT_POSTS_LENGTH]
+    mapping = {str(post_id): score_for(created_at) for post_id, created_at in posts}
+
+    key = author_recent_key(author_id)
+    pipe = redis_client.pipeline()
+    pipe.delete(key)
+    if mapping:
+        pipe.zadd(key, mapping)
+        pipe.expire(key, TIMELINE_TTL)
+    pipe.execute()
+
+
+def remove_post(post):
+    """
+    Remove a post from the home timeline of the author and each of their followers.
+    Used when a post is soft deleted.
+    :param post:
+    :return:
+    """
+    recipients = get_follower_ids(post.author_id) + [post.author_id]
+
+    pipe = redis_client.pipeline(transaction=False)
+    for user_id in recipients:
+        pipe.zrem(timeline_key(user_id), str(post.id))
+    pipe.zrem(author_recent_key(post.author_id), str(post.id))
+    pipe.execute()
+
+
+def add_author_posts(user_id, author_id):
+    """
+    Merge the recent posts of a newly followed author into the follower's timeline.
+    Cold timelines are left alone, the next read rebuilds them with the new followee included.
+    :param user_id:
+    :param author_id:
+    :return:
+    """
+    key = timeline_key(user_id)
+    if not redis_client.exists(key):
+        return
+
+    posts = Post.objects.filter(
+        author_id=author_id, is_deleted=False, moderation_status=ModerationStatus.PUBLISHED
+    ).order_by('-created_at').values_list(
+        'id', 'created_at')[:TIMELINE_MAX_LENGTH]
+    mapping = {str(post_id): score_for(created_at) for post_id, created_at in posts}
+    if not mapping:
+        return
+
+    pipe = redis_client.pipeline()
+    pipe.zadd(key, mapping)
+    pipe.zremrangebyrank(key, 0, -(TIMELINE_MAX_LENGTH + 1))
+    pipe.execute()
+
+
+def remove_author_posts(user_id, author_id):
+    """
+    Remove the posts of an unfollowed author from the follower's timeline.
+    Only posts newer than the oldest timeline entry can be present, so older ones are not looked up.
+    :param user_id:
+    :param author_id:
+    :return:
+    """
+    key = timeline_key(user_id)
+    oldest = redis_client.zrangebyscore(key, LOWEST_BOUND, '+inf', start=0, num=1, withscores=True)
+    if not oldest:
+        return
+
+    oldest_created_at = datetime.fromtimestamp(oldest[0][1], tz=timezone.utc)
+    post_ids = [str(post_id) for post_id in Post.objects.filter(
+        author_id=author_id, created_at__gte=oldest_created_at
+    ).values_list('id', flat=True)]
+    if post_ids:
+        redis_client.zrem(key, *post_ids)
+
+
+def rebuild_timeline(user_id):
+    """
+    Rebuild a cold or evicted timeline from Postgres.
+    The timeline holds the most recent posts of the user and everyone they follow, and the empty marker.
+    :param user_id:
+    :return: the number of posts written to the timeline
+    """
+    authors = get_followee_ids(user_id) + [str(user_id)]
+    posts = Post.objects.filter(
+        author_id__in=authors, is_deleted=False, moderation_status=ModerationStatus.PUBLISHED
+    ).order_by('-created_at').values_list(
+        'id', 'created_at')[:TIMELINE_MAX_LENGTH]
+    mapping = {str(post_id): score_for(created_at) for post_id, created_at in posts}
+
+    key = timeline_key(user_id)
+    pipe = redis_client.pipeline()
+    pipe.delete(key)
+    pipe.zadd(key, {EMPTY_MARKER: EMPTY_SCORE, **mapping})
+    pipe.expire(key, TIMELINE_TTL)
+    pipe.execute()
+    return len(mapping)
+
+
+def read_window(key, position, reverse, count):
+    if reverse:
+        bound = f"({score_for(parse_datetime(position))!r}" if position else LOWEST_BOUND
+        return redis_client.zrangebyscore(key, bound, '+inf', start=0, num=count, withscores=True)
+
+    bound = f"({score_for(parse_datetime(position))!r}" if position else '+inf'
+    return redis_client.zrevrangebyscore(key, bound, LOWEST_BOUND, start=0, num=count, withscores=True)
+
+
+def get_followed_pull_authors(user_id):
+    pull_authors = redis_client.smembers(PULL_AUTHORS_KEY)
+    if not pull_authors:
+        return []
+
+    return list({author_id.decode() for author_id in pull_authors} & set(get_followee_ids(user_id)))
+
+
+def merge_pull_authors(entries, pull_authors, position, reverse, count):
+    """
+    Merge the recent posts of followed high-follower authors into a timeline window.
+    Every author cache is read with the same cursor bounds as the timeline, so the merged window
+    is still the exact set of rows the paginator expects.
+    :param entries: (post_id, score) pairs read from the timeline
+    :param pull_authors:
+    :param position:
+    :param reverse:
+    :param count:
+    :return:
+    """
+    started = time.perf_counter()
+    merged = dict(entries)
+    for author_id in pull_authors:
+        key = author_recent_key(author_id)
+        if not redis_client.exists(key):
+            rebuild_author_recent(author_id)
+        merged.update(read_window(key, position, reverse, count))
+
+    window = sorted(merged.items(), key=lambda entry: entry[1], reverse=not reverse)[:count]
+    metrics.record(METRICS_NAMESPACE, pull_merges=1, pull_authors_merged=len(pull_authors),
+                   pull_merge_ms=(time.perf_counter() - started) * 1000)
+    return window
+
+
+def read_timeline(user_id, position=None, reverse=False, count=None):
+    """
+    Read a window of post ids from the user's timeline, newest first.
+    The position and reverse arguments come from a decoded CursorSetPagination cursor, so the window
+    holds exactly the rows the paginator will look at once the ids are hydrated from Postgres.
+    Posts of followed high-follower authors are merged in from their recent posts caches.
+    :param user_id:
+    :param position: the created_at position of the cursor, if any
+    :param reverse: whether the cursor walks towards newer posts
+    :param count: the maximum number of ids to return
+    :return:
+    """
+    key = timeline_key(user_id)
+    if not redis_client.exists(key):
+        rebuild_timeline(user_id)
+    else:
+        redis_client.expire(key, TIMELINE_TTL)
+
+    count = count or TIMELINE_MAX_LENGTH
+    entries = read_window(key, position, reverse, count)
+
+    pull_authors = get_followed_pull_authors(user_id)
+    if pull_authors:
+        entries = merge_pull_authors(entries, pull_authors, position, reverse, count)
+
+    return [post_id.decode() for post_id, score in entries]
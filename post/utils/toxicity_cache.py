@@ -0,0 +1,108 @@
+import hashlib
+import json
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+from alx_project_nexus.settings import TOXICITY_CACHE_SIZE, TOXICITY_CACHE_TTL
+from utils import metrics
+from utils.redis_client import redis_client
+
+SCORES_KEY = "toxicity:scores:{digest}"
+METRICS_NAMESPACE = "toxicity_cache"
+
+# Characters that do not change how a caption reads, removed so reposts with invisible edits share an entry.
+INVISIBLE_CHARACTERS = re.compile('[\u200b-\u200f\u2060\ufeff]')
+
+
+def normalize_text(text):
+    """
+    Normalize a caption so that reposts differing only in case, spacing, unicode form or
+    invisible characters share a cache entry.
+    :param text:
+    :return:
+    """
+    text = unicodedata.normalize('NFKC', text)
+    text = INVISIBLE_CHARACTERS.sub('', text)
+    return ' '.join(text.casefold().split())
+
+
+def text_digest(text):
+    return hashlib.sha256(normalize_text(text).encode()).hexdigest()
+
+
+class LRUCache:
+    """
+    Small thread-safe LRU mapping, the in-process tier in front of Redis.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_scores = LRUCache(TOXICITY_CACHE_SIZE)
+
+
+def get_cached_scores(digest):
+    """
+    Look a text up in the process LRU, then in Redis.
+    A Redis hit is copied into the process LRU.
+    :param digest:
+    :return: the label scores, or None on a miss of both tiers
+    """
+    scores = local_scores.get(digest)
+    if scores is not None:
+        metrics.record(METRICS_NAMESPACE, memory_hits=1)
+        return scores
+
+    cached = redis_client.get(SCORES_KEY.format(digest=digest))
+    if cached is None:
+        metrics.record(METRICS_NAMESPACE, memory_misses=1, redis_misses=1)
+        return None
+
+    scores = json.loads(cached)
+    local_scores.put(digest, scores)
+    metrics.record(METRICS_NAMESPACE, memory_misses=1, redis_hits=1)
+    return scores
+
+
+def cache_scores(digest, scores):
+    local_scores.put(digest, scores)
+    redis_client.set(SCORES_KEY.format(digest=digest), json.dumps(scores), ex=TOXICITY_CACHE_TTL)
+
+
+def get_scores(text, classify):
+    """
+    Get the score of every label for a text, calling the model only when neither cache tier knows it.
+    Scores are cached rather than the flagged decision, so changing the thresholds needs no reclassification.
+    :param text:
+    :param classify: a function returning the label scores of a text from the model
+    :return: a dict of label to score
+    """
+    digest = text_digest(text)
+    scores = get_cached_scores(digest)
+    if scores is None:
+        scores = classify(text)
+        cache_scores(digest, scores)
+    return scores
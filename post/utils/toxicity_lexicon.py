@@ -0,0 +1,54 @@
+import re
+from dataclasses import dataclass
+
+from post.utils.toxicity_cache import normalize_text
+
+# Slurs and calls to self-harm, abusive whatever the context: one of them is enough to flag a caption.
+SEVERE_TERMS = (
+    "retard", "cunt", "slut", "whore", "motherfucker", "dickhead", "shithead", "scumbag", "kill yourself", "kys",
+    "go die",
+)
+
+# Insults and profanity, which also appear in banter or about things rather than people ("don't be stupid").
+ABUSIVE_TERMS = (
+    "idiot", "moron", "imbecile", "dumbass", "jackass", "asshole", "bastard", "bitch", "fuck", "loser", "stupid",
+    "piece of shit", "shut up",
+)
+
+# Common character substitutions used to dodge word filters.
+LEET_TABLE = str.maketrans({"0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "@": "a", "$": "s"})
+
+
+def compile_terms(terms):
+    # Longest terms first so "motherfucker" is not reported as "fuck", with the usual inflections only so that
+    # "bitch" does not match "bitchin".
+    alternatives = '|'.join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+    return re.compile(rf"\b(?:{alternatives})(?:s|es|ed|ing|er|ers|y)?\b")
+
+
+SEVERE_PATTERN = compile_terms(SEVERE_TERMS)
+# Severe terms are matched with the others so "motherfucker" is not also counted as "fuck".
+ABUSIVE_PATTERN = compile_terms(SEVERE_TERMS + ABUSIVE_TERMS)
+REPEATED_LETTERS = re.compile(r"([a-z])\1{2,}")
+
+
+@dataclass
+class LexiconScan:
+    severe: int = 0
+    abusive: int = 0
+
+
+def scan(text):
+    """
+    Run the local lexicon over a text.
+    Matching is done on the normalized text with leetspeak undone and stretched letters squeezed,
+    so "Y0U are an IDIOOOT" reads as "you are an idiot".
+    :param text:
+    :return: a LexiconScan
+    """
+    normalized = normalize_text(text)
+    readable = REPEATED_LETTERS.sub(r"\1", normalized.translate(LEET_TABLE))
+    return LexiconScan(
+        severe=len(SEVERE_PATTERN.findall(readable)),
+        abusive=len(ABUSIVE_PATTERN.findall(readable)),
+    )
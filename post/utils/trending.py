@@ -0,0 +1,171 @@
+import math
+import time
+from datetime import datetime, timezone
+
+from django.db import transaction
+
+from alx_project_nexus.settings import TRENDING_HALF_LIFE, TRENDING_CAPACITY
+from post.models import Hashtag, TrendingHashtag
+from utils import metrics
+from utils.redis_client import redis_client
+
+TRENDING_KEY = "trending:hashtags"
+LANDMARK_KEY = "trending:hashtags:landmark"
+METRICS_NAMESPACE = "trending"
+
+DECAY_RATE = math.log(2) / TRENDING_HALF_LIFE
+
+# Rescale once the weights reach 2^32, well before a double loses precision.
+RENORMALIZE_AFTER = 32 * TRENDING_HALF_LIFE
+
+# Space-Saving with forward decay: a tracked tag adds the weight of the event to its score, an untracked
+# tag takes the place of the lowest tag when the set is full and inherits its score as the error bound.
+RECORD_SCRIPT = """
+local weight = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+for i = 3, #ARGV do
+    local tag = ARGV[i]
+    if redis.call('ZSCORE', KEYS[1], tag) then
+        redis.call('ZINCRBY', KEYS[1], weight, tag)
+    elseif redis.call('ZCARD', KEYS[1]) < capacity then
+        redis.call('ZADD', KEYS[1], weight, tag)
+    else
+        local lowest = redis.call('ZPOPMIN', KEYS[1])
+        redis.call('ZADD', KEYS[1], tonumber(lowest[2]) + weight, tag)
+    end
+end
+return 1
+"""
+
+# Rescale to a new landmark unless another run moved it meanwhile, so concurrent callers rescale once.
+RESCALE_SCRIPT = """
+local landmark = tonumber(redis.call('GET', KEYS[2]))
+local timestamp = tonumber(ARGV[1])
+if landmark == nil or timestamp - landmark <= tonumber(ARGV[3]) then
+    return 0
+end
+local factor = math.exp(-tonumber(ARGV[2]) * (timestamp - landmark))
+local entries = redis.call('ZRANGE', KEYS[1], 0, -1, 'WITHSCORES')
+for i = 1, #entries, 2 do
+    redis.call('ZADD', KEYS[1], tonumber(entries[i + 1]) * factor, entries[i])
+end
+redis.call('SET', KEYS[2], ARGV[1])
+return #entries / 2
+"""
+
+record_script = redis_client.register_script(RECORD_SCRIPT)
+rescale_script = redis_client.register_script(RESCALE_SCRIPT)
+
+
+def get_landmark():
+    """
+    Get the landmark time of the forward decay, starting the engine from its checkpoint when Redis is empty.
+    :return: the landmark as a unix timestamp
+    """
+    landmark = redis_client.get(LANDMARK_KEY)
+    if landmark is None:
+        return restore()
+    return float(landmark)
+
+
+def current_landmark(timestamp):
+    """
+    Get the landmark, moving it to the timestamp first once it is RENORMALIZE_AFTER old.
+    Every read and write goes through it, so the weights stay bounded even if the checkpoint task does not run.
+    :param timestamp:
+    :return: the landmark as a unix timestamp
+    """
+    landmark = get_landmark()
+    if timestamp - landmark > RENORMALIZE_AFTER:
+        rescale_script(keys=[TRENDING_KEY, LANDMARK_KEY], args=[timestamp, DECAY_RATE, RENORMALIZE_AFTER])
+        landmark = get_landmark()
+    return landmark
+
+
+def weight_at(timestamp, landmark):
+    return math.exp(DECAY_RATE * (timestamp - landmark))
+
+
+def record(names, timestamp=None):
+    """
+    Record hashtag attach events.
+    With forward decay an event at time t adds exp(rate * (t - landmark)) to the tag score, so older events
+    lose weight relative to new ones without ever touching the stored scores.
+    :param names: the hashtag names
+    :param timestamp: the time of the events, now by default
+    :return:
+    """
+    names = list(names)
+    if not names:
+        return
+
+    timestamp = timestamp or time.time()
+    landmark = current_landmark(timestamp)
+    record_script(keys=[TRENDING_KEY], args=[weight_at(timestamp, landmark), TRENDING_CAPACITY, *names])
+    metrics.record(METRICS_NAMESPACE, events=len(names))
+
+
+def top(limit=10, timestamp=None):
+    """
+    Read the trending hashtags.
+    :param limit:
+    :param timestamp: the time the scores are decayed to, now by default
+    :return: a list of (name, score) pairs, the score being the decayed number of uses
+    """
+    timestamp = timestamp or time.time()
+    landmark = current_landmark(timestamp)
+    scale = weight_at(timestamp, landmark)
+    entries = redis_client.zrevrange(TRENDING_KEY, 0, limit - 1, withscores=True)
+    return [(name.decode(), round(score / scale, 4)) for name, score in entries]
+
+
+def renormalize(timestamp=None):
+    """
+    Move the landmark to now and rescale the scores, so the weights of new events stay small.
+    :param timestamp:
+    :return: the number of rescaled tags
+    """
+    timestamp = timestamp or time.time()
+    # Restores the checkpoint first when Redis lost the landmark.
+    get_landmark()
+    return rescale_script(keys=[TRENDING_KEY, LANDMARK_KEY], args=[timestamp, DECAY_RATE, 0])
+
+
+def checkpoint(timestamp=None):
+    """
+    Persist the decayed scores to TrendingHashtag so the engine survives a Redis restart.
+    :param timestamp:
+    :return: the number of saved tags
+    """
+    timestamp = timestamp or time.time()
+    scores = dict(top(TRENDING_CAPACITY, timestamp))
+    hashtags = Hashtag.objects.in_bulk(list(scores), field_name='name')
+    checkpointed_at = datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+    with transaction.atomic():
+        TrendingHashtag.objects.all().delete()
+        TrendingHashtag.objects.bulk_create([
+            TrendingHashtag(hashtag=hashtag, score=scores[name], checkpointed_at=checkpointed_at)
+            for name, hashtag in hashtags.items()
+        ])
+    return len(hashtags)
+
+
+def restore(timestamp=None):
+    """
+    Start a new landmark and load the last checkpoint into Redis, decaying each score to now.
+    Only the process that sets the landmark loads the checkpoint.
+    :param timestamp:
+    :return: the landmark
+    """
+    timestamp = timestamp or time.time()
+    if not redis_client.set(LANDMARK_KEY, timestamp, nx=True):
+        return float(redis_client.get(LANDMARK_KEY))
+
+    pipe = redis_client.pipeline()
+    pipe.delete(TRENDING_KEY)
+    for entry in TrendingHashtag.objects.select_related('hashtag'):
+        pipe.zincrby(TRENDING_KEY, entry.score * weight_at(entry.checkpointed_at.timestamp(), timestamp),
+                     entry.hashtag.name)
+    pipe.execute()
+    return timestamp
@@ -0,0 +1,182 @@
+import os
+import re
+from datetime import timedelta
+
+from PIL import Image, UnidentifiedImageError
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from alx_project_nexus.settings import UPLOAD_BUFFER_SIZE, UPLOAD_CHUNK_SIZE, UPLOAD_EXPIRY
+from post.models import Upload, UploadStatus
+from post.utils.exception import InvalidUpload, UploadConflict
+from post.utils.media_store import store_media
+
+PARTIAL_NAME = "uploads/partial/{id}.part"
+CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+
+# Leading bytes of the accepted image formats, checked on the first chunk so a non-image upload fails early.
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+def sniff_image(header):
+    """
+    Detect the image format from the first bytes of a file.
+    :param header: at least the first 12 bytes of the file
+    :return: the content type, or None if the bytes are not a supported image
+    """
+    for signature, content_type in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return content_type
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def partial_path(upload):
+    return default_storage.path(PARTIAL_NAME.format(id=upload.id))
+
+
+def parse_content_range(header, upload):
+    """
+    Parse the Content-Range header of a chunk, e.g. "bytes 0-524287/2097152".
+    :param header:
+    :param upload:
+    :return: the first and last byte offsets of the chunk, both included
+    """
+    match = CONTENT_RANGE.match(header or "")
+    if not match:
+        raise InvalidUpload("A Content-Range header of the form 'bytes start-end/total' is required.")
+
+    start, end, total = map(int, match.groups())
+    if total != upload.size or start > end or end >= total:
+        raise InvalidUpload("The Content-Range does not fit the declared upload size.")
+    if end - start + 1 > UPLOAD_CHUNK_SIZE:
+        raise InvalidUpload(f"Chunks are limited to {UPLOAD_CHUNK_SIZE} bytes.")
+    return start, end
+
+
+def write_chunk(upload, stream, start, end):
+    """
+    Append a chunk to the partial file of an upload, the caller holds a lock on the upload row.
+    The body is copied in UPLOAD_BUFFER_SIZE blocks, so memory stays bounded whatever the chunk size.
+    A chunk that was already received is ignored, which lets a client retry after losing a response,
+    and a chunk starting past the received offset is refused with a conflict.
+    The first chunk is checked against the known image signatures.
+    :param upload:
+    :param stream: the request body
+    :param start: first byte offset of the chunk
+    :param end: last byte offset of the chunk
+    :return: the received offset
+    """
+    if upload.status != UploadStatus.PENDING:
+        raise InvalidUpload("The upload is already complete.")
+    if end < upload.received:
+        return upload.received
+    if start != upload.received:
+        raise UploadConflict(f"The upload has received {upload.received} bytes, the next chunk must start there.")
+
+    path = partial_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    length = end - start + 1
+    written = 0
+    with open(path, "r+b" if os.path.exists(path) else "wb") as partial:
+        # Drop the bytes an interrupted attempt may have left past the received offset.
+        partial.seek(start)
+        partial.truncate()
+        while stream is not None and written < length:
+            block = stream.read(min(UPLOAD_BUFFER_SIZE, length - written))
+            if not block:
+                break
+            if start + written == 0:
+                upload.content_type = sniff_image(block) or ""
+                if not upload.content_type:
+                    partial.truncate(0)
+                    raise InvalidUpload("The upload is not a supported image.")
+            partial.write(block)
+            written += len(block)
+
+        if written != length:
+            partial.truncate(start)
+            raise InvalidUpload("The request body is shorter than its Content-Range.")
+
+    upload.received = end + 1
+    upload.save(update_fields=["received", "content_type", "updated_at"])
+    return upload.received
+
+
+def complete_upload(upload):
+    """
+    Verify a fully received upload and add it to the media store, the caller holds a lock on the upload row.
+    Completing an upload twice is a no-op.
+    :param upload:
+    :return:
+    """
+    if upload.status != UploadStatus.PENDING:
+        return upload
+    if upload.received != upload.size:
+        raise InvalidUpload(f"The upload is missing {upload.size - upload.received} bytes.")
+
+    path = partial_path(upload)
+    try:
+        with Image.open(path) as image:
+            image.verify()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError):
+        raise InvalidUpload("The upload is not a valid image.")
+
+    with open(path, "rb") as partial:
+        upload.media = store_media(File(partial, name=upload.filename))
+    os.remove(path)
+    upload.status = UploadStatus.COMPLETE
+    upload.save(update_fields=["media", "status", "updated_at"])
+    return upload
+
+
+def consume_upload(upload_id, user):
+    """
+    Claim a complete upload of a user for a post or story, an upload can only be used once.
+    :param upload_id:
+    :param user:
+    :return: the MediaBlob of the upload, whose file name can be assigned to an image field
+    """
+    claimed = Upload.objects.filter(pk=upload_id, owner_id=user.id, status=UploadStatus.COMPLETE).update(
+        status=UploadStatus.CONSUMED, updated_at=timezone.now())
+    if not claimed:
+        raise InvalidUpload("The upload does not exist, is not complete or was already used.")
+    return Upload.objects.select_related("media").get(pk=upload_id).media
+
+
+def request_media(image, upload_id, user):
+    """
+    Get the media blob of a post or story request, from its uploaded image or from a chunked upload.
+    :param image: the uploaded file, if any
+    :param upload_id: the id of a complete chunked upload, if any
+    :param user:
+    :return: the MediaBlob, or None when the request holds no image
+    """
+    if upload_id:
+        return consume_upload(upload_id, user)
+    if image:
+        return store_media(image)
+    return None
+
+
+def delete_expired_uploads():
+    """
+    Delete the uploads left unfinished or unused for UPLOAD_EXPIRY seconds, with their partial files.
+    The blobs of completed uploads are left to delete_orphan_blobs, another post may share them.
+    :return: the number of deleted uploads
+    """
+    cutoff = timezone.now() - timedelta(seconds=UPLOAD_EXPIRY)
+    expired = list(Upload.objects.filter(status__in=[UploadStatus.PENDING, UploadStatus.COMPLETE],
+                                         updated_at__lt=cutoff))
+    for upload in expired:
+        if os.path.exists(partial_path(upload)):
+            os.remove(partial_path(upload))
+    Upload.objects.filter(pk__in=[upload.pk for upload in expired]).delete()
+    return len(expired)
@@ -0,0 +1,150 @@
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+
+from django.db import connection
+from django.db.models import Case, F, Value, When
+
+from alx_project_nexus.settings import VIEW_FLUSH_BATCH_SIZE, VIEW_FLUSH_MAX_BATCHES
+from post.models import Post, Story, View, StoryView
+from utils import metrics
+from utils.redis_client import redis_client
+
+BUFFER_KEY = "views:buffer:{kind}"
+FLUSH_LOCK_KEY = "views:flush_lock"
+METRICS_NAMESPACE = "view_buffer"
+FLUSH_LOCK_TIMEOUT = 60
+
+# Delete the lock only if it still holds the token of the run, an expired lock may belong to another run.
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+release_script = redis_client.register_script(RELEASE_SCRIPT)
+
+# kind -> (viewed model, view model, foreign key of the view to the viewed object)
+KINDS = {
+    'post': (Post, View, 'post'),
+    'story': (Story, StoryView, 'story'),
+}
+
+
+def buffer_key(kind):
+    return BUFFER_KEY.format(kind=kind)
+
+
+def record_view(kind, object_id, user_id, timestamp=None):
+    """
+    Append a view to the Redis buffer of its kind, a single RPUSH so the request does not wait on the database.
+    The buffered views are written by flush().
+    :param kind: 'post' or 'story'
+    :param object_id: the id of the viewed post or story
+    :param user_id: the id of the viewer
+    :param timestamp: the time of the view, now by default
+    :return:
+    """
+    redis_client.rpush(buffer_key(kind), f"{object_id}:{user_id}:{timestamp or time.time()}")
+
+
+def pop_batch(kind, batch_size):
+    """
+    Atomically take the oldest views of a buffer, views recorded meanwhile stay in it.
+    :param kind:
+    :param batch_size:
+    :return: a list of (object_id, user_id, timestamp) tuples
+    """
+    pipe = redis_client.pipeline()
+    pipe.lrange(buffer_key(kind), 0, batch_size - 1)
+    pipe.ltrim(buffer_key(kind), batch_size, -1)
+    entries, _ = pipe.execute()
+    batch = []
+    for entry in entries:
+        object_id, user_id, timestamp = entry.decode().split(":")
+        batch.append((object_id, user_id, float(timestamp)))
+    return batch
+
+
+def write_batch(kind, batch):
+    """
+    Write a batch of buffered views with one INSERT and bump the view counters of the viewed objects
+    with one UPDATE.
+    A user views an object once: repeated views of the batch keep the first one and the views already in
+    the database are skipped by ON CONFLICT on the (object, user) unique constraint, so only the inserted
+    views are counted. The views are joined to the viewed objects, so the views of deleted objects are dropped.
+    The insert bypasses the ORM, so the counter signals of single views do not fire here.
+    :param kind:
+    :param batch: a list of (object_id, user_id, timestamp) tuples
+    :return: the number of inserted views
+    """
+    model, view_model, fk_field = KINDS[kind]
+    first_views = {}
+    for object_id, user_id, timestamp in batch:
+        first_views.setdefault((object_id, user_id), timestamp)
+    if not first_views:
+        return 0
+
+    quote = connection.ops.quote_name
+    fk_column = quote(view_model._meta.get_field(fk_field).column)
+    pk_type = model._meta.pk.db_type(connection)
+    user_type = view_model._meta.get_field('user').target_field.db_type(connection)
+    rows = ", ".join([f"(%s::uuid, %s::{pk_type}, %s::{user_type}, %s::timestamptz)"] * len(first_views))
+    params = []
+    for (object_id, user_id), timestamp in first_views.items():
+        params += [uuid.uuid4(), object_id, user_id, datetime.fromtimestamp(timestamp, tz=timezone.utc)]
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {quote(view_model._meta.db_table)} (id, {fk_column}, user_id, created_at) "
+            f"SELECT views.id, views.object_id, views.user_id, views.created_at "
+            f"FROM (VALUES {rows}) AS views (id, object_id, user_id, created_at) "
+            f"JOIN {quote(model._meta.db_table)} viewed ON viewed.{quote(model._meta.pk.column)} = views.object_id "
+            f"ON CONFLICT ({fk_column}, user_id) DO NOTHING "
+            f"RETURNING {fk_column}",
+            params,
+        )
+        inserted = [object_id for object_id, in cursor.fetchall()]
+    if not inserted:
+        return 0
+
+    counts = Counter(inserted)
+    model.objects.filter(pk__in=list(counts)).update(view_count=F('view_count') + Case(
+        *(When(pk=object_id, then=Value(count)) for object_id, count in counts.items()), default=Value(0)))
+    return len(inserted)
+
+
+def flush(batch_size=VIEW_FLUSH_BATCH_SIZE, max_batches=VIEW_FLUSH_MAX_BATCHES):
+    """
+    Drain the view buffers into the database, batch_size views at a time.
+    A run stops after max_batches batches of a kind, so a backlog is spread over the next runs instead of
+    holding a worker, and a lock keeps overlapping runs from counting the same views twice.
+    A batch taken from the buffer is lost if the worker dies before writing it, at most batch_size views.
+    :param batch_size:
+    :param max_batches:
+    :return: the number of inserted views, or None when another run holds the lock
+    """
+    token = uuid.uuid4().hex
+    if not redis_client.set(FLUSH_LOCK_KEY, token, nx=True, ex=FLUSH_LOCK_TIMEOUT):
+        return None
+
+    started = time.perf_counter()
+    buffered = inserted = 0
+    try:
+        for kind in KINDS:
+            for _ in range(max_batches):
+                batch = pop_batch(kind, batch_size)
+                if not batch:
+                    break
+                buffered += len(batch)
+                inserted += write_batch(kind, batch)
+                if len(batch) < batch_size:
+                    break
+    finally:
+        release_script(keys=[FLUSH_LOCK_KEY], args=[token])
+
+    metrics.record(METRICS_NAMESPACE, flushes=1, buffered=buffered, inserted=inserted,
+                   duplicates=buffered - inserted, flush_ms=(time.perf_counter() - started) * 1000)
+    return inserted
@@ -1,54 +1,113 @@
+from django.db import transaction
 from django.db.models import Q
+from django.shortcuts import get_object_or_404
+from rest_framework import mixins
 from rest_framework.decorators import action
-from rest_framework import filters
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.viewsets import ModelViewSet
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.viewsets import GenericViewSet, ModelViewSet, ReadOnlyModelViewSet
 
-from post.models import Post, Comment, Story, View, StoryView
+from post.models import Post, Comment, Story, Hashtag, Upload
 from post.serializers import PostSerializer, LikeSerializer, CommentSerializer, CommentListSerializer, StorySerializer, \
-    StoryLikeSerializer, PostListSerializer, StoryListSerializer, PostViewSerializer
+    StoryLikeSerializer, PostListSerializer, StoryListSerializer, HashtagSerializer, \
+    TrendingHashtagSerializer, UploadSerializer
 from post.utils.handle_private import generate_like_queryset, generate_comment_queryset
+from post.utils.hashtags import get_hashtag, tagged_queryset
+from post.utils.media_store import near_duplicates
+from post.utils.moderation import visible_filter
+from post.tasks import remove_post_from_timelines
+from post.utils.response_cache import CachedResponseMixin
+from post.utils.search import PostSearchFilter, decode_cursor, encode_cursor, get_search_backend, \
+    search_terms
 from post.utils.serialize_comments import build_comment_tree
-from user.models import User, PrivacyChoice
+from post.utils import trending
+from post.utils.timeline import read_timeline
+from post.utils.uploads import complete_upload, parse_content_range, write_chunk
+from post.utils.view_buffer import record_view
+from user.models import PrivacyChoice
+from user.utils.followees import get_followee_ids
+from utils import typeahead
 from utils.pagination import CursorSetPagination
 
 
-class PostViewSet(ModelViewSet):
+class PostViewSet(CachedResponseMixin, ModelViewSet):
     """
     ViewSet for managing posts.
     This ViewSet provides CRUD operations for the Post model.
     It allows users to create, retrieve, update, and delete posts.
-    Posts can be filtered by hashtags using the 'hashtag' query parameter.
-    The queryset only includes posts that are not marked as deleted.
+    Posts can be filtered by hashtags using the 'hashtag' query parameter, served from the per-hashtag
+    link index.
+    The queryset only includes posts that are not marked as deleted, and published posts unless the viewer
+    is their author.
     The serializer used is PostSerializer, which handles the serialization and deserialization of Post instances.
+    The authenticated home feed is served from the user's Redis timeline, Postgres is only used to hydrate
+    the post ids of the requested page.
+    List and retrieve responses are cached per viewer visibility by the CachedResponseMixin.
+    The 'search' query parameter filters the feed through the full-text index, the search action returns
+    the matches ranked by relevance.
+    Staff users can list the near duplicates of a post's image for moderation.
     """
     queryset = Post.objects.filter(is_deleted=False)
     serializer_class = PostSerializer
     pagination_class = CursorSetPagination
-    filter_backends = [filters.SearchFilter]
-    search_fields = ['caption', 'hashtags__name']
+    filter_backends = [PostSearchFilter]
+    cache_endpoint = 'posts'
 
     ordering = ['-created_at']
+    ordering_fields = ['created_at']
 
     def get_queryset(self):
         user = self.request.user
         hashtag = self.request.query_params.get('hashtag')
 
+        if self.action == 'list' and user.is_authenticated and self.serves_timeline():
+            return self.get_timeline_queryset(user)
+
         base_filter = Q(author__privacy_choice=PrivacyChoice.PUBLIC)
 
         if user.is_authenticated:
-            base_filter |= Q(author__in=User.objects.filter(followers__follower=user))
+            base_filter |= Q(author_id__in=get_followee_ids(user.id))
 
         queryset = Post.objects.prefetch_related('hashtags').select_related('author').filter(
             is_deleted=False
-        ).filter(base_filter)
+        ).filter(base_filter).filter(visible_filter(user))
 
         if hashtag:
-            queryset = queryset.filter(hashtags__name__iexact=hashtag)
+            queryset = tagged_queryset(queryset, get_hashtag(hashtag))
 
         return queryset
 
+    def get_pagination_ordering(self, ordering):
+        """
+        Hashtag feeds are ordered by the tagged_at time of the hashtag link, which is indexed per hashtag.
+        """
+        if self.request.query_params.get('hashtag'):
+            return [field.replace('created_at', 'tagged_at') for field in ordering]
+        return ordering
+
+    def serves_timeline(self):
+        """
+        The timeline only holds the plain home feed, hashtag, search and custom ordering
+        requests are answered from the database.
+        """
+        params = self.request.query_params
+        return not any(params.get(param) for param in ('hashtag', 'search', 'ordering'))
+
+    def get_timeline_queryset(self, user):
+        """
+        Build the home feed queryset from the window of the user's timeline that the current cursor
+        points at, so the paginator only ever hydrates one page worth of post ids.
+        """
+        cursor = self.paginator.decode_cursor(self.request)
+        offset, reverse, position = cursor if cursor else (0, False, None)
+        count = offset + self.paginator.get_page_size(self.request) + 1
+
+        post_ids = read_timeline(user.id, position, reverse, count)
+        return Post.objects.prefetch_related('hashtags').select_related('author').filter(
+            id__in=post_ids, is_deleted=False
+        ).filter(visible_filter(user))
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['request'] = self.request
@@ -61,7 +120,8 @@ class PostViewSet(ModelViewSet):
 
     def perform_destroy(self, instance):
         instance.is_deleted = True
-        instance.save()
+        instance.save(update_fields=['is_deleted', 'updated_at'])
+        remove_post_from_timelines.delay(str(instance.id))
         return instance
 
     def get_permissions(self):
@@ -70,6 +130,8 @@ class PostViewSet(ModelViewSet):
         """
         if self.action in ['create', 'update', 'partial_update', 'destroy', 'view_post']:
             self.permission_classes = [IsAuthenticated]
+        elif self.action == 'near_duplicates':
+            self.permission_classes = [IsAdminUser]
         else:
             self.permission_classes = [AllowAny]
         return super().get_permissions()
@@ -78,32 +140,94 @@ class PostViewSet(ModelViewSet):
     def view_post(self, request, *args, **kwargs):
         """
         Custom action to handle post views.
-        This action creates a View instance for the post being viewed by the authenticated user.
+        This action buffers the view of the post by the authenticated user, the View instance is written
+        and the view count bumped by the flush_views task.
         It can be accessed via the URL /posts/{pk}/view_post/.
-        It returns the serialized data of the created View instance.
+        It returns 202 Accepted with the viewed post and the viewer.
         """
         post = self.get_object()
-        view = View.objects.create(post=post, user=request.user)
-        serializer = PostViewSerializer(view)
-        return Response(serializer.data)
+        record_view('post', post.id, request.user.id)
+        return Response({"post": post.id, "user": request.user.id}, status=202)
 
-
-class StoryViewSet(ModelViewSet):
+    @action(detail=False, methods=['get'], url_path='search')
+    def search(self, request, *args, **kwargs):
+        """
+        Custom action to search posts by caption and hashtags, best matches first.
+        It can be accessed via the URL /posts/search/?q=django.
+        Every result carries its rank and the caption with the matched words wrapped in <mark> tags.
+        Pages are chained with the cursor of the "next" link, which points after the (rank, id) of the last result.
+        """
+        text = request.query_params.get('q', '')
+        if not search_terms(text):
+            return Response({"q": "A search query is required."}, status=400)
+
+        cursor = request.query_params.get('cursor')
+        after = decode_cursor(cursor) if cursor else None
+        limit = self.paginator.get_page_size(request)
+        results = get_search_backend().search(self.get_queryset(), text, after, limit)
+
+        next_link = None
+        if len(results) > limit:
+            results = results[:limit]
+            next_link = replace_query_param(request.build_absolute_uri(), 'cursor', encode_cursor(results[-1]))
+
+        posts = PostListSerializer([result.post for result in results], many=True,
+                                   context=self.get_serializer_context()).data
+        for data, result in zip(posts, results):
+            data['rank'] = result.rank
+            data['highlight'] = result.highlight
+        return Response({"next": next_link, "results": posts})
+
+    @action(detail=True, methods=['get'], url_path='near_duplicates')
+    def near_duplicates(self, request, *args, **kwargs):
+        """
+        Custom action for moderators to find the posts and stories whose image looks like the image of a post.
+        It can be accessed via the URL /posts/{pk}/near_duplicates/ by staff users, whatever the moderation
+        status of the post.
+        Every result carries the pHash Hamming distance of its image, 0 for exact reposts, closest first.
+        """
+        post = get_object_or_404(Post.objects.select_related('media'), pk=kwargs['pk'])
+        if not post.media:
+            return Response({"posts": [], "stories": []})
+
+        distances = {post.media_id: 0, **{blob.pk: distance for blob, distance in near_duplicates(post.media)}}
+        posts = Post.objects.select_related('author').filter(media_id__in=distances, is_deleted=False).exclude(
+            pk=post.pk)
+        stories = Story.objects.select_related('author').filter(media_id__in=distances, is_deleted=False)
+
+        context = self.get_serializer_context()
+        results = {}
+        for key, serializer_class, rows in (('posts', PostListSerializer, posts),
+                                            ('stories', StoryListSerializer, stories)):
+            rows = sorted(rows, key=lambda row: (distances[row.media_id], row.created_at))
+            data = serializer_class(rows, many=True, context=context).data
+            for item, row in zip(data, rows):
+                item['distance'] = distances[row.media_id]
+            results[key] = data
+        return Response(results)
+
+
+class StoryViewSet(CachedResponseMixin, ModelViewSet):
     """
     ViewSet for managing stories.
     This ViewSet provides CRUD operations for the Story model.
     It allows users to create, retrieve, update, and delete stories.
     Stories can be filtered by hashtags using the 'hashtag' query parameter.
-    The queryset only includes stories that are not marked as deleted.
+    The queryset only includes stories that are not marked as deleted, and published stories unless the
+    viewer is their author.
     The serializer used is StorySerializer, which handles the serialization and deserialization of Story instances.
     The ordering is set to display the most recent stories first.
-    The get_queryset method filters stories based on the 'hashtag' query parameter if provided.
+    The get_queryset method filters stories based on the 'hashtag' query parameter if provided, through the
+    per-hashtag link index.
+    List and retrieve responses are cached per viewer visibility by the CachedResponseMixin.
     """
     queryset = Story.objects.filter(is_deleted=False)
     serializer_class = StorySerializer
     pagination_class = CursorSetPagination
+    cache_endpoint = 'stories'
 
     ordering = ['-created_at']
+    ordering_fields = ['created_at']
 
     def get_queryset(self):
         user = self.request.user
@@ -112,17 +236,25 @@ class StoryViewSet(ModelViewSet):
         base_filter = Q(author__privacy_choice=PrivacyChoice.PUBLIC)
 
         if user.is_authenticated:
-            base_filter |= Q(author__in=User.objects.filter(followers__follower=user))
+            base_filter |= Q(author_id__in=get_followee_ids(user.id))
 
         queryset = Story.objects.prefetch_related('hashtags').select_related('author').filter(
             is_deleted=False
-        ).filter(base_filter)
+        ).filter(base_filter).filter(visible_filter(user))
 
         if hashtag:
-            queryset = queryset.filter(hashtags__name__iexact=hashtag)
+            queryset = tagged_queryset(queryset, get_hashtag(hashtag))
 
         return queryset
 
+    def get_pagination_ordering(self, ordering):
+        """
+        Hashtag feeds are ordered by the tagged_at time of the hashtag link, which is indexed per hashtag.
+        """
+        if self.request.query_params.get('hashtag'):
+            return [field.replace('created_at', 'tagged_at') for field in ordering]
+        return ordering
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['request'] = self.request
@@ -145,7 +277,7 @@ class StoryViewSet(ModelViewSet):
 
     def perform_destroy(self, instance):
         instance.is_deleted = True
-        instance.save()
+        instance.save(update_fields=['is_deleted'])
         return instance
 
     @action(detail=True, methods=['get'], url_path='get_image')
@@ -153,12 +285,14 @@ class StoryViewSet(ModelViewSet):
         """
         Custom action to retrieve the image of a specific story.
         This action returns the image of the story identified by the 'pk' parameter.
+        The view of an authenticated user is buffered and written by the flush_views task.
         It can be accessed via the URL /stories/{pk}/expired_stories/.
         """
         story = self.get_object()
         if story.is_expired:
             return Response({"detail": "This story is expired."}, status=400)
-        StoryView.objects.create(story=story, user=request.user)
+        if request.user.is_authenticated:
+            record_view('story', story.id, request.user.id)
         return Response({"image": story.image.url}, status=200)
 
     @action(detail=False, methods=['get'], url_path='expired_stories')
@@ -180,6 +314,7 @@ class StoryLikeViewSet(ModelViewSet):
     serializer_class = StoryLikeSerializer
     pagination_class = CursorSetPagination
     ordering = ['-created_at']
+    ordering_fields = ['created_at']
 
     def get_queryset(self):
         content_id = self.request.query_params.get('id')
@@ -210,6 +345,7 @@ class LikeViewSet(ModelViewSet):
     serializer_class = LikeSerializer
     pagination_class = CursorSetPagination
     ordering = ['-created_at']
+    ordering_fields = ['created_at']
 
     def get_queryset(self):
         content_id = self.request.query_params.get('id')
@@ -253,6 +389,7 @@ class CommentViewSet(ModelViewSet):
     pagination_class = CursorSetPagination
 
     ordering = ['-created_at']
+    ordering_fields = ['created_at']
 
     def get_queryset(self):
         post_id = self.request.query_params.get('post_id')
@@ -293,3 +430,85 @@ class CommentViewSet(ModelViewSet):
         else:
             self.permission_classes = [AllowAny]
         return super().get_permissions()
+
+
+class HashtagViewSet(ReadOnlyModelViewSet):
+    """
+    ViewSet for browsing hashtags.
+    The trending action returns the hashtags used the most recently, read from the trending engine.
+    The autocomplete action completes a typed prefix from the typeahead index.
+    """
+    queryset = Hashtag.objects.all()
+    serializer_class = HashtagSerializer
+    pagination_class = CursorSetPagination
+    permission_classes = [AllowAny]
+
+    ordering = ['name']
+    ordering_fields = ['name']
+
+    @action(detail=False, methods=['get'], url_path='trending')
+    def trending(self, request, *args, **kwargs):
+        """
+        Custom action to retrieve the trending hashtags.
+        It can be accessed via the URL /hashtags/trending/?limit=10, the limit is capped at 100.
+        """
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 100)
+        except ValueError:
+            return Response({"limit": "A valid integer is required."}, status=400)
+
+        serializer = TrendingHashtagSerializer(
+            [{"name": name, "score": score} for name, score in trending.top(limit)], many=True
+        )
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'], url_path='autocomplete')
+    def autocomplete(self, request, *args, **kwargs):
+        """
+        Custom action to complete a hashtag while it is typed, most used hashtags first.
+        It can be accessed via the URL /hashtags/autocomplete/?q=dja&limit=10.
+        """
+        return typeahead.autocomplete_response(typeahead.HASHTAG_INDEX, request)
+
+
+class UploadViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, GenericViewSet):
+    """
+    ViewSet for chunked, resumable image uploads.
+    An upload is started with POST /uploads/ and its filename and size, then its bytes are sent with
+    PUT /uploads/{pk}/ requests carrying a Content-Range header, in order and at most chunk_size bytes each.
+    GET /uploads/{pk}/ returns the received offset a client resumes from after a lost connection, and
+    POST /uploads/{pk}/complete/ verifies the image. The upload id is then sent as upload_id to create a post
+    or a story, so no request holds a worker for the whole file.
+    Users only see their own uploads.
+    """
+    serializer_class = UploadSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Upload.objects.filter(owner=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(owner=self.request.user)
+
+    def update(self, request, *args, **kwargs):
+        """
+        Append a chunk to the upload, the request body is the raw bytes of the chunk.
+        Concurrent chunks of an upload are serialized by a lock on its row.
+        """
+        with transaction.atomic():
+            upload = get_object_or_404(self.get_queryset().select_for_update(), pk=kwargs['pk'])
+            start, end = parse_content_range(request.headers.get('Content-Range'), upload)
+            write_chunk(upload, request.stream, start, end)
+        return Response(self.get_serializer(upload).data)
+
+    @action(detail=True, methods=['post'], url_path='complete')
+    def complete(self, request, *args, **kwargs):
+        """
+        Custom action to finish an upload once every chunk is received.
+        It can be accessed via the URL /uploads/{pk}/complete/.
+        The file is verified to be an image before it can be used by a post or story.
+        """
+        with transaction.atomic():
+            upload = get_object_or_404(self.get_queryset().select_for_update(), pk=kwargs['pk'])
+            complete_upload(upload)
+        return Response(self.get_serializer(upload).data)
@@ -0,0 +1,93 @@
+import random
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import BaseCommand
+from django.db import connection
+from django.db.models import Q
+
+from user.models import User
+from user.utils.discovery import USER_SEARCH_FIELDS, discover_users
+from utils.trigram import has_trigram_extension, similarity, trigram_filter
+
+BENCHMARK_PREFIX = "bench_"
+BATCH_SIZE = 10000
+SYLLABLES = ['an', 'ba', 'ce', 'di', 'el', 'fo', 'ga', 'hi', 'jo', 'ka', 'li', 'ma', 'ne', 'ol', 'pa', 'ri', 'sa',
+             'te', 'un', 'vi', 'wa', 'ya', 'zo']
+
+
+def random_name(rng):
+    return ''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4)))
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    return {p: latencies[min(int(len(latencies) * p / 100), len(latencies) - 1)] for p in (50, 95, 99)}
+
+
+class Command(BaseCommand):
+    """
+    Command to measure the user search latency on a seeded user table.
+    It inserts synthetic users, times the plain icontains scan the follow viewsets used to run against the
+    trigram search and the discovery ranking, prints the latency percentiles and deletes the seeded users.
+    Usage:
+        python manage.py benchmark_user_search --users 1000000 --queries 200
+    """
+    help = 'Benchmark the user search'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000000, help='Number of seeded users')
+        parser.add_argument('--queries', type=int, default=200, help='Number of timed searches per strategy')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded users afterwards')
+
+    def handle(self, *args, **kwargs):
+        rng = random.Random(kwargs['seed'])
+        self.stdout.write(f"pg_trgm installed: {has_trigram_extension()}")
+
+        self.stdout.write(f"Seeding {kwargs['users']} users")
+        started = time.perf_counter()
+        batch = []
+        for i in range(kwargs['users']):
+            username = f"{BENCHMARK_PREFIX}{random_name(rng)}{i}"
+            batch.append(User(username=username, email=f"{username}@example.com", password='!',
+                              full_name=f"{random_name(rng).title()} {random_name(rng).title()}"))
+            if len(batch) == BATCH_SIZE:
+                User.objects.bulk_create(batch)
+                batch = []
+        User.objects.bulk_create(batch)
+        self.stdout.write(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+        # Searches are a fragment of a name, with a typo one time out of four.
+        searches = []
+        for _ in range(kwargs['queries']):
+            text = random_name(rng)
+            if rng.random() < 0.25:
+                text = text[:-1] + rng.choice('aeiou')
+            searches.append(text)
+
+        strategies = {
+            'icontains': lambda text: list(User.objects.filter(
+                Q(username__icontains=text) | Q(full_name__icontains=text))[:20]),
+            'trigram': lambda text: list(trigram_filter(User.objects.all(), [text], USER_SEARCH_FIELDS).annotate(
+                similarity=similarity(text, USER_SEARCH_FIELDS)).order_by('-similarity')[:20]),
+            'discover': lambda text: discover_users(AnonymousUser(), text, 20),
+        }
+
+        try:
+            for name, search in strategies.items():
+                latencies = []
+                for text in searches:
+                    started = time.perf_counter()
+                    search(text)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                self.stdout.write(f"{name}: " + ', '.join(
+                    f"p{p} {value:.2f} ms" for p, value in percentiles(latencies).items()))
+        finally:
+            if not kwargs['keep']:
+                # The seeded users have no related rows, a plain DELETE avoids loading them for the signals.
+                with connection.cursor() as cursor:
+                    cursor.execute(f"DELETE FROM {User._meta.db_table} WHERE username LIKE %s",
+                                   [f"{BENCHMARK_PREFIX}%"])
+
+        self.stdout.write(self.style.SUCCESS('Benchmark finished'))
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-17 06:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_picture_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['created_at', 'id'], name='follow_created_at_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='followrequest',
+            index=models.Index(fields=['created_at', 'id'], name='follow_request_created_idx'),
+        ),
+    ]
@@ -1,7 +1,9 @@
 import uuid
 
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Upper
 
 
 class PrivacyChoice(models.TextChoices):
@@ -14,6 +16,7 @@ class User(AbstractUser):
     full_name = models.CharField(max_length=255, blank=True, null=True, db_index=True)
     bio = models.TextField(blank=True, null=True)
     profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True, null=True)
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False)
     email_verified = models.BooleanField(default=False)
     email = models.EmailField(unique=True, db_index=True)
     privacy_choice = models.CharField(
@@ -22,6 +25,14 @@ class User(AbstractUser):
         default=PrivacyChoice.PUBLIC
     )
 
+    class Meta(AbstractUser.Meta):
+        # Trigram indexes on UPPER(field), they answer both the `%term%` LIKE scans of icontains and the fuzzy
+        # `%>` word similarity operator of the user search.
+        indexes = [
+            GinIndex(OpClass(Upper('username'), name='gin_trgm_ops'), name='user_username_trgm_idx'),
+            GinIndex(OpClass(Upper('full_name'), name='gin_trgm_ops'), name='user_full_name_trgm_idx'),
+        ]
+
     def __str__(self):
         return self.username + " " + self.privacy_choice
 
@@ -35,6 +46,12 @@ class Follow(models.Model):
     class Meta:
         unique_together = ('follower', 'following')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='follow_created_at_id_idx'),
+            # The following and follower lists are filtered on one side of the follow and paged by creation time.
+            models.Index(fields=['follower', 'created_at', 'id'], name='follow_follower_created_idx'),
+            models.Index(fields=['following', 'created_at', 'id'], name='follow_following_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.follower} follows {self.following}"
@@ -50,3 +67,6 @@ class FollowRequest(models.Model):
 
     class Meta:
         unique_together = ('sender', 'receiver')
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='follow_request_created_idx'),
+        ]
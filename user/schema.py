@@ -6,8 +6,10 @@ from graphene_django import DjangoObjectType
 from graphene_django.filter import DjangoFilterConnectionField
 from graphql_relay import from_global_id
 
+from post.loaders import get_loaders
 from post.schema import UserType, PostType
 from post.models import Post
+from post.utils.moderation import visible_filter
 from user.models import User
 
 
@@ -24,16 +26,20 @@ class UserDetailType(DjangoObjectType):
         fields = ("id", "username", "profile_picture", "full_name", "bio")
 
     def resolve_followers_count(self, info):
-        return self.followers.count()
+        return get_loaders(info).user_counts.load(self.id)['followers']
 
     def resolve_following_count(self, info):
-        return self.following.count()
+        return get_loaders(info).user_counts.load(self.id)['following']
 
     def resolve_post_count(self, info):
-        return self.posts.count()
+        return get_loaders(info).user_counts.load(self.id)['posts']
 
     def resolve_posts(self, info):
-        return Post.objects.filter(author=self, is_deleted=False)
+        posts = list(Post.objects.filter(author=self, is_deleted=False).filter(visible_filter(info.context.user)))
+        loaders = get_loaders(info)
+        loaders.authors.put(self.id, self)
+        loaders.prime_posts(posts)
+        return posts
 
 
 class Follow(DjangoObjectType):
@@ -1,7 +1,9 @@
 from rest_framework import serializers
 
 from user.models import Follow, User, FollowRequest
+from user.utils.followees import invalidate_followees
 from post.utils.exception import FollowRequestSent
+from utils.images import ImageVariantsField, strip_metadata
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -15,13 +17,18 @@ class UserSerializer(serializers.ModelSerializer):
     The read-only fields include id, is_active, is_staff, and email_verified.
     """
     password = serializers.CharField(write_only=True)
+    profile_picture_variants = ImageVariantsField()
 
     class Meta:
         model = User
         fields = ('id', 'username', 'email', 'full_name', 'email_verified',
-                  'password', 'is_active', 'is_staff', 'privacy_choice', 'bio', 'profile_picture')
+                  'password', 'is_active', 'is_staff', 'privacy_choice', 'bio', 'profile_picture',
+                  'profile_picture_variants')
         read_only_fields = ('id', 'is_active', 'is_staff', 'email_verified')
 
+    def validate_profile_picture(self, value):
+        return strip_metadata(value) if value else value
+
     def create(self, validated_data):
         user = User(**validated_data)
         user.set_password(validated_data['password'])
@@ -31,11 +38,17 @@ class UserSerializer(serializers.ModelSerializer):
 
 
 class UserUpdateSerializer(serializers.ModelSerializer):
+    profile_picture_variants = ImageVariantsField()
+
     class Meta:
         model = User
-        fields = ('id', 'username', 'email', 'full_name', 'bio', 'email_verified', 'profile_picture', 'privacy_choice')
+        fields = ('id', 'username', 'email', 'full_name', 'bio', 'email_verified', 'profile_picture',
+                  'profile_picture_variants', 'privacy_choice')
         read_only_fields = ('id', 'email_verified')
 
+    def validate_profile_picture(self, value):
+        return strip_metadata(value) if value else value
+
 
 class UserPasswordSerializer(serializers.ModelSerializer):
     class Meta:
@@ -71,9 +84,11 @@ class SimpleUserSerializer(serializers.ModelSerializer):
     This serializer is used to represent basic user information such as id, username, and profile picture.
     It is used in nested serializers where only basic user information is needed.
     """
+    profile_picture_variants = ImageVariantsField()
+
     class Meta:
         model = User
-        fields = ('id', 'username', 'profile_picture')
+        fields = ('id', 'username', 'profile_picture', 'profile_picture_variants')
 
 
 class FollowingSerializer(serializers.ModelSerializer):
@@ -186,5 +201,17 @@ class FollowRequestSerializer(serializers.ModelSerializer):
                     follower=instance.sender,
                     following=instance.receiver
                 )
+                invalidate_followees(instance.sender_id)
             return instance
         raise serializers.ValidationError("Is approved or is rejected field is required for update.")
+
+
+class SuggestionSerializer(serializers.Serializer):
+    """
+    Serializer for a user found by the discovery search, with the follow graph signals used to rank it.
+    """
+    user = SimpleUserSerializer(read_only=True)
+    score = serializers.FloatField()
+    mutual_followers = serializers.IntegerField()
+    is_following = serializers.BooleanField()
+    follows_you = serializers.BooleanField()
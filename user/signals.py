@@ -2,7 +2,14 @@ from django.db.models import signals
 from django.dispatch import receiver
 
 from notification.tasks import create_notification
-from user.models import Follow, FollowRequest
+from post.utils import timeline
+from post.utils import response_cache
+from user.models import Follow, FollowRequest, User
+from user.tasks import generate_profile_picture_variants
+from user.utils.discovery import username_completions
+from user.utils.followees import invalidate_followees
+from utils import typeahead
+from utils.images import needs_variants
 
 
 @receiver(signals.post_save, sender=Follow)
@@ -12,6 +19,77 @@ def send_followed_notification(sender, instance, created, **kwargs):
                                   "Follow Notification")
 
 
+@receiver(signals.post_save, sender=Follow)
+def add_followed_posts(sender, instance, created, **kwargs):
+    if created:
+        invalidate_followees(instance.follower_id)
+        timeline.add_author_posts(instance.follower_id, instance.following_id)
+
+
+@receiver(signals.post_delete, sender=Follow)
+def remove_unfollowed_posts(sender, instance, **kwargs):
+    invalidate_followees(instance.follower_id)
+    timeline.remove_author_posts(instance.follower_id, instance.following_id)
+
+
+@receiver(signals.post_save, sender=Follow)
+def rank_followed_username(sender, instance, created, **kwargs):
+    if created and instance.following_id:
+        typeahead.update(typeahead.USER_INDEX, {instance.following.username: 1})
+
+
+@receiver(signals.post_delete, sender=Follow)
+def rank_unfollowed_username(sender, instance, **kwargs):
+    following = User.objects.filter(pk=instance.following_id).values_list('username', flat=True).first()
+    if following:
+        typeahead.update(typeahead.USER_INDEX, {following: -1})
+
+
+@receiver(signals.pre_save, sender=User)
+def detect_profile_changes(sender, instance, update_fields=None, **kwargs):
+    instance._privacy_changed = False
+    instance._previous_username = None
+    if instance._state.adding or (update_fields and not {'privacy_choice', 'username'} & set(update_fields)):
+        return
+
+    previous = User.objects.filter(pk=instance.pk).values_list('privacy_choice', 'username').first()
+    if previous is not None:
+        instance._privacy_changed = previous[0] != instance.privacy_choice
+        if previous[1] != instance.username:
+            instance._previous_username = previous[1]
+
+
+@receiver(signals.post_save, sender=User)
+def index_username(sender, instance, created, **kwargs):
+    if created:
+        typeahead.update(typeahead.USER_INDEX, {instance.username: 0}, mode='set')
+    elif getattr(instance, '_previous_username', None):
+        typeahead.remove(typeahead.USER_INDEX, instance._previous_username, source=username_completions)
+        followers = Follow.objects.filter(following=instance).count()
+        typeahead.update(typeahead.USER_INDEX, {instance.username: followers}, mode='set')
+
+
+@receiver(signals.post_delete, sender=User)
+def remove_username(sender, instance, **kwargs):
+    typeahead.remove(typeahead.USER_INDEX, instance.username, source=username_completions)
+
+
+@receiver(signals.post_save, sender=User)
+def invalidate_author_responses(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+
+    response_cache.bump_author(instance.id)
+    if getattr(instance, '_privacy_changed', False):
+        response_cache.bump_privacy()
+
+
+@receiver(signals.post_save, sender=User)
+def queue_profile_picture_variants(sender, instance, **kwargs):
+    if needs_variants(instance.profile_picture, instance.profile_picture_variants):
+        generate_profile_picture_variants.delay(str(instance.id))
+
+
 @receiver(signals.post_save, sender=FollowRequest)
 def send_follow_request_notification(sender, instance, created, **kwargs):
     if created:
@@ -0,0 +1,21 @@
+from celery import shared_task
+
+from post.utils import response_cache
+from user.models import User
+from utils.images import generate_variants
+
+
+@shared_task
+def generate_profile_picture_variants(user_id):
+    """
+    Task to resize and re-encode the profile picture of a user into its variants.
+    It is queued from the user post_save signal whenever the profile picture changes.
+    :param user_id:
+    :return: the stored variants
+    """
+    user = User.objects.filter(id=user_id).first()
+    if not user:
+        return None
+    variants = generate_variants(user, 'profile_picture', 'profile_picture_variants')
+    response_cache.bump_author(user.id)
+    return variants
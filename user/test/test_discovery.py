@@ -0,0 +1,86 @@
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from user.models import Follow, User
+from utils.trigram import has_trigram_extension
+
+
+def make_user(username, full_name=''):
+    return User.objects.create_user(username=username, password='test_password', full_name=full_name,
+                                    email=f'{username}@gmail.com', is_active=True)
+
+
+@pytest.fixture()
+def viewer():
+    return make_user('viewer')
+
+
+@pytest.fixture()
+def viewer_client(viewer):
+    client = APIClient()
+    client.force_authenticate(viewer)
+    return client
+
+
+@pytest.mark.django_db
+def test_following_search_matches_substrings(viewer, viewer_client):
+    for username, full_name in [('alice', 'Alice Martin'), ('bob', 'Robert Alison'), ('carol', 'Carol King')]:
+        Follow.objects.create(follower=viewer, following=make_user(username, full_name))
+
+    results = viewer_client.get(reverse('followings-list'), {'search': 'ALI'}).json()['results']
+
+    assert sorted(result['username'] for result in results) == ['alice', 'bob']
+
+
+@pytest.mark.django_db
+def test_discover_boosts_the_follow_graph(viewer, viewer_client):
+    friend = make_user('friend')
+    followed = make_user('sam_followed')
+    mutual = make_user('sam_mutual')
+    make_user('sam_stranger')
+    Follow.objects.create(follower=viewer, following=friend)
+    Follow.objects.create(follower=viewer, following=followed)
+    Follow.objects.create(follower=friend, following=mutual)
+
+    results = viewer_client.get(reverse('users-discover'), {'q': 'sam'}).json()
+
+    assert [result['user']['username'] for result in results] == ['sam_followed', 'sam_mutual', 'sam_stranger']
+    assert results[0]['is_following'] and results[1]['mutual_followers'] == 1
+    assert 'email' not in results[0]['user']
+
+
+@pytest.mark.django_db
+def test_discover_suggests_friends_of_friends(viewer, viewer_client):
+    friend = make_user('friend')
+    already_followed = make_user('already')
+    suggested = make_user('suggested')
+    Follow.objects.create(follower=viewer, following=friend)
+    Follow.objects.create(follower=viewer, following=already_followed)
+    Follow.objects.create(follower=friend, following=suggested)
+    Follow.objects.create(follower=friend, following=already_followed)
+
+    results = viewer_client.get(reverse('users-discover')).json()
+
+    assert [result['user']['username'] for result in results] == ['suggested']
+    assert APIClient().get(reverse('users-discover')).json() == []
+
+
+@pytest.mark.django_db
+def test_discover_matches_typos():
+    if not has_trigram_extension():
+        pytest.skip('pg_trgm is not available on this database server')
+
+    make_user('jonathan', 'Jonathan Smith')
+
+    results = APIClient().get(reverse('users-discover'), {'q': 'jonahtan'}).json()
+
+    assert [result['user']['username'] for result in results] == ['jonathan']
+
+
+@pytest.mark.django_db
+def test_benchmark_command_cleans_up():
+    call_command('benchmark_user_search', users=200, queries=5)
+
+    assert not User.objects.filter(username__startswith='bench_').exists()
@@ -0,0 +1,37 @@
+import pytest
+
+from user.models import Follow, FollowRequest, User, PrivacyChoice
+from user.serializers import FollowRequestSerializer
+from user.utils.followees import get_followee_ids, get_followees_version, is_following
+
+
+@pytest.fixture()
+def author():
+    return User.objects.create(username="author", email="author@gmail.com", privacy_choice=PrivacyChoice.PRIVATE)
+
+
+@pytest.mark.django_db
+def test_followees_are_cached_until_follow_changes(active_created_user, author, django_assert_num_queries):
+    assert get_followee_ids(active_created_user.id) == []
+    with django_assert_num_queries(0):
+        assert get_followee_ids(active_created_user.id) == []
+
+    version = get_followees_version(active_created_user.id)
+    Follow.objects.create(follower=active_created_user, following=author)
+    assert get_followees_version(active_created_user.id) == version + 1
+    assert get_followee_ids(active_created_user.id) == [str(author.id)]
+    assert is_following(active_created_user.id, author.id)
+
+    Follow.objects.filter(follower=active_created_user, following=author).delete()
+    assert not is_following(active_created_user.id, author.id)
+
+
+@pytest.mark.django_db
+def test_follow_request_approval_refreshes_followees(active_created_user, author):
+    assert get_followee_ids(active_created_user.id) == []
+    follow_request = FollowRequest.objects.create(sender=active_created_user, receiver=author)
+
+    serializer = FollowRequestSerializer(follow_request, data={"is_approved": True}, partial=True)
+    assert serializer.is_valid()
+    serializer.save()
+    assert get_followee_ids(active_created_user.id) == [str(author.id)]
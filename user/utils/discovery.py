@@ -0,0 +1,98 @@
+from dataclasses import dataclass
+
+from django.db.models import Count, Value, FloatField
+
+from user.models import Follow, User
+from user.utils.followees import get_followee_ids
+from utils.trigram import similarity, trigram_filter
+
+USER_SEARCH_FIELDS = ('username', 'full_name')
+DISCOVER_CANDIDATES = 200
+
+# Boosts added to the text similarity (0 to 1) of a candidate, by its distance in the viewer's follow graph.
+FOLLOWING_BOOST = 0.5
+FOLLOWER_BOOST = 0.3
+MUTUAL_BOOST = 0.4
+MUTUAL_CAP = 5
+
+
+@dataclass
+class Suggestion:
+    user: User
+    score: float
+    mutual_followers: int = 0
+    is_following: bool = False
+    follows_you: bool = False
+
+
+def get_candidates(viewer, text):
+    """
+    Preselect the users to rank, ordered by text similarity when a query is given and by the number of
+    followees of the viewer following them otherwise.
+    :param viewer:
+    :param text:
+    :return:
+    """
+    queryset = User.objects.filter(is_active=True)
+    if viewer.is_authenticated:
+        queryset = queryset.exclude(pk=viewer.pk)
+
+    terms = text.split()
+    if terms:
+        return list(trigram_filter(queryset, terms, USER_SEARCH_FIELDS).annotate(
+            similarity=similarity(text, USER_SEARCH_FIELDS)
+        ).order_by('-similarity', 'username')[:DISCOVER_CANDIDATES])
+
+    if not viewer.is_authenticated:
+        return []
+
+    followees = get_followee_ids(viewer.id)
+    return list(queryset.filter(followers__follower_id__in=followees).exclude(pk__in=followees).annotate(
+        similarity=Value(0.0, output_field=FloatField()), mutual=Count('followers')
+    ).order_by('-mutual', 'username')[:DISCOVER_CANDIDATES])
+
+
+def discover_users(viewer, text='', limit=20):
+    """
+    Find users matching the text, or suggest users followed by the viewer's followees when there is no text.
+    For an authenticated viewer, candidates close in the follow graph are ranked higher: users the viewer follows,
+    users following the viewer, and users followed by many of the viewer's followees.
+    :param viewer:
+    :param text:
+    :param limit:
+    :return: a list of Suggestion, best first
+    """
+    candidates = get_candidates(viewer, text.strip())
+    if not viewer.is_authenticated or not candidates:
+        return [Suggestion(user, user.similarity) for user in candidates[:limit]]
+
+    ids = [user.pk for user in candidates]
+    followees = set(get_followee_ids(viewer.id))
+    mutual = dict(Follow.objects.filter(follower_id__in=followees, following_id__in=ids).order_by().values(
+        'following_id').annotate(total=Count('id')).values_list('following_id', 'total'))
+    followers = set(Follow.objects.filter(following=viewer, follower_id__in=ids).values_list('follower_id', flat=True))
+
+    suggestions = []
+    for user in candidates:
+        is_following = str(user.pk) in followees
+        follows_you = user.pk in followers
+        mutual_followers = mutual.get(user.pk, 0)
+        score = (user.similarity
+                 + FOLLOWING_BOOST * is_following
+                 + FOLLOWER_BOOST * follows_you
+                 + MUTUAL_BOOST * min(mutual_followers, MUTUAL_CAP) / MUTUAL_CAP)
+        suggestions.append(Suggestion(user, score, mutual_followers, is_following, follows_you))
+
+    suggestions.sort(key=lambda suggestion: (-suggestion.score, suggestion.user.username))
+    return suggestions[:limit]
+
+
+def username_completions(prefix, limit):
+    """
+    Typeahead source of the usernames starting with a prefix, ranked by their number of followers.
+    :param prefix:
+    :param limit:
+    :return: (username, followers) pairs
+    """
+    return User.objects.filter(username__istartswith=prefix).annotate(total=Count('followers')).order_by(
+        '-total', 'username').values_list('username', 'total')[:limit]
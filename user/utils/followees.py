@@ -0,0 +1,82 @@
+from alx_project_nexus.settings import FOLLOWEE_CACHE_TTL
+from user.models import Follow
+from utils.redis_client import redis_client
+
+FOLLOWEES_KEY = "followees:{user_id}"
+FOLLOWEES_VERSION_KEY = "followees:{user_id}:version"
+
+# Redis drops empty sets, so a marker member keeps "follows nobody" cached as well.
+EMPTY_MARKER = "-"
+
+
+def followees_key(user_id):
+    return FOLLOWEES_KEY.format(user_id=user_id)
+
+
+def followees_version_key(user_id):
+    return FOLLOWEES_VERSION_KEY.format(user_id=user_id)
+
+
+def load_followees(user_id):
+    """
+    Load the ids of the users a user follows from the database into the Redis set.
+    :param user_id:
+    :return: the followee ids as strings
+    """
+    followee_ids = [str(followee_id) for followee_id in
+                    Follow.objects.filter(follower_id=user_id).values_list('following_id', flat=True)]
+
+    key = followees_key(user_id)
+    pipe = redis_client.pipeline()
+    pipe.delete(key)
+    pipe.sadd(key, EMPTY_MARKER, *followee_ids)
+    pipe.expire(key, FOLLOWEE_CACHE_TTL)
+    pipe.execute()
+    return followee_ids
+
+
+def get_followee_ids(user_id):
+    """
+    Get the ids of the users a user follows.
+    The set is cached per user in Redis and invalidated by the follow signals, so visibility filters can use
+    a literal id list instead of rebuilding the followers subquery on every request.
+    :param user_id:
+    :return: the followee ids as strings
+    """
+    members = redis_client.smembers(followees_key(user_id))
+    if not members:
+        return load_followees(user_id)
+    return [member.decode() for member in members if member.decode() != EMPTY_MARKER]
+
+
+def is_following(user_id, author_id):
+    """
+    Check if a user follows an author using the cached followee set.
+    :param user_id:
+    :param author_id:
+    :return:
+    """
+    if not redis_client.exists(followees_key(user_id)):
+        return str(author_id) in load_followees(user_id)
+    return bool(redis_client.sismember(followees_key(user_id), str(author_id)))
+
+
+def get_followees_version(user_id):
+    """
+    Get the version stamp of a user's followee set, it is bumped on every invalidation.
+    :param user_id:
+    :return:
+    """
+    return int(redis_client.get(followees_version_key(user_id)) or 0)
+
+
+def invalidate_followees(user_id):
+    """
+    Drop the cached followee set of a user and bump its version stamp.
+    :param user_id:
+    :return:
+    """
+    pipe = redis_client.pipeline()
+    pipe.delete(followees_key(user_id))
+    pipe.incr(followees_version_key(user_id))
+    pipe.execute()
@@ -15,10 +15,12 @@ from rest_framework.viewsets import ModelViewSet
 from notification.email_services import send_email_service
 from user.models import Follow, User, FollowRequest
 from user.serializers import FollowingSerializer, UserSerializer, UserPasswordSerializer, UserUpdateSerializer, \
-    UserEmailSerializer, FollowingListSerializer, FollowerListSerializer, FollowRequestSerializer
+    UserEmailSerializer, FollowingListSerializer, FollowerListSerializer, FollowRequestSerializer, SuggestionSerializer
+from user.utils.discovery import discover_users
 from user.utils.generate_links import generate_password_reset_link, generate_email_confirmation_link
 from user.utils.location import get_client_ip, parse_user_agent
 from post.utils.permission import IsSenderOrReceiver
+from utils import typeahead
 from utils.redis_client import redis_client
 
 
@@ -32,6 +34,7 @@ class UserViewSet(ModelViewSet):
     serializer_class = UserSerializer
     pagination_class = CursorSetPagination
     ordering = ['username']
+    ordering_fields = ['username']
 
     def get_queryset(self):
         user = self.request.user
@@ -42,7 +45,7 @@ class UserViewSet(ModelViewSet):
         return User.objects.all()
 
     def get_permissions(self):
-        if self.action in ['create']:
+        if self.action in ['create', 'autocomplete', 'discover']:
             return [AllowAny()]
         return [IsAuthenticated()]
 
@@ -85,6 +88,30 @@ class UserViewSet(ModelViewSet):
             raise ValidationError("Authentication credentials were not provided.")
         return Response(UserSerializer(user).data, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['get'], url_path='autocomplete')
+    def autocomplete(self, request, *args, **kwargs):
+        """
+        Complete a username while it is typed, most followed users first.
+        It can be accessed via the URL /users/autocomplete/?q=jo&limit=10.
+        """
+        return typeahead.autocomplete_response(typeahead.USER_INDEX, request)
+
+    @action(detail=False, methods=['get'], url_path='discover')
+    def discover(self, request, *args, **kwargs):
+        """
+        Search users by username and full name, typos included.
+        It can be accessed via the URL /users/discover/?q=jonh&limit=20.
+        Authenticated users get people close to them in the follow graph first, and suggestions from the
+        accounts they follow when no query is given.
+        """
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            return Response({"limit": "A valid integer is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        suggestions = discover_users(request.user, request.query_params.get('q', ''), limit)
+        return Response(SuggestionSerializer(suggestions, many=True).data)
+
     @action(detail=False, methods=['put', 'patch'], url_path='update-password')
     def update_password(self, request, *args, **kwargs):
         user = request.user
@@ -311,7 +338,8 @@ class FollowingViewSet(ModelViewSet):
     permission_classes = [IsAuthenticated]
     search_fields = ['following__username', 'following__full_name']
     pagination_class = CursorSetPagination
-    ordering = ['following__username']
+    ordering = ['-created_at']
+    ordering_fields = ['created_at']
 
     def get_queryset(self):
         user_id = self.request.query_params.get('user_id')
@@ -340,7 +368,8 @@ class FollowerViewSet(ModelViewSet):
     search_fields = ['follower__username', 'follower__full_name']
     pagination_class = CursorSetPagination
 
-    ordering = ['follower__username']
+    ordering = ['-created_at']
+    ordering_fields = ['created_at']
 
     def get_queryset(self):
         user_id = self.request.query_params.get('user_id')
@@ -361,6 +390,7 @@ class FollowRequestViewSet(ModelViewSet):
     pagination_class = CursorSetPagination
 
     ordering = ['-created_at']
+    ordering_fields = ['created_at']
 
     def get_queryset(self):
         return FollowRequest.objects.filter(Q(receiver=self.request.user) | Q(sender=self.request.user))
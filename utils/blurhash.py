@@ -0,0 +1,80 @@
+import math
+
+BASE83 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+
+# Number of horizontal and vertical cosine components, 4x3 fits most feed images in 28 characters.
+X_COMPONENTS = 4
+Y_COMPONENTS = 3
+# The hash only holds low frequencies, so it is computed on a thumbnail of at most this many pixels a side.
+SAMPLE_SIZE = 32
+
+
+def encode83(value, length):
+    return "".join(BASE83[(value // 83 ** (length - i)) % 83] for i in range(1, length + 1))
+
+
+def srgb_to_linear(value):
+    value = value / 255
+    return value / 12.92 if value <= 0.04045 else ((value + 0.055) / 1.055) ** 2.4
+
+
+def linear_to_srgb(value):
+    value = max(0.0, min(1.0, value))
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def sign_pow(value, exponent):
+    return math.copysign(abs(value) ** exponent, value)
+
+
+def encode(image, x_components=X_COMPONENTS, y_components=Y_COMPONENTS):
+    """
+    Encode an image as a BlurHash (https://blurha.sh), a short string clients decode into a blurred
+    placeholder while the image downloads.
+    :param image: a Pillow image
+    :param x_components:
+    :param y_components:
+    :return: the BlurHash string
+    """
+    image = image.convert("RGB")
+    image.thumbnail((SAMPLE_SIZE, SAMPLE_SIZE))
+    width, height = image.size
+    data = image.tobytes()
+    pixels = [tuple(srgb_to_linear(channel) for channel in data[i:i + 3]) for i in range(0, len(data), 3)]
+
+    x_cosines = [[math.cos(math.pi * i * x / width) for x in range(width)] for i in range(x_components)]
+    y_cosines = [[math.cos(math.pi * j * y / height) for y in range(height)] for j in range(y_components)]
+
+    factors = []
+    for j in range(y_components):
+        for i in range(x_components):
+            scale = (1 if i == j == 0 else 2) / (width * height)
+            r = g = b = 0.0
+            for y in range(height):
+                for x in range(width):
+                    basis = x_cosines[i][x] * y_cosines[j][y]
+                    pixel = pixels[y * width + x]
+                    r += basis * pixel[0]
+                    g += basis * pixel[1]
+                    b += basis * pixel[2]
+            factors.append((r * scale, g * scale, b * scale))
+
+    dc, ac = factors[0], factors[1:]
+    blurhash = encode83((x_components - 1) + (y_components - 1) * 9, 1)
+
+    if ac:
+        actual_max = max(abs(channel) for factor in ac for channel in factor)
+        quantised_max = max(0, min(82, int(actual_max * 166 - 0.5)))
+        maximum = (quantised_max + 1) / 166
+    else:
+        quantised_max = 0
+        maximum = 1
+    blurhash += encode83(quantised_max, 1)
+
+    blurhash += encode83((linear_to_srgb(dc[0]) << 16) + (linear_to_srgb(dc[1]) << 8) + linear_to_srgb(dc[2]), 4)
+    for factor in ac:
+        r, g, b = (max(0, min(18, math.floor(sign_pow(channel / maximum, 0.5) * 9 + 9.5))) for channel in factor)
+        blurhash += encode83(r * 19 * 19 + g * 19 + b, 2)
+    return blurhash
@@ -0,0 +1,174 @@
+import hashlib
+import os
+from io import BytesIO
+
+from PIL import ExifTags, Image, ImageOps, features
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from rest_framework import serializers
+
+from alx_project_nexus.settings import IMAGE_VARIANT_SIZES, IMAGE_VARIANT_FORMATS, IMAGE_VARIANT_QUALITY
+from utils import blurhash
+
+VARIANT_NAME = "{directory}/variants/{digest}_{size}.{extension}"
+EXTENSIONS = {"jpeg": "jpg", "webp": "webp", "avif": "avif"}
+# Formats an original is stored in after its metadata is stripped, other formats are stored as PNG.
+ORIGINAL_FORMATS = {"JPEG", "PNG", "WEBP", "GIF"}
+ORIGINAL_QUALITY = 95
+
+
+def supported_formats():
+    """
+    Formats of IMAGE_VARIANT_FORMATS that the installed Pillow can encode, JPEG always is.
+    :return:
+    """
+    return [fmt for fmt in IMAGE_VARIANT_FORMATS if fmt == "jpeg" or features.check(fmt)]
+
+
+def needs_variants(file, variants):
+    """
+    Whether the variants were not generated from the current file, e.g. after an upload or a replacement.
+    :param file: an ImageField file
+    :param variants: the stored variants
+    :return:
+    """
+    return (file.name or "") != (variants or {}).get("source", "")
+
+
+def strip_metadata(file):
+    """
+    Re-encode an uploaded image without its metadata, so the stored original leaks no location or camera data
+    either. The EXIF orientation is applied to the pixels and the ICC profile is kept.
+    An upright JPEG keeps its quantization tables and is not degraded, an animated GIF keeps its frames.
+    :param file: a Django File, e.g. an uploaded file
+    :return: a ContentFile of the cleaned image, named like the upload
+    """
+    file.seek(0)
+    buffer = BytesIO()
+    with Image.open(file) as original:
+        # Phones store MPO files, a JPEG followed by depth or preview frames.
+        fmt = "JPEG" if original.format == "MPO" else original.format
+        # JPEG and GIF copy the comment of the source unless it is overridden.
+        options = {"icc_profile": original.info.get("icc_profile"), "comment": b""}
+        if fmt == "GIF":
+            original.save(buffer, format=fmt, save_all=True, comment=b"")
+        elif original.format == "JPEG" and original.getexif().get(ExifTags.Base.Orientation, 1) == 1:
+            original.save(buffer, format=fmt, quality="keep", subsampling="keep", **options)
+        else:
+            image = ImageOps.exif_transpose(original)
+            if fmt in ("JPEG", "WEBP"):
+                options["quality"] = ORIGINAL_QUALITY
+            image.save(buffer, format=fmt if fmt in ORIGINAL_FORMATS else "PNG", **options)
+    file.seek(0)
+    return ContentFile(buffer.getvalue(), name=os.path.basename(file.name or "image"))
+
+
+def encode(image, fmt):
+    buffer = BytesIO()
+    if fmt == "jpeg":
+        image.convert("RGB").save(buffer, format="JPEG", quality=IMAGE_VARIANT_QUALITY, optimize=True,
+                                  progressive=True)
+    else:
+        image.save(buffer, format=fmt.upper(), quality=IMAGE_VARIANT_QUALITY)
+    return buffer.getvalue()
+
+
+def build_variants(file):
+    """
+    Resize an uploaded image to every IMAGE_VARIANT_SIZES bound and encode each size in every supported format.
+    The EXIF orientation is applied to the pixels and every metadata is dropped, so variants leak no location
+    or camera data. Images are never upscaled.
+    Variants are named after the hash of the original, so a variant URL never changes content and can be cached
+    forever, and the formats of a size only differ by extension, which lets nginx pick one from the Accept header.
+    The BlurHash placeholder of the image is computed in the same pass.
+    :param file: an ImageField file
+    :return: the variants description,
+        {"source", "blurhash", "sizes": {size: {"width", "height", "formats": {format: name}}}}
+    """
+    with file.open("rb"):
+        data = file.read()
+    digest = hashlib.sha256(data).hexdigest()[:16]
+
+    with Image.open(BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        image = image.convert("RGBA" if has_alpha else "RGB")
+    image.info = {}
+
+    formats = supported_formats()
+    directory = os.path.dirname(file.name) or "images"
+    sizes = {}
+    for size, bound in IMAGE_VARIANT_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail((bound, bound), Image.Resampling.LANCZOS)
+        names = {}
+        for fmt in formats:
+            name = VARIANT_NAME.format(directory=directory, digest=digest, size=size, extension=EXTENSIONS[fmt])
+            if not default_storage.exists(name):
+                name = default_storage.save(name, ContentFile(encode(resized, fmt)))
+            names[fmt] = name
+        sizes[size] = {"width": resized.width, "height": resized.height, "formats": names}
+
+    return {"source": file.name, "blurhash": blurhash.encode(image), "sizes": sizes}
+
+
+def generate_variants(instance, field, variants_field, blurhash_field=None):
+    """
+    Build the variants of an image field and store them on the instance, with the BlurHash placeholder
+    of the image when the model has a field for it.
+    Files of the media store are shared by reposts, the variants of another row holding the same file are
+    reused instead of decoding the image again.
+    The row is only updated if it still holds the same image, a replacement queued its own generation.
+    The update bypasses the model signals, so storing the variants does not queue a new generation.
+    :param instance:
+    :param field: the name of the ImageField
+    :param variants_field: the name of the JSONField holding the variants
+    :param blurhash_field: the name of the field holding the placeholder, if any
+    :return: the stored variants
+    """
+    file = getattr(instance, field)
+    variants = {}
+    if file:
+        variants = type(instance).objects.filter(**{field: file.name}).exclude(pk=instance.pk).exclude(
+            **{variants_field: {}}).values_list(variants_field, flat=True).first() or build_variants(file)
+    values = {variants_field: variants}
+    if blurhash_field:
+        values[blurhash_field] = variants.get("blurhash", "")
+    type(instance).objects.filter(pk=instance.pk, **{field: file.name or ""}).update(**values)
+    for name, value in values.items():
+        setattr(instance, name, value)
+    return variants
+
+
+class ImageVariantsField(serializers.Field):
+    """
+    Read-only field exposing image variants as a srcset-style map:
+        {"sizes": {"thumb": {"width": 150, "height": 100, "jpeg": url, "webp": url}, ...},
+         "srcset": {"jpeg": "url 150w, url 640w, ...", "webp": ...}}
+    It is empty until the variants are generated, clients then fall back to the original image.
+    Behind nginx, the JPEG URL of a size is answered in AVIF or WebP when the Accept header allows it.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def url(self, name):
+        url = default_storage.url(name)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def to_representation(self, value):
+        if not value or not value.get("sizes"):
+            return {}
+
+        sizes = {}
+        srcset = {}
+        # jsonb does not keep the key order, srcset candidates are listed from the smallest.
+        for size, variant in sorted(value["sizes"].items(), key=lambda item: item[1]["width"]):
+            sizes[size] = {"width": variant["width"], "height": variant["height"]}
+            for fmt, name in variant["formats"].items():
+                url = self.url(name)
+                sizes[size][fmt] = url
+                srcset.setdefault(fmt, []).append(f"{url} {variant['width']}w")
+        return {"sizes": sizes, "srcset": {fmt: ", ".join(candidates) for fmt, candidates in srcset.items()}}
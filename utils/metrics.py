@@ -0,0 +1,77 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from utils.redis_client import redis_client
+
+METRICS_KEY = "metrics:{namespace}"
+
+
+def metrics_key(namespace):
+    return METRICS_KEY.format(namespace=namespace)
+
+
+def record(namespace, **fields):
+    """
+    Increment counters in a metrics namespace.
+    Each namespace is a Redis hash, so counters are shared by every web and Celery worker.
+    Usage:
+        record("feed", fanout_pushes=12, merge_ms=0.8)
+    :param namespace:
+    :param fields: counter names mapped to the amount to add
+    :return:
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    for field, amount in fields.items():
+        pipe.hincrbyfloat(metrics_key(namespace), field, amount)
+    pipe.execute()
+
+
+def set_values(namespace, **fields):
+    """
+    Overwrite gauges in a metrics namespace, e.g. the configuration value a counter should be read against.
+    :param namespace:
+    :param fields:
+    :return:
+    """
+    redis_client.hset(metrics_key(namespace), mapping=fields)
+
+
+def snapshot(namespace):
+    """
+    Read every counter of a metrics namespace.
+    :param namespace:
+    :return: a dict of counter names to float values
+    """
+    values = redis_client.hgetall(metrics_key(namespace))
+    return {field.decode(): float(value) for field, value in values.items()}
+
+
+def ratio(part, whole):
+    return round(part / whole, 4) if whole else 0.0
+
+
+def hit_ratios(values):
+    """
+    Derive a hit ratio for every `<name>_hits` / `<name>_misses` counter pair of a snapshot.
+    :param values:
+    :return: a dict of `<name>_hit_ratio` to the ratio
+    """
+    names = {field.rsplit('_', 1)[0] for field in values if field.endswith(('_hits', '_misses'))}
+    ratios = {}
+    for name in names:
+        hits = values.get(f"{name}_hits", 0.0)
+        ratios[f"{name}_hit_ratio"] = ratio(hits, hits + values.get(f"{name}_misses", 0.0))
+    return ratios
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metrics_view(request, namespace):
+    """
+    Expose a metrics namespace to staff users.
+    It can be accessed via the URL /api/metrics/{namespace}/.
+    Hit ratios are derived for every counter pair named `<name>_hits` and `<name>_misses`.
+    """
+    values = snapshot(namespace)
+    return Response({"namespace": namespace, "metrics": values, "ratios": hit_ratios(values)})
@@ -1,3 +1,4 @@
+from rest_framework.exceptions import ValidationError
 from rest_framework.pagination import CursorPagination
 
 from alx_project_nexus import settings
@@ -11,8 +12,12 @@ class CursorSetPagination(CursorPagination):
     It uses the `PAGINATION_PER_PAGE` setting to determine the number of items per page.
     The `get_ordering` method retrieves the ordering from the request query parameters,
     allowing for dynamic ordering of the queryset.
+    Only a single field listed in the view's `ordering_fields` can be requested, every allowed field is backed
+    by a (field, id) index so the cursor stays an index range scan. Other orderings are rejected.
     If no ordering is specified, it defaults to the `ordering` attribute of the view or
     the class-level `ordering` attribute.
+    The id is appended as a tiebreaker so rows sharing a sort key keep a stable order between pages.
+    A view can map the ordering onto an annotated column with a `get_pagination_ordering(ordering)` method.
     """
     page_size = settings.PAGINATION_PER_PAGE
 
@@ -20,6 +25,31 @@ class CursorSetPagination(CursorPagination):
         ordering_param = request.query_params.get('ordering')
 
         if ordering_param:
-            return [field.strip() for field in ordering_param.split(',')]
+            ordering = [field.strip() for field in ordering_param.split(',') if field.strip()]
+            self.validate_ordering(ordering, view)
+        else:
+            ordering = getattr(view, 'ordering', self.ordering)
+            if isinstance(ordering, str):
+                ordering = [ordering]
 
-        return getattr(view, 'ordering', self.ordering)
+        if hasattr(view, 'get_pagination_ordering'):
+            ordering = view.get_pagination_ordering(ordering)
+
+        return self.add_tiebreaker(list(ordering))
+
+    @staticmethod
+    def validate_ordering(ordering, view):
+        allowed = getattr(view, 'ordering_fields', None) or []
+
+        if len(ordering) != 1:
+            raise ValidationError({'ordering': 'Only one ordering field is supported.'})
+        if ordering[0].lstrip('-') not in allowed:
+            raise ValidationError({
+                'ordering': f"Unsupported ordering '{ordering[0]}', allowed fields are: {', '.join(allowed)}."
+            })
+
+    @staticmethod
+    def add_tiebreaker(ordering):
+        if any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            return ordering
+        return ordering + ['-id' if ordering[0].startswith('-') else 'id']
@@ -0,0 +1,84 @@
+from functools import lru_cache, reduce
+from operator import and_, or_
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connection as db_connection
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.functions import Greatest, Upper
+from rest_framework import filters
+
+
+@lru_cache
+def has_trigram_extension():
+    """
+    Check whether pg_trgm is installed in the default database, the result is cached per process.
+    :return:
+    """
+    if db_connection.vendor != 'postgresql':
+        return False
+    with db_connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def search_alias(field):
+    return f"search_{field.replace('__', '_')}"
+
+
+def trigram_filter(queryset, terms, fields):
+    """
+    Filter a queryset on every term, a term matches when one of the fields contains it or, with pg_trgm,
+    when it is similar enough to a word of the field.
+    :param queryset:
+    :param terms:
+    :param fields: field names, which can follow relations such as "following__username"
+    :return:
+    """
+    queryset = queryset.alias(**{search_alias(field): Upper(field) for field in fields})
+    trigram = has_trigram_extension()
+
+    conditions = []
+    for term in terms:
+        matches = []
+        for field in fields:
+            matches.append(Q(**{f'{search_alias(field)}__contains': term.upper()}))
+            if trigram:
+                matches.append(Q(**{f'{search_alias(field)}__trigram_word_similar': term}))
+        conditions.append(reduce(or_, matches))
+
+    return queryset.filter(reduce(and_, conditions)) if conditions else queryset
+
+
+def similarity(text, fields):
+    """
+    Relevance of a row for the searched text, between 0 and 1.
+    It is the best pg_trgm word similarity of the fields, or a prefix/substring score without pg_trgm.
+    :param text:
+    :param fields:
+    :return: an expression to annotate the queryset with
+    """
+    if has_trigram_extension():
+        scores = [TrigramWordSimilarity(Value(text), Upper(field)) for field in fields]
+    else:
+        scores = [Case(
+            When(**{f'{field}__iexact': text}, then=Value(1.0)),
+            When(**{f'{field}__istartswith': text}, then=Value(0.75)),
+            When(**{f'{field}__icontains': text}, then=Value(0.5)),
+            default=Value(0.0),
+            output_field=FloatField(),
+        ) for field in fields]
+    return scores[0] if len(scores) == 1 else Greatest(*scores, output_field=FloatField())
+
+
+class TrigramSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter answering the view's `search_fields` through the trigram indexes.
+    Terms match as substrings and, when pg_trgm is installed, fuzzily, so "jonh" still finds "john".
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        fields = self.get_search_fields(view, request)
+        terms = self.get_search_terms(request)
+        if not fields or not terms:
+            return queryset
+        return trigram_filter(queryset, terms, fields)
@@ -0,0 +1,174 @@
+from rest_framework.response import Response
+
+from alx_project_nexus.settings import TYPEAHEAD_MAX_PREFIX, TYPEAHEAD_PREFIX_SIZE, TYPEAHEAD_SCAN_LIMIT
+from utils.redis_client import redis_client
+
+PREFIX_KEY = "typeahead:{kind}:prefix:{prefix}"
+SCORES_KEY = "typeahead:{kind}:scores"
+LEX_KEY = "typeahead:{kind}:lex"
+
+HASHTAG_INDEX = "hashtags"
+USER_INDEX = "users"
+
+# Members of the lexical set are "<lowercase name>\0<name>", so they sort case-insensitively
+# and still return the original spelling.
+SEPARATOR = "\x00"
+
+# Every prefix of an entry has its own sorted set holding the TYPEAHEAD_PREFIX_SIZE most popular
+# completions, so a lookup is a single ZREVRANGE whatever the number of entries.
+UPDATE_SCRIPT = """
+local score
+if ARGV[4] == 'set' then
+    redis.call('ZADD', KEYS[1], ARGV[2], ARGV[1])
+    score = tonumber(ARGV[2])
+else
+    score = tonumber(redis.call('ZINCRBY', KEYS[1], ARGV[2], ARGV[1]))
+end
+redis.call('ZADD', KEYS[2], 0, ARGV[5])
+local size = tonumber(ARGV[3])
+for i = 3, #KEYS do
+    redis.call('ZADD', KEYS[i], score, ARGV[1])
+    redis.call('ZREMRANGEBYRANK', KEYS[i], 0, -(size + 1))
+end
+return tostring(score)
+"""
+
+update_script = redis_client.register_script(UPDATE_SCRIPT)
+
+
+def normalize(text):
+    return text.strip().lstrip('#@').lower()
+
+
+def prefixes(name):
+    normalized = normalize(name)
+    return [normalized[:length] for length in range(1, min(len(normalized), TYPEAHEAD_MAX_PREFIX) + 1)]
+
+
+def prefix_keys(kind, name):
+    return [PREFIX_KEY.format(kind=kind, prefix=prefix) for prefix in prefixes(name)]
+
+
+def lex_member(name):
+    return f"{normalize(name)}{SEPARATOR}{name}"
+
+
+def update(kind, entries, mode='incr', client=None):
+    """
+    Add entries to a typeahead index, or change their popularity.
+    :param kind: the index, e.g. "hashtags" or "users"
+    :param entries: names mapped to a score, added to the current score with mode "incr"
+                    and replacing it with mode "set"
+    :param mode:
+    :param client: a pipeline to queue the updates on, the updates are executed at once by default
+    :return:
+    """
+    pipe = client or redis_client.pipeline(transaction=False)
+    for name, score in entries.items():
+        update_script(
+            keys=[SCORES_KEY.format(kind=kind), LEX_KEY.format(kind=kind), *prefix_keys(kind, name)],
+            args=[name, score, TYPEAHEAD_PREFIX_SIZE, mode, lex_member(name)],
+            client=pipe,
+        )
+    if client is None:
+        pipe.execute()
+
+
+def remove(kind, name, source=None):
+    """
+    Remove an entry from a typeahead index.
+    Prefix sets only keep their TYPEAHEAD_PREFIX_SIZE best completions, so a set losing a member is refilled
+    from the source, otherwise it would show fewer completions than exist until the next rebuild.
+    :param kind:
+    :param name:
+    :param source: a function of (prefix, limit) returning the (name, score) pairs of the entries starting
+                   with the prefix, the most popular first
+    :return:
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.zrem(SCORES_KEY.format(kind=kind), name)
+    pipe.zrem(LEX_KEY.format(kind=kind), lex_member(name))
+    for key in prefix_keys(kind, name):
+        pipe.zrem(key, name)
+    pipe.execute()
+    if source is not None:
+        refill(kind, prefixes(name), source)
+
+
+def refill(kind, prefix_list, source):
+    """
+    Reload the prefix sets holding fewer than TYPEAHEAD_PREFIX_SIZE completions from their source.
+    :param kind:
+    :param prefix_list: the normalized prefixes
+    :param source: see remove
+    :return: the number of refilled prefixes
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    for prefix in prefix_list:
+        pipe.zcard(PREFIX_KEY.format(kind=kind, prefix=prefix))
+    short = [prefix for prefix, size in zip(prefix_list, pipe.execute()) if size < TYPEAHEAD_PREFIX_SIZE]
+
+    for prefix in short:
+        entries = dict(source(prefix, TYPEAHEAD_PREFIX_SIZE))
+        if entries:
+            key = PREFIX_KEY.format(kind=kind, prefix=prefix)
+            pipe.zadd(key, entries)
+            pipe.zremrangebyrank(key, 0, -(TYPEAHEAD_PREFIX_SIZE + 1))
+    pipe.execute()
+    return len(short)
+
+
+def complete(kind, text, limit=10):
+    """
+    Return the most popular entries starting with the typed text.
+    Prefixes up to TYPEAHEAD_MAX_PREFIX characters are answered from their prefix set, longer ones
+    scan at most TYPEAHEAD_SCAN_LIMIT entries of the lexical set and rank them by score.
+    :param kind:
+    :param text: the typed text, a leading # or @ is ignored
+    :param limit:
+    :return: the completions, most popular first
+    """
+    prefix = normalize(text)
+    if not prefix:
+        return []
+
+    if len(prefix) <= TYPEAHEAD_MAX_PREFIX:
+        names = redis_client.zrevrange(PREFIX_KEY.format(kind=kind, prefix=prefix), 0, limit - 1)
+        return [name.decode() for name in names]
+
+    members = redis_client.zrangebylex(LEX_KEY.format(kind=kind), b"[" + prefix.encode(),
+                                       b"[" + prefix.encode() + b"\xff", start=0, num=TYPEAHEAD_SCAN_LIMIT)
+    names = [member.decode().split(SEPARATOR, 1)[1] for member in members]
+    if not names:
+        return []
+
+    scores = redis_client.zmscore(SCORES_KEY.format(kind=kind), names)
+    ranked = sorted(zip(names, scores), key=lambda entry: -(entry[1] or 0))
+    return [name for name, score in ranked[:limit]]
+
+
+def autocomplete_response(kind, request):
+    """
+    Answer an autocomplete request, the typed text is read from the `q` query parameter.
+    :param kind:
+    :param request:
+    :return: a Response with the completions under "results"
+    """
+    try:
+        limit = min(max(int(request.query_params.get('limit', 10)), 1), TYPEAHEAD_PREFIX_SIZE)
+    except ValueError:
+        return Response({"limit": "A valid integer is required."}, status=400)
+
+    return Response({"results": complete(kind, request.query_params.get('q', ''), limit)})
+
+
+def clear(kind):
+    """
+    Delete a typeahead index.
+    :param kind:
+    :return:
+    """
+    keys = list(redis_client.scan_iter(PREFIX_KEY.format(kind=kind, prefix='*'), count=1000))
+    keys += [SCORES_KEY.format(kind=kind), LEX_KEY.format(kind=kind)]
+    for start in range(0, len(keys), 1000):
+        redis_client.delete(*keys[start:start + 1000])